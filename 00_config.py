@@ -0,0 +1,90 @@
+import os
+
+# Every stage reads its settings through load(); NADOCAST_CONFIG points at another file
+CONFIG_PATH = "config.yml"
+
+HAZARDS = ("torn", "hail", "wind")   # same order as 04's HAZARD_BITS
+
+DEFAULTS = {
+    "date": None,
+    "event": "tornado",
+    "fetch_extras": False,         # also download the SPC report GIF/HTML pages
+    "output_png": "tornado_reports_map.png",
+    "grid_res_deg": 0.25,          # ~25 km lat spacing
+    "radius_miles": 25.0,          # SPC-style neighborhood
+    "extent": [-125.0, -66.0, 24.0, 50.0],  # lon_min, lon_max, lat_min, lat_max (CONUS-ish)
+    "out_csv": "data/grid_labels.csv",
+    "grid_mode": "auto",           # stencil | raster | auto (raster below HIRES_RES_DEG)
+    "hazards": ["torn"],           # report types labeled together
+}
+
+_parsed = {}   # path -> settings, parsed once per process
+
+def _text(rhs: str) -> str:
+    return rhs.strip().strip('"').strip("'")
+
+def _items(rhs: str):
+    # supports: key: [a, b, c]
+    rhs = rhs.strip().lstrip("[").rstrip("]")
+    return [_text(p) for p in rhs.split(",") if p.strip()]
+
+def parse_config(path: str) -> dict:
+    """
+    Reads the flat `key: value` subset of YAML config.yml uses (no extra
+    deps). Missing file or keys fall back to DEFAULTS; unknown keys are
+    ignored. Raises ValueError on a non-numeric number or a hazards list
+    that is empty or names an unknown hazard.
+    """
+    cfg = dict(DEFAULTS, extent=list(DEFAULTS["extent"]), hazards=list(DEFAULTS["hazards"]))
+    if not os.path.exists(path):
+        return cfg
+
+    with open(path, "r", encoding="utf-8") as f:
+        for raw in f:
+            line = raw.strip()
+            if not line or line.startswith("#") or ":" not in line:
+                continue
+            key, rhs = line.split(":", 1)
+            key = key.strip()
+
+            if key in ("date", "event", "output_png", "grid_mode"):
+                cfg[key] = _text(rhs)
+
+            elif key in ("labels_csv", "out_labels_csv"):
+                cfg["out_csv"] = _text(rhs)
+
+            elif key in ("grid_res_deg", "radius_miles"):
+                try:
+                    cfg[key] = float(rhs.strip())
+                except ValueError:
+                    raise ValueError(f"{path}: {key} must be a number, got {rhs.strip()!r}") from None
+
+            elif key == "extent":
+                parts = _items(rhs)
+                if len(parts) == 4:
+                    cfg["extent"] = [float(x) for x in parts]
+
+            elif key == "fetch_extras":
+                cfg["fetch_extras"] = rhs.strip().lower() in ("true", "yes", "1")
+
+            elif key == "hazards":
+                names = _items(rhs)
+                if not names or any(h not in HAZARDS for h in names):
+                    raise ValueError(f"{path}: hazards must list some of {', '.join(HAZARDS)}, got {rhs.strip()!r}")
+                cfg["hazards"] = [h for h in HAZARDS if h in names]
+
+    return cfg
+
+def config_path() -> str:
+    return os.environ.get("NADOCAST_CONFIG", CONFIG_PATH)
+
+def load(path=None) -> dict:
+    """
+    The pipeline settings, parsed on first use and shared by every stage in
+    the process. Returns a copy, so callers can adjust it freely.
+    """
+    path = path or config_path()
+    if path not in _parsed:
+        _parsed[path] = parse_config(path)
+    cfg = _parsed[path]
+    return dict(cfg, extent=list(cfg["extent"]), hazards=list(cfg["hazards"]))
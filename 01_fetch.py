@@ -1,55 +1,250 @@
 import os
 import sys
+import json
+import time
+import threading
+import importlib
 import requests
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from requests.adapters import HTTPAdapter
+
+# Override to point at a local stand-in server (e.g. http://127.0.0.1:8000)
+SPC_REPORTS_URL = os.environ.get("SPC_BASE_URL", "https://www.spc.noaa.gov/climo/reports")
+RAW_CACHE_DIR = "data/raw"
+
+# SPC archived daily tornado CSV format (YYMMDD_rpts_torn.csv)
+# SPC also documents report URLs with YYMMDD_rpts.gif and YYMMDD_prt_rpts.html :contentReference[oaicite:1]{index=1}
+REPORT_FILES = {
+    "csv": "{yymmdd}_rpts_torn.csv",
+    "hail": "{yymmdd}_rpts_hail.csv",
+    "wind": "{yymmdd}_rpts_wind.csv",
+    "gif": "{yymmdd}_rpts.gif",
+    "html": "{yymmdd}_prt_rpts.html",
+}
+
+# Report CSV kind per hazard (config.yml `hazards:`); tornado stays the plain "csv" kind
+HAZARD_KINDS = {"torn": "csv", "hail": "hail", "wind": "wind"}
 
 def yymmdd_from_iso(date_str: str) -> str:
     dt = datetime.strptime(date_str, "%Y-%m-%d")
     return dt.strftime("%y%m%d")  # YYMMDD
 
-def download(url: str, out_path: str, timeout: int = 60) -> bool:
-    r = requests.get(url, timeout=timeout)
-    if r.status_code == 200 and r.content:
-        os.makedirs(os.path.dirname(out_path), exist_ok=True)
-        with open(out_path, "wb") as f:
-            f.write(r.content)
-        return True
-    return False
+def report_urls(date_str: str, base_url: str = SPC_REPORTS_URL) -> dict:
+    yymmdd = yymmdd_from_iso(date_str)
+    return {kind: f"{base_url}/{name.format(yymmdd=yymmdd)}" for kind, name in REPORT_FILES.items()}
+
+# ---------- fetch layer ----------
+class RateLimiter:
+    """Spaces request starts at least 1/rate_per_sec apart, across threads (0 = unlimited)."""
+
+    def __init__(self, rate_per_sec: float):
+        self.interval = 1.0 / rate_per_sec if rate_per_sec > 0 else 0.0
+        self._lock = threading.Lock()
+        self._next = 0.0
+
+    def wait(self) -> None:
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next)
+            self._next = start + self.interval
+        if start > now:
+            time.sleep(start - now)
+
+class SpcFetcher:
+    """
+    Pooled, rate-limited, cached access to the SPC daily report files.
+
+    Raw files are cached under `cache_dir` by their SPC name (keyed by YYMMDD)
+    next to a small `.meta.json` holding the HTTP status and ETag/Last-Modified.
+    A cached file is revalidated with a conditional GET (304 -> reuse) when
+    `revalidate` is on; otherwise the cache is trusted as-is. 404s are cached
+    too, so days without tornadoes aren't re-requested unless revalidating.
+    With `offline=True` the network is never touched and a cache miss raises
+    FileNotFoundError.
+    """
+
+    def __init__(self, cache_dir=RAW_CACHE_DIR, base_url=SPC_REPORTS_URL, *,
+                 rate_per_sec=2.0, max_workers=4, timeout=60, revalidate=True, offline=False):
+        self.cache_dir = cache_dir
+        self.base_url = base_url.rstrip("/")
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.revalidate = revalidate
+        self.offline = offline
+        self.limiter = RateLimiter(rate_per_sec)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(1, max_workers))
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def cache_path(self, date_str: str, kind: str = "csv") -> str:
+        name = REPORT_FILES[kind].format(yymmdd=yymmdd_from_iso(date_str))
+        return os.path.join(self.cache_dir, name)
+
+    def cached_meta(self, date_str: str, kind: str = "csv"):
+        """
+        What the cache knows about a date's file without touching the network:
+        {"status": 200, "etag": ..., "last_modified": ...}, {"status": 404},
+        or None if it was never fetched.
+        """
+        return self._read_meta(self.cache_path(date_str, kind))
+
+    def _read_meta(self, path):
+        try:
+            with open(path + ".meta.json", "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write(self, path, content, meta) -> None:
+        os.makedirs(self.cache_dir, exist_ok=True)
+        if content is not None:
+            tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp, "wb") as f:
+                f.write(content)
+            os.replace(tmp, path)
+        elif os.path.exists(path):
+            os.remove(path)
+        with open(path + ".meta.json", "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+
+    def _read_cached(self, path, meta):
+        if meta.get("status") != 200 or not os.path.exists(path):
+            return None
+        with open(path, "rb") as f:
+            return f.read()
+
+    def fetch(self, date_str: str, kind: str = "csv"):
+        """
+        Returns the file bytes for a date, or None if SPC has no such file
+        (404). Other failures raise (requests.RequestException; offline,
+        FileNotFoundError), so callers can tell "no reports" from "try again".
+        """
+        path = self.cache_path(date_str, kind)
+        meta = self._read_meta(path)
+        have_file = meta is not None and meta.get("status") == 200 and os.path.exists(path)
+
+        if meta is not None and (self.offline or not self.revalidate):
+            return self._read_cached(path, meta)
+        if self.offline:
+            raise FileNotFoundError(f"{os.path.basename(path)} not in cache {self.cache_dir}")
+
+        headers = {}
+        if have_file:
+            if meta.get("etag"):
+                headers["If-None-Match"] = meta["etag"]
+            if meta.get("last_modified"):
+                headers["If-Modified-Since"] = meta["last_modified"]
+
+        url = f"{self.base_url}/{os.path.basename(path)}"
+        self.limiter.wait()
+        r = self.session.get(url, headers=headers, timeout=self.timeout)
+
+        if r.status_code == 304 and have_file:
+            return self._read_cached(path, meta)
+        if r.status_code == 200 and r.content:
+            self._write(path, r.content, {
+                "status": 200,
+                "etag": r.headers.get("ETag"),
+                "last_modified": r.headers.get("Last-Modified"),
+            })
+            return r.content
+        if r.status_code == 404:
+            self._write(path, None, {"status": 404})
+            return None
+        # Anything else (5xx, empty body) is an error, not a missing file, and is not cached
+        raise requests.HTTPError(f"HTTP {r.status_code}{' (empty body)' if r.status_code == 200 else ''} for {url}",
+                                 response=r)
+
+    def fetch_many(self, dates, kind: str = "csv") -> dict:
+        """
+        Fetches many dates concurrently (bounded by max_workers and the rate limit).
+        Returns {date: bytes or None}; request errors are reported and map to None.
+        """
+        def one(date_str):
+            try:
+                return date_str, self.fetch(date_str, kind)
+            except (requests.RequestException, OSError) as e:
+                print(f"Fetch error for {date_str}: {e}", file=sys.stderr)
+                return date_str, None
+
+        with ThreadPoolExecutor(max_workers=max(1, self.max_workers)) as ex:
+            return dict(ex.map(one, dates))
+
+def fetch_hazard_csv(date_str: str, hazard: str, fetcher=None):
+    """In-process fetch stage: raw report CSV bytes of a hazard in HAZARD_KINDS for a date (None if SPC has none)."""
+    fetcher = fetcher or SpcFetcher()
+    return fetcher.fetch(date_str, HAZARD_KINDS[hazard])
+
+def write_file(content: bytes, out_path: str) -> None:
+    os.makedirs(os.path.dirname(out_path), exist_ok=True)
+    with open(out_path, "wb") as f:
+        f.write(content)
 
 def main():
-    # Read config date from config.yml (simple parse; avoids extra deps)
-    date = None
-    with open("config.yml", "r", encoding="utf-8") as f:
-        for line in f:
-            if line.strip().startswith("date:"):
-                date = line.split(":", 1)[1].strip().strip('"').strip("'")
-                break
+    cfg = importlib.import_module("00_config").load()
+    date = cfg["date"]
+    hazards = cfg["hazards"]
 
     if not date:
         print("Could not find `date:` in config.yml", file=sys.stderr)
         sys.exit(1)
 
-    yymmdd = yymmdd_from_iso(date)
-
-    # SPC archived daily tornado CSV format (YYMMDD_rpts_torn.csv)
-    # SPC also documents report URLs with YYMMDD_rpts.gif and YYMMDD_prt_rpts.html :contentReference[oaicite:1]{index=1}
-    csv_url = f"https://www.spc.noaa.gov/climo/reports/{yymmdd}_rpts_torn.csv"
-    gif_url = f"https://www.spc.noaa.gov/climo/reports/{yymmdd}_rpts.gif"
-    html_url = f"https://www.spc.noaa.gov/climo/reports/{yymmdd}_prt_rpts.html"
+    fetcher = SpcFetcher()
+    urls = report_urls(date, fetcher.base_url)
 
-    ok_csv = download(csv_url, "data/torn.csv")
-    ok_gif = download(gif_url, "data/spc_rpts.gif")
-    ok_html = download(html_url, "data/spc_prt_rpts.html")
-
-    if not ok_csv:
-        print(f"Could not download tornado CSV (maybe no tornado file for that day): {csv_url}", file=sys.stderr)
+    # Stage metrics are appended to $METRICS_LOG when it is set
+    metrics = importlib.import_module("12_stage_metrics").from_env()
+    try:
+        with metrics.stage("fetch", date) as st:
+            content = fetcher.fetch(date, "csv")
+            st.update(bytes_in=len(content or b""))
+    except requests.RequestException as e:
+        print(f"Could not download tornado CSV: {e}", file=sys.stderr)
+        sys.exit(1)
+    if content is None:
+        print(f"Could not download tornado CSV (maybe no tornado file for that day): {urls['csv']}", file=sys.stderr)
         sys.exit(1)
+    with metrics.stage("write_raw", date) as st:
+        write_file(content, "data/torn.csv")
+        st.update(bytes_out=len(content))
+    print(f"Downloaded: {urls['csv']} -> data/torn.csv")
+
+    # Hail/wind reports for multi-hazard labeling (config.yml `hazards:`)
+    for hazard in hazards:
+        if hazard == "torn":
+            continue
+        kind = HAZARD_KINDS[hazard]
+        try:
+            with metrics.stage(f"fetch_{hazard}", date) as st:
+                content = fetcher.fetch(date, kind)
+                st.update(bytes_in=len(content or b""))
+        except requests.RequestException as e:
+            print(f"Could not download {hazard} CSV: {e}", file=sys.stderr)
+            sys.exit(1)
+        if content is None:
+            # No file: zero reports of this hazard (02 writes empty points); drop an older day's file
+            if os.path.exists(f"data/{hazard}.csv"):
+                os.remove(f"data/{hazard}.csv")
+            print(f"No {hazard} reports for {date}: {urls[kind]}")
+            continue
+        write_file(content, f"data/{hazard}.csv")
+        print(f"Downloaded: {urls[kind]} -> data/{hazard}.csv")
 
-    print(f"Downloaded: {csv_url} -> data/torn.csv")
-    if ok_gif:
-        print(f"Downloaded: {gif_url} -> data/spc_rpts.gif")
-    if ok_html:
-        print(f"Downloaded: {html_url} -> data/spc_prt_rpts.html")
+    # The GIF/HTML report pages aren't used downstream; only fetch them on request
+    if cfg["fetch_extras"]:
+        for kind, out_path in (("gif", "data/spc_rpts.gif"), ("html", "data/spc_prt_rpts.html")):
+            try:
+                content = fetcher.fetch(date, kind)
+            except requests.RequestException as e:
+                print(f"Skipping {urls[kind]}: {e}", file=sys.stderr)
+                continue
+            if content is not None:
+                write_file(content, out_path)
+                print(f"Downloaded: {urls[kind]} -> {out_path}")
 
 if __name__ == "__main__":
     main()
@@ -1,45 +1,182 @@
+import io
 import os
 import sys
+import csv
+import importlib
 import pandas as pd
 
-def main():
-    in_csv = "data/torn.csv"
-    if not os.path.exists(in_csv):
-        print("Missing data/torn.csv. Run 01_fetch.py first.", file=sys.stderr)
-        sys.exit(1)
+# Try common column names
+LAT_CANDIDATES = ["LAT", "Lat", "lat", "slat"]
+LON_CANDIDATES = ["LON", "Lon", "lon", "slon"]
 
-    # SPC CSVs occasionally have malformed rows (extra commas).
-    # Use python engine + skip bad lines so the run never dies.
-    df = pd.read_csv(
-        in_csv,
-        engine="python",
-        on_bad_lines="skip",   # or "warn" if you want to see which lines are skipped
-    )
+def new_parse_stats():
+    """Counters filled in by parse_reports / parse_reports_batch."""
+    return {"rows": 0, "repaired": 0, "skipped": 0, "quarantined": []}
 
-    # Try common column names
-    lat_candidates = ["LAT", "Lat", "lat", "slat"]
-    lon_candidates = ["LON", "Lon", "lon", "slon"]
+def _latlon_cols(columns):
+    lat_col = next((c for c in LAT_CANDIDATES if c in columns), None)
+    lon_col = next((c for c in LON_CANDIDATES if c in columns), None)
+    if lat_col is None or lon_col is None:
+        raise ValueError(f"Could not find LAT/LON columns. Columns are: {list(columns)}")
+    return lat_col, lon_col
 
-    lat_col = next((c for c in lat_candidates if c in df.columns), None)
-    lon_col = next((c for c in lon_candidates if c in df.columns), None)
+def _as_text(src) -> str:
+    if isinstance(src, (bytes, bytearray)):
+        return bytes(src).decode("utf-8", errors="replace")
+    if hasattr(src, "read"):
+        data = src.read()
+        return data.decode("utf-8", errors="replace") if isinstance(data, bytes) else data
+    with open(src, "rb") as f:
+        return f.read().decode("utf-8", errors="replace")
 
-    if lat_col is None or lon_col is None:
-        print("Could not find LAT/LON columns. Columns are:", list(df.columns), file=sys.stderr)
-        sys.exit(1)
+def _n_fields(line: str) -> int:
+    return len(next(csv.reader([line]))) if '"' in line else line.count(",") + 1
+
+def _first_row_fits(text: str) -> bool:
+    """False when the first data row has more fields than the header."""
+    lines = io.StringIO(text)
+    header = lines.readline().rstrip("\r\n")
+    row = next((line.rstrip("\r\n") for line in lines if line.strip()), None)
+    return row is None or _n_fields(row) <= _n_fields(header)
+
+def _read_table(text: str, stats: dict):
+    """
+    Parses one CSV text with the C engine.
+
+    SPC CSVs occasionally have malformed rows (extra commas in the free-text
+    Comments column). Only if the strict parse fails are the over-long lines
+    pulled out: the extra fields are folded back into the last column, and
+    lines whose LAT/LON still aren't numeric are quarantined (kept in
+    stats["quarantined"], counted in stats["skipped"]).
+
+    The C engine only raises for over-long rows after the first one: an
+    over-long first row would silently become an index column, so that
+    case goes straight to the repair path too.
+    """
+    if _first_row_fits(text):
+        try:
+            df = pd.read_csv(io.StringIO(text), engine="c", index_col=False)
+            stats["rows"] += len(df)
+            return df
+        except pd.errors.ParserError:
+            pass
+
+    lines = text.splitlines()
+    header = lines[0]
+    n_fields = _n_fields(header)
+    good = [header]
+    bad = []
+    for line in lines[1:]:
+        if not line.strip():
+            continue
+        (bad if _n_fields(line) > n_fields else good).append(line)
+
+    # Anything else the tokenizer rejects is skipped (and counted)
+    df = pd.read_csv(io.StringIO("\n".join(good)), engine="c", index_col=False, on_bad_lines="skip")
+    stats["rows"] += len(good) - 1 + len(bad)
+    stats["skipped"] += len(good) - 1 - len(df)
+    if not bad:
+        return df
 
+    lat_col, lon_col = _latlon_cols(df.columns)
+    rows = []
+    for line in bad:
+        fields = next(csv.reader([line]))
+        rows.append(fields[:n_fields - 1] + [",".join(fields[n_fields - 1:])])
+    fixed = pd.DataFrame(rows, columns=df.columns)
+    ok = (pd.to_numeric(fixed[lat_col], errors="coerce").notna()
+          & pd.to_numeric(fixed[lon_col], errors="coerce").notna()).to_numpy()
+
+    stats["repaired"] += int(ok.sum())
+    stats["skipped"] += int((~ok).sum())
+    stats["quarantined"].extend(line for line, k in zip(bad, ok) if not k)
+    return pd.concat([df, fixed[ok]], ignore_index=True)
+
+def parse_reports(src, stats=None):
+    """
+    In-process parse stage: SPC report CSV -> DataFrame[lat, lon].
+    `src` is a path, a file-like object, or the raw CSV bytes from 01_fetch.
+    Pass a dict from new_parse_stats() as `stats` to get row/repair/skip counts.
+    Raises ValueError if no LAT/LON columns are found.
+    """
+    stats = stats if stats is not None else new_parse_stats()
+    df = _read_table(_as_text(src), stats)
+
+    lat_col, lon_col = _latlon_cols(df.columns)
     pts = df[[lat_col, lon_col]].copy()
     pts.columns = ["lat", "lon"]
+    return clean_report_points(pts)
+
+def parse_reports_batch(sources, stats=None):
+    """
+    Parses many daily report CSVs in one pass: `sources` maps date -> src
+    (anything parse_reports accepts). Files sharing a header are concatenated
+    with a leading date column and read by a single C-engine call.
+    Returns DataFrame[date, lat, lon].
+    """
+    stats = stats if stats is not None else new_parse_stats()
+    groups = {}
+    for date, src in sources.items():
+        lines = _as_text(src).splitlines()
+        if not lines:
+            continue
+        groups.setdefault(lines[0], []).extend(f"{date},{line}" for line in lines[1:] if line.strip())
 
-    # Clean
-    pts = pts.dropna()
-    pts["lat"] = pd.to_numeric(pts["lat"], errors="coerce")
-    pts["lon"] = pd.to_numeric(pts["lon"], errors="coerce")
-    pts = pts.dropna()
-    pts = pts[(pts["lat"].between(10, 80)) & (pts["lon"].between(-180, -30))]
+    frames = []
+    for header, body in groups.items():
+        df = _read_table("\n".join([f"date,{header}"] + body), stats)
+        lat_col, lon_col = _latlon_cols(df.columns)
+        frames.append(pd.DataFrame({"date": df["date"].astype(str), "lat": df[lat_col], "lon": df[lon_col]}))
 
+    if not frames:
+        return pd.DataFrame({"date": pd.Series(dtype=str), "lat": pd.Series(dtype=float), "lon": pd.Series(dtype=float)})
+    return clean_report_points(pd.concat(frames, ignore_index=True))
+
+def clean_report_points(pts):
+    """Numeric lat/lon, restricted to a North America box (NaNs fall out with it)."""
+    lat = pd.to_numeric(pts["lat"], errors="coerce")
+    lon = pd.to_numeric(pts["lon"], errors="coerce")
+    keep = lat.between(10, 80) & lon.between(-180, -30)
+    return pts.assign(lat=lat, lon=lon)[keep]
+
+def main():
+    in_csv = "data/torn.csv"
+    if not os.path.exists(in_csv):
+        print("Missing data/torn.csv. Run 01_fetch.py first.", file=sys.stderr)
+        sys.exit(1)
+
+    # hail.csv / wind.csv come from 01 when config.yml lists them under `hazards:`
+    cfg = importlib.import_module("00_config").load()
+    hazards = ["torn"] + [h for h in cfg["hazards"] if h != "torn"]
+    metrics = importlib.import_module("12_stage_metrics").from_env()
     os.makedirs("data", exist_ok=True)
-    pts.to_csv("data/torn_points.csv", index=False)
-    print(f"Saved {len(pts)} points -> data/torn_points.csv")
+    for hazard in hazards:
+        in_csv = f"data/{hazard}.csv"
+        out_csv = f"data/{hazard}_points.csv"
+        if not os.path.exists(in_csv):
+            # 01 found no SPC file for the date: zero reports of this hazard
+            pd.DataFrame({"lat": [], "lon": []}).to_csv(out_csv, index=False)
+            print(f"No {in_csv}; saved 0 points -> {out_csv}")
+            continue
+        stats = new_parse_stats()
+        try:
+            with metrics.stage("parse" if hazard == "torn" else f"parse_{hazard}") as st:
+                pts = parse_reports(in_csv, stats)
+                st.update(bytes_in=os.path.getsize(in_csv), rows_in=stats["rows"], rows_out=len(pts))
+        except ValueError as e:
+            print(f"{in_csv}: {e}", file=sys.stderr)
+            sys.exit(1)
+
+        with metrics.stage("write_points" if hazard == "torn" else f"write_points_{hazard}") as st:
+            pts.to_csv(out_csv, index=False)
+            st.update(rows_out=len(pts), bytes_out=os.path.getsize(out_csv))
+        print(f"Saved {len(pts)} points -> {out_csv}")
+        if stats["repaired"] or stats["skipped"]:
+            print(f"Malformed rows: repaired={stats['repaired']} skipped={stats['skipped']} (of {stats['rows']})")
+        if stats["quarantined"]:
+            with open(f"data/{hazard}_quarantine.csv", "w", encoding="utf-8") as f:
+                f.write("\n".join(stats["quarantined"]) + "\n")
+            print(f"Quarantined lines -> data/{hazard}_quarantine.csv")
 
 if __name__ == "__main__":
     main()
@@ -1,61 +1,216 @@
 import os
 import sys
+import json
+import hashlib
+import importlib
+import multiprocessing as mp
+import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
 
-import cartopy.crs as ccrs
-import cartopy.feature as cfeature
+# matplotlib/cartopy are imported on first use (load_plotting): a run that
+# stops on a missing input never pays for them
+matplotlib = plt = cartopy = ccrs = cfeature = None
 
-def read_config_date_and_outname():
-    date = None
-    outpng = "tornado_reports_map.png"
-    with open("config.yml", "r", encoding="utf-8") as f:
-        for line in f:
-            s = line.strip()
-            if s.startswith("date:"):
-                date = s.split(":", 1)[1].strip().strip('"').strip("'")
-            if s.startswith("output_png:"):
-                outpng = s.split(":", 1)[1].strip().strip('"').strip("'")
-    return date, outpng
+BASEMAP_DIR = "data/basemap_cache"
+MAPS_DIR = "out/maps"
+EXTENT = [-125, -66, 24, 50]     # CONUS-ish
+FIGSIZE = (12, 7)
+AX_RECT = [0.02, 0.02, 0.96, 0.9]  # fixed (not tight_layout) so the cached background lines up
+DPI = 200
+PROB_MIN = 0.02    # forecast cells below this are left unshaded (SPC's lowest tornado contour)
+PROB_MAX = 0.3
+HAZARD_NAMES = {"torn": "tornado", "hail": "severe hail", "wind": "severe wind"}
 
-def main():
-    date, outpng = read_config_date_and_outname()
-    pts_path = "data/torn_points.csv"
-    if not os.path.exists(pts_path):
-        print("Missing data/torn_points.csv. Run 02_compute_tpi.py first.", file=sys.stderr)
-        sys.exit(1)
+def read_config_date_and_outname():
+    cfg = importlib.import_module("00_config").load()
+    return cfg["date"], cfg["output_png"]
 
-    pts = pd.read_csv(pts_path)
+def prob_label(radius_miles, hazards=("torn",)):
+    """Colorbar label for what the model forecasts: the tornado label, or any listed hazard without torn (04 label_bits)."""
+    target = ["torn"] if "torn" in hazards else list(hazards)
+    return f"P({' or '.join(HAZARD_NAMES[h] for h in target)} within {radius_miles:g} mi)"
 
-    os.makedirs("out", exist_ok=True)
-    out_path = os.path.join("out", outpng)
+def load_plotting():
+    """Imports matplotlib (Agg backend) and cartopy into the module globals, once."""
+    global matplotlib, plt, cartopy, ccrs, cfeature
+    if plt is not None:
+        return
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    import cartopy
+    import cartopy.crs as ccrs
+    import cartopy.feature as cfeature
 
-    # Map
-    proj = ccrs.LambertConformal(central_longitude=-96, central_latitude=39)
-    fig = plt.figure(figsize=(12, 7))
-    ax = plt.axes(projection=proj)
+def map_projection():
+    load_plotting()
+    return ccrs.LambertConformal(central_longitude=-96, central_latitude=39)
 
-    # CONUS-ish extent
-    ax.set_extent([-125, -66, 24, 50], crs=ccrs.PlateCarree())
+def new_map_axes():
+    load_plotting()
+    fig = plt.figure(figsize=FIGSIZE)
+    ax = fig.add_axes(AX_RECT, projection=map_projection())
+    ax.set_extent(EXTENT, crs=ccrs.PlateCarree())
+    return fig, ax
 
+def draw_basemap(ax):
     ax.add_feature(cfeature.LAND, linewidth=0)
     ax.add_feature(cfeature.OCEAN, linewidth=0)
     ax.add_feature(cfeature.COASTLINE, linewidth=0.5)
     ax.add_feature(cfeature.BORDERS, linewidth=0.5)
     ax.add_feature(cfeature.STATES, linewidth=0.3)
 
-    ax.scatter(
-        pts["lon"], pts["lat"],
-        s=8,
-        transform=ccrs.PlateCarree(),
-        alpha=0.7
-    )
+# ---------------- cached basemap ----------------
+def basemap_path(cache_dir=BASEMAP_DIR):
+    """Cache file for the current layout; any change to the map settings gets a new key."""
+    key = json.dumps([EXTENT, FIGSIZE, AX_RECT, DPI, map_projection().proj4_init, cartopy.__version__])
+    return os.path.join(cache_dir, f"basemap_{hashlib.sha1(key.encode()).hexdigest()[:12]}.png")
 
-    title = f"SPC Tornado Reports (points) — {date}" if date else "SPC Tornado Reports (points)"
+def load_basemap(cache_dir=BASEMAP_DIR):
+    """
+    The static LAND/OCEAN/COASTLINE/BORDERS/STATES layer as an RGBA array
+    covering exactly the map axes. Rendered once at DPI and cached as a PNG;
+    later runs (and every pool worker) just read the image.
+    """
+    path = basemap_path(cache_dir)
+    if not os.path.exists(path):
+        os.makedirs(cache_dir, exist_ok=True)
+        fig, ax = new_map_axes()
+        draw_basemap(ax)
+        ax.set_axis_off()
+        bbox = ax.get_window_extent(fig.canvas.get_renderer()).transformed(fig.dpi_scale_trans.inverted())
+        tmp = path + ".tmp.png"
+        fig.savefig(tmp, dpi=DPI, bbox_inches=bbox, pad_inches=0)
+        plt.close(fig)
+        os.replace(tmp, path)
+    return plt.imread(path)
+
+def render_map(background, out_path, title, pts=None, forecast=None):
+    """
+    One map: the cached background, then the date's forecast probabilities
+    (dict lats, lons, probs with probs shaped (n_lat, n_lon), and the
+    colorbar label) and/or report points (DataFrame[lat, lon]) on top.
+    """
+    fig, ax = new_map_axes()
+    ax.imshow(background, origin="upper", extent=ax.get_extent(), transform=ax.projection,
+              interpolation="nearest", zorder=0)
+    if forecast is not None:
+        mesh = ax.pcolormesh(forecast["lons"], forecast["lats"], np.ma.masked_less(forecast["probs"], PROB_MIN),
+                             transform=ccrs.PlateCarree(), cmap="YlOrRd", vmin=0, vmax=PROB_MAX,
+                             shading="nearest", alpha=0.6, zorder=1)
+        fig.colorbar(mesh, ax=ax, shrink=0.6, pad=0.01, label=forecast["label"])
+    if pts is not None and len(pts):
+        ax.scatter(pts["lon"], pts["lat"], s=8, transform=ccrs.PlateCarree(), alpha=0.7, zorder=2)
     ax.set_title(title)
+    fig.savefig(out_path, dpi=DPI)
+    plt.close(fig)
+
+# ---------------- batch rendering ----------------
+_worker = {}
+
+def init_worker(point_store_dir=None):
+    """Per-process state: the basemap image, the forecast store and a report source, loaded once."""
+    fetch_stage = importlib.import_module("01_fetch")
+    forecast_stage = importlib.import_module("07_forecast_day_v0")
+    _worker["background"] = load_basemap()
+    _worker["parse"] = importlib.import_module("02_compute_tpi").parse_reports
+    _worker["fetcher"] = fetch_stage.SpcFetcher(fetch_stage.RAW_CACHE_DIR, fetch_stage.SPC_REPORTS_URL, offline=True)
+    _worker["point_store"] = importlib.import_module("10_ingest_bulk_reports").PointStore(point_store_dir) if point_store_dir else None
+
+    store = forecast_stage.ForecastStore()
+    _worker["forecasts"] = store if store.exists() else None
+    if store.exists():
+        meta = store.meta()
+        n_lat, n_lon = meta["shape"]
+        geo = store.grid()
+        _worker["grid_axes"] = (geo["lat"].to_numpy()[::n_lon], geo["lon"].to_numpy()[:n_lon])
+        # Forecasts written before 07 recorded these were made with the config.yml settings
+        cfg = importlib.import_module("00_config").load()
+        _worker["prob_label"] = prob_label(meta.get("radius_miles", cfg["radius_miles"]),
+                                           meta.get("hazards", cfg["hazards"]))
+
+def date_reports(date_str):
+    """Report points for a date from the point store or the raw cache; None if neither has it."""
+    if _worker["point_store"] is not None:
+        pts = _worker["point_store"].points(date_str)
+        if pts is not None:
+            return pts
+    try:
+        raw = _worker["fetcher"].fetch(date_str, "csv")
+    except FileNotFoundError:
+        return None
+    return _worker["parse"](raw) if raw is not None else pd.DataFrame({"lat": [], "lon": []})
+
+def date_forecast(date_str):
+    store = _worker["forecasts"]
+    if store is None or not os.path.exists(store.partition_path(date_str)):
+        return None
+    lats, lons = _worker["grid_axes"]
+    return {"lats": lats, "lons": lons, "probs": np.asarray(store.probs(date_str)).reshape(len(lats), len(lons)),
+            "label": _worker["prob_label"]}
 
-    plt.tight_layout()
-    plt.savefig(out_path, dpi=200)
+def render_date(args):
+    """Pool task: renders one date; returns (date, out_path or None, detail)."""
+    date_str, layers, out_dir = args
+    try:
+        pts = date_reports(date_str) if "reports" in layers else None
+        forecast = date_forecast(date_str) if "forecast" in layers else None
+        if pts is None and forecast is None:
+            return date_str, None, "no reports or forecast"
+        what = " + ".join(name for name, v in (("forecast", forecast), ("reports", pts)) if v is not None)
+        out_path = os.path.join(out_dir, f"{date_str.replace('-', '')}.png")
+        render_map(_worker["background"], out_path, f"Nadocast v0 — {what} — {date_str}", pts, forecast)
+        return date_str, out_path, what
+    except Exception as e:
+        return date_str, None, f"{type(e).__name__}: {e}"
+
+def main_batch(start, end):
+    """
+    Renders every date in [start, end] into out/maps/YYYYMMDD.png across
+    WORKERS processes. Each worker reads the cached basemap and overlays the
+    date's forecast (data/forecast_v0/, from 07 batch mode) and report points
+    (POINT_STORE or the data/raw/ cache). PLOT=reports|forecast|both.
+    """
+    plot = os.environ.get("PLOT", "both")
+    layers = ("reports", "forecast") if plot == "both" else (plot,)
+    workers = int(os.environ.get("WORKERS", "1"))
+    point_store_dir = os.environ.get("POINT_STORE") or None
+    dates = [str(d) for d in np.arange(np.datetime64(start, "D"), np.datetime64(end, "D") + 1)]
+
+    load_basemap()  # render the cache once before the workers start
+    os.makedirs(MAPS_DIR, exist_ok=True)
+    tasks = [(d, layers, MAPS_DIR) for d in dates]
+    if workers > 1:
+        with mp.Pool(workers, initializer=init_worker, initargs=(point_store_dir,)) as pool:
+            results = list(pool.imap_unordered(render_date, tasks))
+    else:
+        init_worker(point_store_dir)
+        results = [render_date(t) for t in tasks]
+
+    n_ok = sum(1 for _, path, _ in results if path)
+    for d, path, detail in sorted(results):
+        if path is None:
+            print(f"{d}: skipped ({detail})")
+    print(f"Saved {n_ok}/{len(dates)} maps -> {MAPS_DIR}/")
+
+def main():
+    # Batch mode: START_DATE=2011-04-01 END_DATE=2011-05-31 WORKERS=4 python 03_plot_post.py
+    if os.environ.get("START_DATE"):
+        return main_batch(os.environ["START_DATE"], os.environ.get("END_DATE", os.environ["START_DATE"]))
+
+    date, outpng = read_config_date_and_outname()
+    pts_path = "data/torn_points.csv"
+    if not os.path.exists(pts_path):
+        print("Missing data/torn_points.csv. Run 02_compute_tpi.py first.", file=sys.stderr)
+        sys.exit(1)
+
+    pts = pd.read_csv(pts_path)
+
+    os.makedirs("out", exist_ok=True)
+    out_path = os.path.join("out", outpng)
+
+    title = f"SPC Tornado Reports (points) — {date}" if date else "SPC Tornado Reports (points)"
+    render_map(load_basemap(), out_path, title, pts=pts)
     print(f"Saved map -> {out_path}")
 
 if __name__ == "__main__":
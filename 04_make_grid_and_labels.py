@@ -1,47 +1,18 @@
 import os
 import sys
+import json
 import math
+import hashlib
+import importlib
+import numpy as np
 import pandas as pd
 
-# ---------- config helpers (simple parse, no yaml deps) ----------
-def read_config():
-    cfg = {
-        "date": None,
-        "grid_res_deg": 0.25,          # ~25 km lat spacing
-        "radius_miles": 25.0,          # SPC-style neighborhood
-        "extent": [-125.0, -66.0, 24.0, 50.0],  # lon_min, lon_max, lat_min, lat_max (CONUS-ish)
-        "out_csv": "data/grid_labels.csv",
-    }
-    if not os.path.exists("config.yml"):
-        return cfg
-
-    with open("config.yml", "r", encoding="utf-8") as f:
-        for raw in f:
-            line = raw.strip()
-            if not line or line.startswith("#"):
-                continue
-
-            if line.startswith("date:"):
-                cfg["date"] = line.split(":", 1)[1].strip().strip('"').strip("'")
-
-            elif line.startswith("grid_res_deg:"):
-                cfg["grid_res_deg"] = float(line.split(":", 1)[1].strip())
-
-            elif line.startswith("radius_miles:"):
-                cfg["radius_miles"] = float(line.split(":", 1)[1].strip())
+config = importlib.import_module("00_config")
 
-            elif line.startswith("extent:"):
-                # supports: extent: [-125, -66, 24, 50]
-                rhs = line.split(":", 1)[1].strip()
-                rhs = rhs.strip().lstrip("[").rstrip("]")
-                parts = [p.strip() for p in rhs.split(",") if p.strip()]
-                if len(parts) == 4:
-                    cfg["extent"] = [float(x) for x in parts]
-
-            elif line.startswith("labels_csv:") or line.startswith("out_labels_csv:"):
-                cfg["out_csv"] = line.split(":", 1)[1].strip().strip('"').strip("'")
-
-    return cfg
+# ---------- config helpers ----------
+def read_config():
+    """config.yml settings (00_config, parsed once per process); out_csv is the labels CSV."""
+    return config.load()
 
 # ---------- geo helpers ----------
 def haversine_miles(lat1, lon1, lat2, lon2):
@@ -56,83 +27,492 @@ def haversine_miles(lat1, lon1, lat2, lon2):
     km = R_km * c
     return km * 0.621371
 
-def make_grid(extent, res_deg):
+def haversine_miles_np(lat1, lon1, lat2, lon2):
+    # Vectorized twin of haversine_miles (same constants/formula, broadcasts over arrays)
+    R_km = 6371.0088
+    dlat = np.radians(lat2 - lat1)
+    dlon = np.radians(lon2 - lon1)
+    a = (np.sin(dlat / 2) ** 2 +
+         np.cos(np.radians(lat1)) * np.cos(np.radians(lat2)) * (np.sin(dlon / 2) ** 2))
+    c = 2 * np.arcsin(np.sqrt(a))
+    km = R_km * c
+    return km * 0.621371
+
+GRID_CACHE_DIR = "data/grid_cache"
+MILES_PER_DEG_LAT = 6371.0088 * math.pi / 180 * 0.621371
+HIRES_RES_DEG = 0.1      # grid_mode: auto switches to raster labeling below this
+TILE_ROWS = 256          # raster rows labeled / written per tile
+
+# Multi-hazard labels are one uint8 bitmask per cell; "label" is always the tornado bit
+HAZARD_BITS = {"torn": 1, "hail": 2, "wind": 4}
+
+def grid_axes(extent, res_deg):
+    """Inclusive lat/lon axes of the grid (vectorized; same values as the old accumulating loop)."""
     lon_min, lon_max, lat_min, lat_max = extent
-    # inclusive ranges
-    lats = []
-    v = lat_min
-    while v <= lat_max + 1e-9:
-        lats.append(round(v, 6))
-        v += res_deg
-
-    lons = []
-    v = lon_min
-    while v <= lon_max + 1e-9:
-        lons.append(round(v, 6))
-        v += res_deg
-
-    rows = []
-    gid = 0
-    for lat in lats:
-        for lon in lons:
-            rows.append((gid, lat, lon))
-            gid += 1
-
-    return pd.DataFrame(rows, columns=["grid_id", "lat", "lon"])
+    n_lat = int(math.floor((lat_max - lat_min) / res_deg + 1e-9)) + 1
+    n_lon = int(math.floor((lon_max - lon_min) / res_deg + 1e-9)) + 1
+    lats = np.round(lat_min + np.arange(n_lat) * res_deg, 6)
+    lons = np.round(lon_min + np.arange(n_lon) * res_deg, 6)
+    return lats, lons
 
-def main():
-    cfg = read_config()
+def make_grid(extent, res_deg):
+    lats, lons = grid_axes(extent, res_deg)
+    # row-major: lat outer, lon inner
+    return pd.DataFrame({
+        "grid_id": np.arange(len(lats) * len(lons), dtype=np.int64),
+        "lat": np.repeat(lats, len(lons)),
+        "lon": np.tile(lons, len(lats)),
+    })
+
+def _row_stencil(lat, res_deg, radius_miles):
+    """
+    (di, dj) cell offsets that can hold a cell center within radius_miles of a
+    report snapped to a cell at latitude `lat`. The disk is padded by the
+    farthest a report can sit from its snapped center (half-cell diagonal),
+    so it is a superset of the true neighborhood for any report in the cell.
+    """
+    half = res_deg / 2
+    margin = max(haversine_miles(lat, 0.0, lat + half, half), haversine_miles(lat, 0.0, lat - half, half))
+    reach = radius_miles + margin * 1.01 + 1e-6
+
+    n_i = int(math.ceil(reach / (MILES_PER_DEG_LAT * res_deg))) + 1
+    far_lat = min(89.0, abs(lat) + n_i * res_deg)
+    n_j = int(math.ceil(reach / (MILES_PER_DEG_LAT * math.cos(math.radians(far_lat)) * res_deg))) + 1
+
+    di, dj = np.meshgrid(np.arange(-n_i, n_i + 1), np.arange(-n_j, n_j + 1), indexing="ij")
+    di = di.ravel()
+    dj = dj.ravel()
+    d = haversine_miles_np(lat, 0.0, lat + di * res_deg, dj * res_deg)
+    keep = d <= reach
+    return di[keep].astype(np.int32), dj[keep].astype(np.int32)
+
+class Grid:
+    """
+    Regular lat/lon grid plus a per-latitude-row neighborhood stencil for
+    radius_miles. Depends only on (extent, res_deg, radius_miles); use
+    load_grid() to get it from the on-disk cache.
+
+    Labeling snaps each report to its cell and stamps that row's stencil;
+    the stencil is padded, so each candidate cell is re-checked with
+    haversine_miles_np and labels match label_grid_brute exactly.
+
+    Stencils grow with (radius / res)^2 per row, so high-resolution grids are
+    built without them (stencil=False) and label by raster dilation instead:
+    see iter_label_tiles.
+    """
+
+    def __init__(self, extent, res_deg, radius_miles, lats, lons, st_di, st_dj, st_ptr):
+        self.extent = [float(x) for x in extent]
+        self.res_deg = float(res_deg)
+        self.radius_miles = float(radius_miles)
+        self.lats = lats
+        self.lons = lons
+        self.st_di = st_di
+        self.st_dj = st_dj
+        self.st_ptr = st_ptr
+        self._frame = None
+
+    @classmethod
+    def build(cls, extent, res_deg, radius_miles, stencil=True):
+        lats, lons = grid_axes(extent, res_deg)
+        if not stencil:
+            return cls(extent, res_deg, radius_miles, lats, lons, None, None, None)
+        di_parts = []
+        dj_parts = []
+        ptr = [0]
+        for lat in lats:
+            di, dj = _row_stencil(float(lat), res_deg, radius_miles)
+            di_parts.append(di)
+            dj_parts.append(dj)
+            ptr.append(ptr[-1] + len(di))
+        return cls(extent, res_deg, radius_miles, lats, lons,
+                   np.concatenate(di_parts), np.concatenate(dj_parts), np.asarray(ptr, dtype=np.int64))
+
+    @property
+    def shape(self):
+        return len(self.lats), len(self.lons)
+
+    @property
+    def n_cells(self):
+        return len(self.lats) * len(self.lons)
+
+    @property
+    def has_stencil(self):
+        return self.st_ptr is not None
+
+    @property
+    def frame(self):
+        """DataFrame[grid_id, lat, lon], same as make_grid()."""
+        if self._frame is None:
+            self._frame = make_grid(self.extent, self.res_deg)
+        return self._frame
+
+    def frame_rows(self, row0, row1):
+        """DataFrame[grid_id, lat, lon] for raster rows [row0, row1) only."""
+        n_lon = len(self.lons)
+        return pd.DataFrame({
+            "grid_id": np.arange(row0 * n_lon, row1 * n_lon, dtype=np.int64),
+            "lat": np.repeat(self.lats[row0:row1], n_lon),
+            "lon": np.tile(self.lons, row1 - row0),
+        })
+
+    def stencil(self, row):
+        if 0 <= row < len(self.lats):
+            lo, hi = self.st_ptr[row], self.st_ptr[row + 1]
+            return self.st_di[lo:hi], self.st_dj[lo:hi]
+        # Report snapped to a row just outside the grid: its disk can still reach in
+        return _row_stencil(float(self.lats[0] + row * self.res_deg), self.res_deg, self.radius_miles)
+
+    def label(self, pts, bits=None):
+        """
+        0/1 uint8 label per grid cell (grid_id order): 1 if any report is within
+        radius_miles. With `bits` (a uint8 flag per report, see HAZARD_BITS) the
+        cell gets the OR of the flags of every report within reach instead, so
+        all hazards are labeled in the same pass.
+        """
+        if not self.has_stencil:
+            return self.label_raster(pts, bits).ravel()
+
+        n_lat, n_lon = self.shape
+        labels = np.zeros(self.n_cells, dtype=np.uint8)
+        if len(pts) == 0:
+            return labels
+
+        plat = pts["lat"].to_numpy(dtype=float)
+        plon = pts["lon"].to_numpy(dtype=float)
+        rows = np.rint((plat - self.lats[0]) / self.res_deg).astype(np.int64)
+        cols = np.rint((plon - self.lons[0]) / self.res_deg).astype(np.int64)
+
+        # Reports sharing a snapped row share a stencil: stamp them together
+        for row in np.unique(rows):
+            sel = np.flatnonzero(rows == row)
+            di, dj = self.stencil(int(row))
+            rr = np.broadcast_to(row + di[None, :], (len(sel), len(di)))
+            cc = cols[sel][:, None] + dj[None, :]
+            inside = (rr >= 0) & (rr < n_lat) & (cc >= 0) & (cc < n_lon)
+            if not inside.any():
+                continue
+            k = np.nonzero(inside)[0]
+            r_in = rr[inside]
+            c_in = cc[inside]
+            d = haversine_miles_np(self.lats[r_in], self.lons[c_in], plat[sel][k], plon[sel][k])
+            hit = d <= self.radius_miles
+            if bits is None:
+                labels[r_in[hit] * n_lon + c_in[hit]] = 1
+            else:
+                np.bitwise_or.at(labels, r_in[hit] * n_lon + c_in[hit], bits[sel][k][hit])
+        return labels
 
-    pts_path = "data/torn_points.csv"
-    if not os.path.exists(pts_path):
-        print("Missing data/torn_points.csv. Run 02_compute_tpi.py first.", file=sys.stderr)
-        sys.exit(1)
+    def label_raster(self, pts, bits=None):
+        """Labels as a 2-D uint8 raster of shape (n_lat, n_lon)."""
+        out = np.empty(self.shape, dtype=np.uint8)
+        for row0, tile in self.iter_label_tiles(pts, bits=bits):
+            out[row0:row0 + len(tile)] = tile
+        return out
 
-    pts = pd.read_csv(pts_path)
-    if not {"lat", "lon"}.issubset(set(pts.columns)):
-        print("torn_points.csv must have columns: lat, lon", file=sys.stderr)
-        sys.exit(1)
+    def iter_label_tiles(self, pts, tile_rows=TILE_ROWS, bits=None):
+        """
+        Yields (row0, uint8 tile of shape (rows, n_lon)) covering the grid top to
+        bottom, holding one tile at a time.
 
-    # Basic clean
+        For a report and a grid row, the cells within radius_miles form one
+        run of longitudes, whose half-width follows from the haversine formula.
+        Each (report, row) pair is stamped as a run into a per-tile difference
+        array (raster dilation), so work is O(reports x rows reached), not
+        O(cells x reports). The cells at either end of each run are decided
+        with haversine_miles_np, so labels match label_grid_brute exactly.
+        With `bits`, runs are accumulated per flag and tiles hold the OR'd flags.
+        """
+        n_lat, n_lon = self.shape
+        res = self.res_deg
+        lat0 = float(self.lats[0])
+        lon0 = float(self.lons[0])
+
+        plat = pts["lat"].to_numpy(dtype=float)
+        plon = pts["lon"].to_numpy(dtype=float)
+        bits = np.ones(len(plat), dtype=np.uint8) if bits is None else np.asarray(bits, dtype=np.uint8)
+
+        # Every (report, row) pair a report's disk can reach
+        reach = int(math.ceil(self.radius_miles / (MILES_PER_DEG_LAT * res))) + 2
+        offsets = np.arange(-reach, reach + 1)
+        prow = np.rint((plat - lat0) / res).astype(np.int64)
+        pair_pt = np.repeat(np.arange(len(plat)), len(offsets))
+        pair_row = (prow[:, None] + offsets[None, :]).ravel()
+        ok = (pair_row >= 0) & (pair_row < n_lat)
+        pair_pt = pair_pt[ok]
+        pair_row = pair_row[ok]
+
+        # Longitude half-width of the disk on each pair's row
+        la = plat[pair_pt]
+        lo = plon[pair_pt]
+        rlat = self.lats[pair_row]
+        hav_r = math.sin((self.radius_miles / 0.621371) / 6371.0088 / 2) ** 2
+        t = (hav_r - np.sin(np.radians(rlat - la) / 2) ** 2) / (np.cos(np.radians(la)) * np.cos(np.radians(rlat)))
+        half = np.where(t > 0, np.degrees(2 * np.arcsin(np.sqrt(np.clip(t, 0, 1)))), 0.0)
+        fa = np.floor((lo - half - lon0) / res).astype(np.int64)
+        cb = np.ceil((lo + half - lon0) / res).astype(np.int64)
+
+        # Cells two or more away from the analytic ends are inside for sure
+        run_lo = np.maximum(fa + 2, 0)
+        run_hi = np.minimum(cb - 2, n_lon - 1)
+        has_run = (t > 0) & (run_lo <= run_hi)
+
+        # The few cells around each end: exact check
+        edge = np.arange(-1, 2)
+        e_col = np.concatenate([(fa[:, None] + edge).ravel(), (cb[:, None] + edge).ravel()])
+        e_pair = np.concatenate([np.repeat(np.arange(len(fa)), 3)] * 2)
+        ok = (e_col >= 0) & (e_col < n_lon)
+        e_col = e_col[ok]
+        e_pair = e_pair[ok]
+        d = haversine_miles_np(rlat[e_pair], self.lons[e_col], la[e_pair], lo[e_pair])
+        hit = d <= self.radius_miles
+        e_row = pair_row[e_pair[hit]]
+        e_bit = bits[pair_pt[e_pair[hit]]]
+        e_col = e_col[hit]
+
+        r_row = pair_row[has_run]
+        r_lo = run_lo[has_run]
+        r_hi = run_hi[has_run]
+        r_bit = bits[pair_pt[has_run]]
+        flags = np.unique(bits)
+
+        for row0 in range(0, n_lat, tile_rows):
+            row1 = min(row0 + tile_rows, n_lat)
+            tile = np.zeros((row1 - row0, n_lon), dtype=np.uint8)
+            sel = (r_row >= row0) & (r_row < row1)
+            for flag in flags:
+                fsel = sel & (r_bit == flag)
+                if not fsel.any():
+                    continue
+                diff = np.zeros((row1 - row0, n_lon + 1), dtype=np.int32)
+                np.add.at(diff, (r_row[fsel] - row0, r_lo[fsel]), 1)
+                np.add.at(diff, (r_row[fsel] - row0, r_hi[fsel] + 1), -1)
+                tile |= np.where(np.cumsum(diff[:, :n_lon], axis=1) > 0, flag, 0).astype(np.uint8)
+            sel = (e_row >= row0) & (e_row < row1)
+            np.bitwise_or.at(tile, (e_row[sel] - row0, e_col[sel]), e_bit[sel])
+            yield row0, tile
+
+    def save(self, path):
+        arrays = {"lats": self.lats, "lons": self.lons}
+        if self.has_stencil:
+            arrays.update(st_di=self.st_di, st_dj=self.st_dj, st_ptr=self.st_ptr)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            np.savez(f, extent=np.asarray(self.extent), res_deg=self.res_deg,
+                     radius_miles=self.radius_miles, **arrays)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as z:
+            st = [z[k] if k in z else None for k in ("st_di", "st_dj", "st_ptr")]
+            return cls(z["extent"].tolist(), float(z["res_deg"]), float(z["radius_miles"]),
+                       z["lats"], z["lons"], *st)
+
+def grid_cache_path(extent, res_deg, radius_miles, cache_dir=GRID_CACHE_DIR, stencil=True):
+    key = json.dumps([[float(x) for x in extent], float(res_deg), float(radius_miles)])
+    suffix = "" if stencil else "_raster"
+    return os.path.join(cache_dir, f"grid_{hashlib.sha1(key.encode()).hexdigest()[:12]}{suffix}.npz")
+
+def load_grid(extent, res_deg, radius_miles, cache_dir=GRID_CACHE_DIR, stencil=True):
+    """Grid for (extent, res_deg, radius_miles), built once and cached on disk."""
+    path = grid_cache_path(extent, res_deg, radius_miles, cache_dir, stencil)
+    if os.path.exists(path):
+        return Grid.load(path)
+    grid = Grid.build(extent, res_deg, radius_miles, stencil=stencil)
+    os.makedirs(cache_dir, exist_ok=True)
+    grid.save(path)
+    return grid
+
+def raster_mode(cfg) -> bool:
+    mode = cfg.get("grid_mode", "auto")
+    if mode == "auto":
+        return float(cfg["grid_res_deg"]) < HIRES_RES_DEG
+    return mode == "raster"
+
+def grid_from_config(cfg):
+    """The cached Grid for config.yml's settings (stencil-free in raster mode)."""
+    return load_grid(cfg["extent"], cfg["grid_res_deg"], cfg["radius_miles"], stencil=not raster_mode(cfg))
+
+def clean_points(pts):
     pts = pts.dropna(subset=["lat", "lon"]).copy()
     pts["lat"] = pd.to_numeric(pts["lat"], errors="coerce")
     pts["lon"] = pd.to_numeric(pts["lon"], errors="coerce")
     pts = pts.dropna(subset=["lat", "lon"])
     pts = pts[(pts["lat"].between(-90, 90)) & (pts["lon"].between(-180, 180))]
+    return pts
 
-    # Build grid
-    grid = make_grid(cfg["extent"], cfg["grid_res_deg"])
-
-    # Labeling
-    radius = float(cfg["radius_miles"])
+# ---------- labeling ----------
+def label_grid_brute(grid, pts, radius_miles):
+    """
+    Reference labeler: every cell against every report with the scalar haversine.
+    O(cells x reports) in pure Python -- kept only to check label_grid and
+    Grid.label against (tests/test_labels.py).
+    """
+    pts_list = list(zip(pts["lat"].to_list(), pts["lon"].to_list()))
     labels = []
-    # Small speedup: if no points, everything is 0
-    if len(pts) == 0:
-        labels = [0] * len(grid)
-    else:
-        # Brute force for v0 (fine at 0.25° CONUS); optimize later with KD-tree if needed
-        pts_list = list(zip(pts["lat"].to_list(), pts["lon"].to_list()))
-        for _, r in grid.iterrows():
-            glat = float(r["lat"])
-            glon = float(r["lon"])
-            hit = 0
-            for plat, plon in pts_list:
-                if haversine_miles(glat, glon, plat, plon) <= radius:
-                    hit = 1
-                    break
-            labels.append(hit)
-
-    out = grid.copy()
-    out["date"] = cfg["date"]
-    out["label"] = labels
+    for glat, glon in zip(grid["lat"].to_list(), grid["lon"].to_list()):
+        hit = 0
+        for plat, plon in pts_list:
+            if haversine_miles(glat, glon, plat, plon) <= radius_miles:
+                hit = 1
+                break
+        labels.append(hit)
+    return np.asarray(labels, dtype=np.int64)
+
+def label_grid(grid, pts, radius_miles):
+    """
+    Returns a 0/1 label per grid cell: 1 if any report is within radius_miles.
+
+    Grid cells go into a haversine BallTree once; each report then asks the tree
+    for the cells near it (O(reports) queries instead of O(cells x reports)).
+    The tree radius is padded slightly and the exact cut-off is re-applied with
+    haversine_miles_np, so labels match label_grid_brute.
+    """
+    from sklearn.neighbors import BallTree
 
+    labels = np.zeros(len(grid), dtype=np.int64)
+    if len(pts) == 0 or len(grid) == 0:
+        return labels
+
+    glat = grid["lat"].to_numpy(dtype=float)
+    glon = grid["lon"].to_numpy(dtype=float)
+    plat = pts["lat"].to_numpy(dtype=float)
+    plon = pts["lon"].to_numpy(dtype=float)
+
+    tree = BallTree(np.radians(np.column_stack([glat, glon])), metric="haversine")
+    r_rad = (radius_miles / 0.621371) / 6371.0088 * (1.0 + 1e-6)
+    candidates = tree.query_radius(np.radians(np.column_stack([plat, plon])), r=r_rad)
+
+    for la, lo, idx in zip(plat, plon, candidates):
+        if len(idx) == 0:
+            continue
+        d = haversine_miles_np(glat[idx], glon[idx], la, lo)
+        labels[idx[d <= radius_miles]] = 1
+    return labels
+
+def hazard_points(pts_by_hazard):
+    """
+    {hazard: DataFrame[lat, lon]} -> (cleaned points of every hazard, uint8
+    HAZARD_BITS flag per point), ready for Grid.label(pts, bits).
+    """
+    frames = []
+    bits = []
+    for hazard, pts in pts_by_hazard.items():
+        pts = clean_points(pts)[["lat", "lon"]]
+        frames.append(pts)
+        bits.append(np.full(len(pts), HAZARD_BITS[hazard], dtype=np.uint8))
+    if not frames:
+        return pd.DataFrame({"lat": [], "lon": []}), np.zeros(0, dtype=np.uint8)
+    return pd.concat(frames, ignore_index=True), np.concatenate(bits)
+
+def label_hazards(grid, pts_by_hazard):
+    """All hazards in one labeling pass: uint8 HAZARD_BITS mask per cell."""
+    pts, bits = hazard_points(pts_by_hazard)
+    return grid.label(pts, bits)
+
+def label_bits(hazards) -> int:
+    """Mask bits behind the plain "label": the tornado bit, or any configured hazard when torn isn't one."""
+    if "torn" in hazards:
+        return HAZARD_BITS["torn"]
+    return sum(HAZARD_BITS[h] for h in hazards)
+
+def hazard_columns(mask, hazards):
+    """Bitmask -> {"label": label_bits(hazards), "label_<hazard>": bit per hazard} (0/1 uint8 each)."""
+    mask = np.asarray(mask, dtype=np.uint8)
+    cols = {"label": ((mask & label_bits(hazards)) > 0).astype(np.uint8)}
+    if list(hazards) != ["torn"]:
+        for hazard in hazards:
+            cols[f"label_{hazard}"] = ((mask & HAZARD_BITS[hazard]) > 0).astype(np.uint8)
+    return cols
+
+def labels_frame(grid, date, labels, hazards=("torn",)):
+    """
+    DataFrame [grid_id, lat, lon, date, label] for a label array in grid_id
+    order; with several hazards, `labels` is the bitmask and label_torn,
+    label_hail, label_wind columns are added.
+    """
+    out = grid.frame.copy()
+    out["date"] = date
+    for name, col in hazard_columns(labels, hazards).items():
+        out[name] = col
+    return out
+
+def make_labels(pts, date, extent, res_deg, radius_miles, grid=None):
+    """
+    Labels one day in memory: clean report points -> grid -> label column.
+    `pts` is the tornado DataFrame[lat, lon], or {hazard: DataFrame} to label
+    several hazards in one pass.
+    `grid` is a Grid (load_grid) to reuse across days; built from the cache if omitted.
+    Returns DataFrame [grid_id, lat, lon, date, label(, label_<hazard>...)] (same as grid_labels.csv).
+    """
+    pts_by_hazard = pts if isinstance(pts, dict) else {"torn": pts}
+    if grid is None:
+        grid = load_grid(extent, res_deg, radius_miles)
+    return labels_frame(grid, date, label_hazards(grid, pts_by_hazard), list(pts_by_hazard))
+
+def write_labels_tiled(grid, pts_by_hazard, date, out_csv, tile_rows=TILE_ROWS):
+    """
+    Streams grid_labels.csv tile by tile (high-resolution mode): only one
+    tile of labels and rows is in memory at a time. `pts_by_hazard` is as in
+    make_labels. Returns the "label" positive count (see label_bits).
+    """
+    if not isinstance(pts_by_hazard, dict):
+        pts_by_hazard = {"torn": pts_by_hazard}
+    hazards = list(pts_by_hazard)
+    pts, bits = hazard_points(pts_by_hazard)
+    n_hits = 0
+    with open(out_csv, "w", encoding="utf-8", newline="") as f:
+        for row0, tile in grid.iter_label_tiles(pts, tile_rows, bits=bits):
+            out = grid.frame_rows(row0, row0 + len(tile))
+            out["date"] = date
+            for name, col in hazard_columns(tile.ravel(), hazards).items():
+                out[name] = col
+            out.to_csv(f, index=False, header=(row0 == 0))
+            n_hits += int(out["label"].sum())
+    return n_hits
+
+def main():
+    cfg = read_config()
+
+    pts_by_hazard = {}
+    for hazard in cfg["hazards"]:
+        pts_path = f"data/{hazard}_points.csv"
+        if not os.path.exists(pts_path):
+            print(f"Missing {pts_path}. Run 02_compute_tpi.py first.", file=sys.stderr)
+            sys.exit(1)
+        pts_by_hazard[hazard] = pd.read_csv(pts_path)
+        if not {"lat", "lon"}.issubset(set(pts_by_hazard[hazard].columns)):
+            print(f"{hazard}_points.csv must have columns: lat, lon", file=sys.stderr)
+            sys.exit(1)
+    n_pts = sum(len(p) for p in pts_by_hazard.values())
+
+    radius = float(cfg["radius_miles"])
     out_csv = cfg["out_csv"]
     os.makedirs(os.path.dirname(out_csv) or ".", exist_ok=True)
-    out.to_csv(out_csv, index=False)
 
-    n_hits = int(out["label"].sum())
+    metrics = importlib.import_module("12_stage_metrics").from_env()
+    with metrics.stage("grid", cfg["date"]) as st:
+        grid = grid_from_config(cfg)
+        st.update(rows_out=grid.n_cells)
+    if grid.has_stencil:
+        with metrics.stage("labels", cfg["date"]) as st:
+            out = make_labels(pts_by_hazard, cfg["date"], cfg["extent"], cfg["grid_res_deg"], radius, grid=grid)
+            st.update(rows_in=n_pts, rows_out=len(out))
+        with metrics.stage("write_labels", cfg["date"]) as st:
+            out.to_csv(out_csv, index=False)
+            st.update(rows_out=len(out), bytes_out=os.path.getsize(out_csv))
+        n_hits = int(out["label"].sum())
+    else:
+        # High-resolution mode: raster labels streamed to disk in tiles
+        with metrics.stage("labels_tiled", cfg["date"]) as st:
+            n_hits = write_labels_tiled(grid, pts_by_hazard, cfg["date"], out_csv)
+            st.update(rows_in=n_pts, rows_out=grid.n_cells, bytes_out=os.path.getsize(out_csv))
+
     print(f"Saved grid labels -> {out_csv}")
-    print(f"Grid points: {len(out)} | Positive-labeled points (within {radius} mi of report): {n_hits}")
+    print(f"Grid points: {grid.n_cells} | Positive-labeled points (within {radius} mi of report): {n_hits}")
+    if grid.has_stencil and len(pts_by_hazard) > 1:
+        print("Per hazard: " + " ".join(f"{h}={int(out[f'label_{h}'].sum())}" for h in pts_by_hazard))
     if cfg["date"]:
         print(f"Date: {cfg['date']}")
 
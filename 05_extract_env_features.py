@@ -1,20 +1,396 @@
 import os
 import sys
+import json
 import math
+import hashlib
+import importlib
+import numpy as np
 import pandas as pd
 from datetime import datetime
 
+CLIM_DIR = "data/climatology"
+CLIM_HALF_WINDOW = 15    # days either side of the day of year averaged into "clim"
+N_DOY = 366
+
+ENV_DIR = "data/env_store"
+ENV_BLOCK_DAYS = 32      # dates gathered per read when extracting
+
 def read_config_date():
-    date = None
-    with open("config.yml", "r", encoding="utf-8") as f:
-        for line in f:
-            s = line.strip()
-            if s.startswith("date:"):
-                date = s.split(":", 1)[1].strip().strip('"').strip("'")
-                break
-    return date
+    return importlib.import_module("00_config").load()["date"]
+
+def add_season_features(df, date):
+    """In-process feature stage: adds doy, doy_sin, doy_cos for `date` (YYYY-MM-DD)."""
+    dt = datetime.strptime(date, "%Y-%m-%d")
+    doy = dt.timetuple().tm_yday
+    # cyclic season encoding
+    angle = 2 * math.pi * (doy / 365.25)
+
+    out = df.copy()
+    out["doy"] = doy
+    out["doy_sin"] = math.sin(angle)
+    out["doy_cos"] = math.cos(angle)
+    return out
+
+def season_arrays(dates):
+    """Vectorized twin of add_season_features: (doy, doy_sin, doy_cos) arrays for many dates."""
+    d = np.asarray(dates, dtype="datetime64[D]")
+    doy = (d - d.astype("datetime64[Y]")).astype(np.int64) + 1
+    angle = 2 * np.pi * (doy / 365.25)
+    return doy, np.sin(angle), np.cos(angle)
+
+# ---------------- climatology index ----------------
+class ClimatologyIndex:
+    """
+    Per-cell report climatology from the accumulated labels, built once:
+
+      cum.npy     int32 (N_DOY + 1, n_cells); cum[k] = positive days of doy 1..k
+      days.npy    int64 (N_DOY + 1,); days[k] = dates seen with doy 1..k
+      dates.npy   datetime64[D] dates the index was built from
+      meta.json   grid settings/hazard of the source labels
+
+    cum.npy is memory-mapped, so the frequency of reports near a cell for any
+    day-of-year window is two row lookups (windows wrap around the year end).
+    """
+
+    def __init__(self, root=CLIM_DIR):
+        self.root = root
+
+    def exists(self) -> bool:
+        return os.path.exists(os.path.join(self.root, "meta.json"))
+
+    def meta(self) -> dict:
+        with open(os.path.join(self.root, "meta.json"), "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def build(self, store, hazard="torn", chunk_days=64) -> None:
+        """Counts positives per (doy, cell) over every date in a MasterStore, chunk_days at a time."""
+        bit = importlib.import_module("04_make_grid_and_labels").HAZARD_BITS[hazard]
+        if hazard not in store.hazards():
+            raise ValueError(f"{store.root} has no {hazard} labels (hazards: {store.hazards()})")
+        dates = store.dates()
+        labels = store.labels()
+        doy = season_arrays(dates)[0]
+        counts = np.zeros((N_DOY + 1, store.n_cells), dtype=np.int32)
+        for i in range(0, len(dates), chunk_days):
+            hit = (np.asarray(labels[i:i + chunk_days]) & bit) > 0
+            np.add.at(counts, doy[i:i + chunk_days], hit.astype(np.int32))
+        days = np.bincount(doy, minlength=N_DOY + 1).astype(np.int64)
+
+        os.makedirs(self.root, exist_ok=True)
+        cum = np.lib.format.open_memmap(os.path.join(self.root, "cum.npy.tmp"), mode="w+",
+                                        dtype=np.int32, shape=counts.shape)
+        np.cumsum(counts, axis=0, out=cum)
+        cum.flush()
+        del cum
+        os.replace(os.path.join(self.root, "cum.npy.tmp"), os.path.join(self.root, "cum.npy"))
+        np.save(os.path.join(self.root, "days.npy"), np.cumsum(days))
+        np.save(os.path.join(self.root, "dates.npy"), dates)
+        with open(os.path.join(self.root, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump(dict(store.settings(), hazard=hazard, n_cells=store.n_cells, n_dates=int(len(dates)),
+                           first=str(dates[0]) if len(dates) else None,
+                           last=str(dates[-1]) if len(dates) else None), f, indent=2)
+
+    def load(self):
+        self.cum = np.load(os.path.join(self.root, "cum.npy"), mmap_mode="r")
+        self.days = np.load(os.path.join(self.root, "days.npy"))
+        self.dates = np.load(os.path.join(self.root, "dates.npy"))
+        self.n_cells = self.cum.shape[1]
+        self.hazard = self.meta()["hazard"]
+        return self
+
+    def _window(self, table, doy, half, cells=None):
+        """
+        Sum of table's per-doy values over doy-half..doy+half from the
+        cumulative rows: whole rows per doy, or one value per (doy, cell) pair.
+        """
+        def upto(k):
+            # cumulative sum through doy k for any integer k (whole years wrap)
+            turns, k = np.divmod(k, N_DOY)
+            if table.ndim == 1:
+                return table[k] + turns * table[N_DOY]
+            if cells is None:
+                return table[k] + turns[:, None] * table[N_DOY]
+            return table[k, cells] + turns * table[N_DOY, cells]
+        return upto(doy + half) - upto(doy - half - 1)
+
+    def frequency(self, dates, half=CLIM_HALF_WINDOW, own_labels=None):
+        """
+        (n_dates, n_cells) float32: share of seen days within +-half days of
+        each date's day of year that had a report near the cell. Dates the
+        index was built from leave themselves out when their own labels
+        ((n_dates, n_cells), the same hazard) are given.
+        """
+        dates = np.asarray(dates, dtype="datetime64[D]")
+        doy = season_arrays(dates)[0]
+        hits = self._window(self.cum, doy, half).astype(np.float64)
+        days = self._window(self.days, doy, half).astype(np.float64)[:, None]
+        if own_labels is not None:
+            own = np.isin(dates, self.dates)[:, None]
+            hits -= own * (np.asarray(own_labels) > 0)
+            days = days - own
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(days > 0, hits / days, 0.0).astype(np.float32)
+
+    def own_labels(self, dates, store=None):
+        """
+        (n_dates, n_cells) bool own_labels for frequency: the index hazard's
+        labels of dates the index was built from, read back from the master
+        store (09), False rows for the rest. Raises ValueError if the store no
+        longer holds one of those dates.
+        """
+        dates = np.asarray(dates, dtype="datetime64[D]")
+        out = np.zeros((len(dates), self.n_cells), dtype=bool)
+        own = np.flatnonzero(np.isin(dates, self.dates))
+        if not len(own):
+            return out
+        store = store or importlib.import_module("09_build_dataset").MasterStore()
+        row_of = {d: i for i, d in enumerate(store.dates())} if store.exists() else {}
+        missing = [str(d) for d in dates[own] if d not in row_of]
+        if missing or store.n_cells != self.n_cells:
+            raise ValueError(f"{store.root} doesn't hold the labels {self.root} was built from "
+                             f"(e.g. {missing[:1] or 'another grid'}); rebuild it with BUILD_CLIMATOLOGY=1")
+        bit = importlib.import_module("04_make_grid_and_labels").HAZARD_BITS[self.hazard]
+        labels = store.labels()
+        out[own] = (np.asarray(labels[[row_of[d] for d in dates[own]]]) & bit) > 0
+        return out
+
+    def lookup(self, dates, cells, half=CLIM_HALF_WINDOW, own_labels=None):
+        """Row-wise twin of frequency: one value per (date, grid_id) pair."""
+        dates = np.asarray(dates, dtype="datetime64[D]")
+        cells = np.asarray(cells, dtype=np.int64)
+        doy = season_arrays(dates)[0]
+        hits = self._window(self.cum, doy, half, cells).astype(np.float64)
+        days = self._window(self.days, doy, half).astype(np.float64)
+        if own_labels is not None:
+            own = np.isin(dates, self.dates)
+            hits -= own * (np.asarray(own_labels) > 0)
+            days = days - own
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(days > 0, hits / days, 0.0).astype(np.float32)
+
+def add_climatology(df, index, half=CLIM_HALF_WINDOW):
+    """
+    Adds "clim" to a labels/training frame (grid_id, date[, label]) in one
+    vectorized join; rows from dates in the index leave their own label out.
+    """
+    dates = np.asarray(pd.to_datetime(df["date"]).to_numpy(), dtype="datetime64[D]")
+    if df["grid_id"].max() >= index.n_cells:
+        raise ValueError(f"Climatology index has {index.n_cells} cells; labels have grid_id up to {df['grid_id'].max()}")
+    own_col = "label" if index.hazard == "torn" else f"label_{index.hazard}"
+    own = df[own_col].to_numpy() if own_col in df.columns else None
+    out = df.copy()
+    out["clim"] = index.lookup(dates, df["grid_id"].to_numpy(), half, own)
+    return out
+
+# ---------------- gridded environmental fields ----------------
+class EnvStore:
+    """
+    Daily gridded environmental fields (CAPE, shear, ...) on one regular
+    lat/lon source grid, chunked by field and year:
+
+      meta.json                 source grid axes + field names
+      fields/<name>/YYYY.npy    float32 (N_DOY, n_lat, n_lon), row doy-1; NaN = not loaded
+      weights/<key>.npz         bilinear interpolation weights for one target grid
+
+    Chunks are memory-mapped, so extracting a date range only reads those
+    days' rows. Targets (our grid cells) map to 4 source points + weights
+    once (interp_weights, cached on disk); extract() then samples N fields
+    for a whole date range with one gather and weighted sum per block.
+    """
+
+    def __init__(self, root=ENV_DIR):
+        self.root = root
+
+    def exists(self) -> bool:
+        return os.path.exists(os.path.join(self.root, "meta.json"))
+
+    def meta(self) -> dict:
+        with open(os.path.join(self.root, "meta.json"), "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def init(self, lats, lons) -> None:
+        """Fixes the source grid (1-D axes, either order); refuses a different one later."""
+        want = {"lat": [float(v) for v in lats], "lon": [float(v) for v in lons]}
+        if len(want["lat"]) < 2 or len(want["lon"]) < 2:
+            raise ValueError("Source grid needs at least 2 points per axis")
+        if self.exists():
+            have = self.meta()
+            if have["lat"] != want["lat"] or have["lon"] != want["lon"]:
+                raise ValueError(f"{self.root} holds fields on another source grid; move it away to start over")
+            return
+        os.makedirs(self.root, exist_ok=True)
+        with open(os.path.join(self.root, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump(dict(want, fields=[]), f)
+
+    def axes(self):
+        meta = self.meta()
+        return np.asarray(meta["lat"]), np.asarray(meta["lon"])
+
+    def fields(self):
+        return self.meta()["fields"]
+
+    def chunk_path(self, field, year) -> str:
+        return os.path.join(self.root, "fields", field, f"{int(year):04d}.npy")
+
+    def chunk(self, field, year, mode="r"):
+        """A field's year as a memory map (N_DOY, n_lat, n_lon), or None if nothing was loaded."""
+        path = self.chunk_path(field, year)
+        if not os.path.exists(path):
+            return None
+        return np.load(path, mmap_mode=mode)
+
+    def write(self, field, dates, values) -> None:
+        """Stores values (n_dates, n_lat, n_lon) of one field for `dates`, into the year chunks."""
+        dates = np.asarray(dates, dtype="datetime64[D]")
+        values = np.asarray(values, dtype=np.float32)
+        lats, lons = self.axes()
+        if values.shape != (len(dates), len(lats), len(lons)):
+            raise ValueError(f"{field}: expected {(len(dates), len(lats), len(lons))}, got {values.shape}")
+        years = dates.astype("datetime64[Y]").astype(int) + 1970
+        doy = season_arrays(dates)[0]
+        for year in np.unique(years):
+            sel = years == year
+            path = self.chunk_path(field, year)
+            if not os.path.exists(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                chunk = np.lib.format.open_memmap(path, mode="w+", dtype=np.float32,
+                                                  shape=(N_DOY, len(lats), len(lons)))
+                chunk[:] = np.nan
+            else:
+                chunk = self.chunk(field, year, mode="r+")
+            chunk[doy[sel] - 1] = values[sel]
+            chunk.flush()
+        meta = self.meta()
+        if field not in meta["fields"]:
+            meta["fields"].append(field)
+            with open(os.path.join(self.root, "meta.json"), "w", encoding="utf-8") as f:
+                json.dump(meta, f)
+
+    def interp_weights(self, lat, lon):
+        """
+        Bilinear weights from target points (flat lat/lon arrays, e.g. one per
+        grid_id) to the source grid: (idx (n, 4) flat source index, w (n, 4)).
+        Targets outside the source grid take the nearest edge values.
+        Cached under weights/ by source grid + targets.
+        """
+        lat = np.asarray(lat, dtype=np.float64)
+        lon = np.asarray(lon, dtype=np.float64)
+        src_lat, src_lon = self.axes()
+        if src_lon.max() > 180:
+            lon = np.mod(lon, 360.0)
+        h = hashlib.sha1(json.dumps([src_lat.tolist(), src_lon.tolist()]).encode())
+        h.update(lat.tobytes())
+        h.update(lon.tobytes())
+        path = os.path.join(self.root, "weights", f"{h.hexdigest()}.npz")
+        if os.path.exists(path):
+            with np.load(path) as z:
+                return z["idx"], z["w"]
+
+        def bracket(axis, v):
+            # lower/upper source index around v and the fraction between them
+            order = np.argsort(axis)
+            a = axis[order]
+            i = np.clip(np.searchsorted(a, v, side="right") - 1, 0, len(a) - 2)
+            t = np.clip((v - a[i]) / (a[i + 1] - a[i]), 0.0, 1.0)
+            return order[i], order[i + 1], t
+
+        y0, y1, ty = bracket(src_lat, lat)
+        x0, x1, tx = bracket(src_lon, lon)
+        n_lon = len(src_lon)
+        idx = np.stack([y0 * n_lon + x0, y0 * n_lon + x1, y1 * n_lon + x0, y1 * n_lon + x1], axis=1)
+        w = np.stack([(1 - ty) * (1 - tx), (1 - ty) * tx, ty * (1 - tx), ty * tx], axis=1).astype(np.float32)
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp.npz"
+        np.savez(tmp, idx=idx, w=w)
+        os.replace(tmp, path)
+        return idx, w
+
+    def extract(self, fields, dates, weights, block_days=ENV_BLOCK_DAYS):
+        """
+        Samples `fields` at every target point for every date:
+        float32 (n_dates, n_points, n_fields); NaN where a field/day isn't loaded.
+        """
+        idx, w = weights
+        dates = np.asarray(dates, dtype="datetime64[D]")
+        out = np.full((len(dates), len(idx), len(fields)), np.nan, dtype=np.float32)
+        years = dates.astype("datetime64[Y]").astype(int) + 1970
+        doy = season_arrays(dates)[0]
+        for year in np.unique(years):
+            sel = np.flatnonzero(years == year)
+            for k, field in enumerate(fields):
+                chunk = self.chunk(field, year)
+                if chunk is None:
+                    continue
+                flat = chunk.reshape(N_DOY, -1)
+                for i in range(0, len(sel), block_days):
+                    rows = sel[i:i + block_days]
+                    vals = flat[doy[rows] - 1][:, idx]    # (days, points, 4)
+                    out[rows, :, k] = np.einsum("dpj,pj->dp", vals, w)
+        return out
+
+    def ingest_npz(self, path) -> list:
+        """
+        Loads fields from an .npz with `lat`, `lon` (1-D source axes),
+        `dates` (YYYY-MM-DD) and one (n_dates, n_lat, n_lon) array per field.
+        Returns the field names written.
+        """
+        with np.load(path, allow_pickle=False) as z:
+            self.init(z["lat"], z["lon"])
+            dates = np.asarray(z["dates"]).astype("datetime64[D]")
+            names = [k for k in z.files if k not in ("lat", "lon", "dates")]
+            for name in names:
+                self.write(name, dates, z[name])
+        return names
+
+def add_env_features(df, store, fields=None):
+    """Adds one column per env field to a labels/training frame (lat, lon, date), sampled at each row."""
+    fields = list(fields or store.fields())
+    cells = df.drop_duplicates("grid_id") if "grid_id" in df.columns else df
+    idx, w = store.interp_weights(cells["lat"].to_numpy(), cells["lon"].to_numpy())
+    dates = np.asarray(pd.to_datetime(df["date"]).to_numpy(), dtype="datetime64[D]")
+    uniq, date_row = np.unique(dates, return_inverse=True)
+    vals = store.extract(fields, uniq, (idx, w))
+    if "grid_id" in df.columns:
+        point = pd.Index(cells["grid_id"]).get_indexer(df["grid_id"])
+    else:
+        point = np.arange(len(df))
+    out = df.copy()
+    for k, field in enumerate(fields):
+        out[field] = vals[date_row, point, k]
+    return out
+
+def main_build_climatology():
+    """BUILD_CLIMATOLOGY=1: (re)builds data/climatology/ from data/master_v0/."""
+    build = importlib.import_module("09_build_dataset")
+    store = build.MasterStore()
+    if not store.exists() or not len(store.dates()):
+        print("Missing data/master_v0. Run 09_build_dataset.py first.", file=sys.stderr)
+        sys.exit(1)
+    index = ClimatologyIndex()
+    try:
+        index.build(store, os.environ.get("CLIM_HAZARD", "torn"))
+    except ValueError as e:
+        print(str(e), file=sys.stderr)
+        sys.exit(1)
+    meta = index.meta()
+    print(f"Saved climatology index -> {index.root} ({meta['n_dates']} days {meta['first']} -> {meta['last']}, "
+          f"{meta['n_cells']} cells)")
 
 def main():
+    if os.environ.get("BUILD_CLIMATOLOGY", "0") == "1":
+        return main_build_climatology()
+    # ENV_INGEST=fields.npz loads gridded fields into data/env_store/ (see EnvStore.ingest_npz)
+    if os.environ.get("ENV_INGEST"):
+        env = EnvStore()
+        try:
+            names = env.ingest_npz(os.environ["ENV_INGEST"])
+        except (OSError, KeyError, ValueError) as e:
+            print(f"{os.environ['ENV_INGEST']}: {e}", file=sys.stderr)
+            sys.exit(1)
+        print(f"Saved fields {names} -> {env.root}")
+        return
+
     labels_csv = "data/grid_labels.csv"
     if not os.path.exists(labels_csv):
         print("Missing data/grid_labels.csv. Run 04_make_grid_and_labels.py first.", file=sys.stderr)
@@ -30,20 +406,35 @@ def main():
         print("Missing date (config.yml date: or date column).", file=sys.stderr)
         sys.exit(1)
 
-    dt = datetime.strptime(date, "%Y-%m-%d")
-    doy = dt.timetuple().tm_yday
-    # cyclic season encoding
-    angle = 2 * math.pi * (doy / 365.25)
+    metrics = importlib.import_module("12_stage_metrics").from_env()
+    with metrics.stage("features", date) as st:
+        out = add_season_features(df, date)
+        st.update(bytes_in=os.path.getsize(labels_csv), rows_in=len(df), rows_out=len(out))
 
-    out = df.copy()
-    out["doy"] = doy
-    out["doy_sin"] = math.sin(angle)
-    out["doy_cos"] = math.cos(angle)
+    # Climatology feature, once data/climatology/ is built (BUILD_CLIMATOLOGY=1)
+    index = ClimatologyIndex()
+    if index.exists():
+        with metrics.stage("climatology", date) as st:
+            try:
+                out = add_climatology(out.assign(date=date), index.load())
+            except ValueError as e:
+                print(str(e), file=sys.stderr)
+                sys.exit(1)
+            st.update(rows_in=len(out), rows_out=len(out))
+
+    # Gridded environmental fields, once data/env_store/ holds some (ENV_INGEST=...)
+    env = EnvStore()
+    if env.exists() and env.fields():
+        with metrics.stage("env_features", date) as st:
+            out = add_env_features(out.assign(date=date), env)
+            st.update(rows_in=len(out), rows_out=len(out))
 
     # Features we’ll train on (v0)
     out_path = "data/train_v0.csv"
     os.makedirs("data", exist_ok=True)
-    out.to_csv(out_path, index=False)
+    with metrics.stage("write_features", date) as st:
+        out.to_csv(out_path, index=False)
+        st.update(rows_out=len(out), bytes_out=os.path.getsize(out_path))
     print(f"Saved training table -> {out_path} (rows={len(out)})")
 
 if __name__ == "__main__":
@@ -1,47 +1,442 @@
 import os
 import sys
+import json
+import shutil
+import importlib
+from datetime import datetime
+import numpy as np
 import pandas as pd
+import sklearn
 from sklearn.model_selection import train_test_split
-from sklearn.linear_model import LogisticRegression
+from sklearn.linear_model import LogisticRegression, SGDClassifier
+from sklearn.pipeline import Pipeline, make_pipeline
+from sklearn.preprocessing import StandardScaler
 from sklearn.metrics import brier_score_loss, roc_auc_score
 import joblib
 
-def main():
+MODEL_PATH = "models/nadocast_v0_logreg.joblib"
+PARITY_TOL = 1e-9
+AUC_BINS = 10000
+CV_DIR = "data/scratch/cv"
+CV_RESULTS = "data/cv_results.csv"
+CV_BLOCK_ROWS = 1_000_000   # memory-mapped CV rows gathered per block in fit_fold
+
+# Candidates for the CV sweep; every model is fit on standardized features
+SWEEP_GRID = (
+    [{"model": "logreg", "C": C, "class_weight": cw} for C in (0.01, 0.1, 1.0, 10.0) for cw in ("balanced", None)]
+    + [{"model": "sgd", "alpha": a, "class_weight": "balanced"} for a in (1e-5, 1e-4, 1e-3)]
+)
+
+def use_sample(store) -> bool:
+    """Train on the store's negative-downsampled rows (09 NEG_FRAC) when they are current; TRAIN_SAMPLE=0 opts out."""
+    meta = store.sample_meta()
+    if meta is None or os.environ.get("TRAIN_SAMPLE", "1") != "1":
+        return False
+    print(f"Using sample {store.sample_dir} ({meta['n_rows']} rows, negatives kept at {meta['neg_frac']:g}, weighted)")
+    return True
+
+def balanced_weights(y, w):
+    """
+    Sample weights times class_weight="balanced" factors computed from the
+    weighted class totals, so a downsampled table gets the same effective
+    weights as the full one (with w all ones this is exactly "balanced").
+    """
+    y = np.asarray(y).astype(int)
+    totals = np.bincount(y, weights=w, minlength=2)[:2]
+    return w * (totals.sum() / (2.0 * totals))[y]
+
+def load_xy(feat_cols):
+    """
+    Training data: the compact master store from 09_build_dataset.py when it
+    exists (memory-mapped labels, no CSV parsing; its weighted sample when
+    there is one), else the single-day data/train_v0.csv.
+    Returns (X, y, sample weight).
+    """
+    build = importlib.import_module("09_build_dataset")
+    store = build.MasterStore()
+    if store.exists() and len(store.dates()):
+        print(f"Training on {store.root} ({len(store.dates())} days x {store.n_cells} cells)")
+        X, y, w = store.xyw(feat_cols, sampled=use_sample(store))
+        return X, y.astype(int), w.astype(np.float64)
+
     path = "data/train_v0.csv"
     if not os.path.exists(path):
-        print("Missing data/train_v0.csv. Run 05_make_features_v0.py first.", file=sys.stderr)
+        print("Missing data/train_v0.csv. Run 05_extract_env_features.py (or 09_build_dataset.py) first.", file=sys.stderr)
         sys.exit(1)
 
     df = pd.read_csv(path)
-
-    feat_cols = ["lat", "lon", "doy_sin", "doy_cos"]
     if not set(feat_cols + ["label"]).issubset(df.columns):
         print("Missing required columns in train_v0.csv", file=sys.stderr)
         sys.exit(1)
+    w = df["weight"].to_numpy(dtype=np.float64) if "weight" in df.columns else np.ones(len(df))
+    return df[feat_cols].values, df["label"].astype(int).values, w
+
+def save_model(pack, path=MODEL_PATH):
+    """Writes the model pack via a temp file so readers (11_serve_forecasts.py) never see half a file."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + ".tmp"
+    joblib.dump(pack, tmp)
+    os.replace(tmp, path)
+
+def compact_spec(model, feat_cols, cfg):
+    """
+    Compact, versioned description of a linear model (LogisticRegression or
+    log-loss SGD, optionally behind a StandardScaler) for 07's NumPy-only
+    CompactModel. Returns None for models it cannot express.
+    """
+    forecast_stage = importlib.import_module("07_forecast_day_v0")
+    scaler, clf = None, model
+    if isinstance(model, Pipeline):
+        if len(model.steps) > 2 or (len(model.steps) == 2 and not isinstance(model.steps[0][1], StandardScaler)):
+            return None
+        scaler, clf = (model.steps[0][1] if len(model.steps) == 2 else None), model.steps[-1][1]
+    linear = isinstance(clf, LogisticRegression) or (isinstance(clf, SGDClassifier) and clf.loss == "log_loss")
+    if not linear or clf.coef_.shape[0] != 1:
+        return None
+    return {
+        "format": forecast_stage.COMPACT_FORMAT,
+        "version": forecast_stage.COMPACT_VERSION,
+        "features": list(feat_cols),
+        "mean": scaler.mean_.tolist() if scaler is not None else None,
+        "scale": scaler.scale_.tolist() if scaler is not None else None,
+        "coef": clf.coef_[0].tolist(),
+        "intercept": float(clf.intercept_[0]),
+        "classes": [int(c) for c in clf.classes_],
+        "grid": {k: cfg[k] for k in ("extent", "grid_res_deg", "radius_miles")},
+        "sklearn_version": sklearn.__version__,
+        "created": datetime.utcnow().isoformat() + "Z",
+    }
+
+def export_compact(model, feat_cols, path=None):
+    """
+    Writes the compact JSON next to the joblib pack and checks that the
+    NumPy-only scorer reproduces predict_proba over the full grid (one date
+    per season). Returns the max abs difference, or None if not exportable.
+    """
+    forecast_stage = importlib.import_module("07_forecast_day_v0")
+    label_stage = importlib.import_module("04_make_grid_and_labels")
+    path = path or forecast_stage.COMPACT_PATH
+    cfg = label_stage.read_config()
+    spec = compact_spec(model, feat_cols, cfg)
+    if spec is None:
+        if os.path.exists(path):
+            os.remove(path)
+        print(f"No compact export for {type(model).__name__}")
+        return None
+
+    lats, lons = label_stage.grid_axes(cfg["extent"], cfg["grid_res_deg"])
+    dates = np.array(["2001-01-15", "2001-04-15", "2001-07-15", "2001-10-15"], dtype="datetime64[D]")
+    worst = forecast_stage.parity_check(model, forecast_stage.CompactModel(spec), feat_cols, lats, lons, dates)
+    if worst > PARITY_TOL:
+        raise ValueError(f"Compact model parity check failed: max |dp| = {worst:.3g}")
+
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(spec, f, indent=2)
+    os.replace(tmp, path)
+    print(f"Saved compact model -> {path} (grid parity max |dp| = {worst:.1e})")
+    return worst
+
+# ---------------- streaming (out-of-core) mode ----------------
+class StreamingScores:
+    """
+    Holdout metrics accumulated chunk by chunk: Brier from running sums, AUC
+    from per-class histograms of the predicted probability (AUC_BINS bins, so
+    it matches the exact AUC to ~1/AUC_BINS).
+    """
 
-    X = df[feat_cols].values
-    y = df["label"].astype(int).values
+    def __init__(self, n_bins=AUC_BINS):
+        self.n_bins = n_bins
+        self.pos = np.zeros(n_bins, dtype=np.float64)
+        self.neg = np.zeros(n_bins, dtype=np.float64)
+        self.sq_err = 0.0
+        self.n = 0
+        self.w_sum = 0.0
+
+    def update(self, y, p, w=None) -> None:
+        """Adds a chunk; `w` are sample weights (e.g. negative-downsampling weights)."""
+        y = np.asarray(y).astype(bool)
+        p = np.asarray(p, dtype=np.float64)
+        w = np.ones(len(p)) if w is None else np.asarray(w, dtype=np.float64)
+        self.sq_err += float(np.sum(w * (p - y) ** 2))
+        self.n += len(p)
+        self.w_sum += float(w.sum())
+        b = np.minimum((p * self.n_bins).astype(np.int64), self.n_bins - 1)
+        self.pos += np.bincount(b[y], weights=w[y], minlength=self.n_bins)
+        self.neg += np.bincount(b[~y], weights=w[~y], minlength=self.n_bins)
+
+    def brier(self) -> float:
+        return self.sq_err / self.w_sum if self.w_sum else float("nan")
+
+    def auc(self) -> float:
+        n_pos, n_neg = self.pos.sum(), self.neg.sum()
+        if n_pos == 0 or n_neg == 0:
+            return float("nan")
+        # P(score_pos > score_neg), ties within a bin count half
+        neg_below = np.cumsum(self.neg) - self.neg
+        return float(np.sum(self.pos * (neg_below + 0.5 * self.neg)) / (n_pos * n_neg))
+
+def split_dates(n_dates, holdout_frac, seed=42):
+    """Date-level holdout: row indices of the train and held-out dates (each sorted)."""
+    order = np.random.default_rng(seed).permutation(n_dates)
+    n_test = max(1, int(round(n_dates * holdout_frac))) if n_dates > 1 else 0
+    return np.sort(order[n_test:]), np.sort(order[:n_test])
+
+def iter_chunks(store, feat_cols, rows, chunk_days, sampled=False):
+    """Yields (X, y, w) for `rows` (master date indices), chunk_days dates at a time."""
+    for i in range(0, len(rows), chunk_days):
+        X, y, w = store.xyw(feat_cols, rows=np.sort(rows[i:i + chunk_days]), sampled=sampled)
+        yield X, y.astype(int), w.astype(np.float64)
+
+def train_streaming(store, feat_cols, *, chunk_days=30, epochs=3, holdout_frac=0.2, seed=42, sampled=False):
+    """
+    Fits a scaled SGD logistic regression over the master store without ever
+    holding more than chunk_days dates of rows in memory:
+
+      pass 1      StandardScaler.partial_fit + class counts (balanced weights)
+      epochs      SGDClassifier.partial_fit on train dates, shuffled into new
+                  chunks every epoch
+      evaluation  StreamingScores over the held-out dates
+
+    With sampled=True only the store's downsampled rows are read, and their
+    weights go into the scaler, the class totals, the fit and the scores.
+    Returns (model pipeline, StreamingScores).
+    """
+    train_rows, test_rows = split_dates(len(store.dates()), holdout_frac, seed)
+    scaler = StandardScaler()
+    counts = np.zeros(2, dtype=np.float64)
+    for X, y, w in iter_chunks(store, feat_cols, train_rows, chunk_days, sampled):
+        scaler.partial_fit(X, sample_weight=w)
+        counts += np.bincount(y, weights=w, minlength=2)[:2]
+    if counts.min() == 0:
+        raise ValueError("Need both 0s and 1s in the training dates. Use more days.")
+
+    # Same weights class_weight="balanced" would give on the full table
+    weights = {c: counts.sum() / (2.0 * counts[c]) for c in (0, 1)}
+    clf = SGDClassifier(loss="log_loss", alpha=1e-5, class_weight=weights, random_state=seed)
+    rng = np.random.default_rng(seed)
+    for epoch in range(epochs):
+        for X, y, w in iter_chunks(store, feat_cols, rng.permutation(train_rows), chunk_days, sampled):
+            clf.partial_fit(scaler.transform(X), y, classes=np.array([0, 1]), sample_weight=w)
+        print(f"Epoch {epoch + 1}/{epochs} done ({len(train_rows)} train days)")
+
+    model = make_pipeline(scaler, clf)
+    scores = StreamingScores()
+    for X, y, w in iter_chunks(store, feat_cols, test_rows, chunk_days, sampled):
+        scores.update(y, model.predict_proba(X)[:, 1], w)
+    return model, scores
+
+def main_streaming(feat_cols):
+    build = importlib.import_module("09_build_dataset")
+    store = build.MasterStore()
+    if not (store.exists() and len(store.dates()) > 1):
+        print("Streaming mode needs a master store with 2+ days. Run 09_build_dataset.py first.", file=sys.stderr)
+        sys.exit(1)
+
+    chunk_days = int(os.environ.get("CHUNK_DAYS", "30"))
+    epochs = int(os.environ.get("EPOCHS", "3"))
+    holdout_frac = float(os.environ.get("HOLDOUT_FRAC", "0.2"))
+    print(f"Streaming {store.root} ({len(store.dates())} days x {store.n_cells} cells, {chunk_days} days/chunk)")
+    try:
+        model, scores = train_streaming(store, feat_cols, chunk_days=chunk_days, epochs=epochs,
+                                        holdout_frac=holdout_frac, sampled=use_sample(store))
+    except ValueError as e:
+        print(str(e), file=sys.stderr)
+        sys.exit(1)
+
+    save_model({"model": model, "features": feat_cols})
+    print(f"Saved model -> {MODEL_PATH}")
+    try:
+        export_compact(model, feat_cols)
+    except ValueError as e:
+        print(str(e), file=sys.stderr)
+        sys.exit(1)
+    print(f"Holdout ({scores.n} rows) Brier: {scores.brier():.6f} | AUC: {scores.auc():.4f}")
+
+# ---------------- date-grouped CV sweep ----------------
+def make_model(params):
+    if params["model"] == "logreg":
+        clf = LogisticRegression(C=params["C"], class_weight=params["class_weight"], max_iter=1000)
+    elif params["model"] == "sgd":
+        clf = SGDClassifier(loss="log_loss", alpha=params["alpha"], class_weight=params["class_weight"], random_state=42)
+    else:
+        raise ValueError(f"Unknown model: {params['model']}")
+    return make_pipeline(StandardScaler(), clf)
+
+def config_name(params) -> str:
+    return " ".join(f"{k}={v}" for k, v in params.items())
+
+def write_cv_arrays(feat_cols, cv_dir=CV_DIR, chunk_days=30):
+    """
+    Writes the training table once as .npy files in cv_dir (X, y, sample
+    weight and date index per row) so CV workers can memory-map it instead
+    of each receiving a copy. Master-store rows (its weighted sample when
+    there is one) are filled chunk_days dates at a time; otherwise
+    data/train_v0.csv is used. Returns the number of dates.
+    """
+    os.makedirs(cv_dir, exist_ok=True)
+    build = importlib.import_module("09_build_dataset")
+    store = build.MasterStore()
+    if store.exists() and len(store.dates()):
+        n_dates = len(store.dates())
+        sampled = use_sample(store)
+        n_rows = store.sample_meta()["n_rows"] if sampled else n_dates * store.n_cells
+        X = np.lib.format.open_memmap(os.path.join(cv_dir, "X.npy"), mode="w+", dtype=np.float64, shape=(n_rows, len(feat_cols)))
+        y = np.lib.format.open_memmap(os.path.join(cv_dir, "y.npy"), mode="w+", dtype=np.uint8, shape=(n_rows,))
+        w = np.lib.format.open_memmap(os.path.join(cv_dir, "w.npy"), mode="w+", dtype=np.float64, shape=(n_rows,))
+        day = np.lib.format.open_memmap(os.path.join(cv_dir, "day.npy"), mode="w+", dtype=np.int32, shape=(n_rows,))
+        at = 0
+        for i in range(0, n_dates, chunk_days):
+            rows = slice(i, min(i + chunk_days, n_dates))
+            cols = store.columns(list(feat_cols) + ["label", "weight", "date"], rows, sampled)
+            n = len(cols["label"])
+            for j, name in enumerate(feat_cols):
+                X[at:at + n, j] = cols[name]
+            y[at:at + n] = cols["label"]
+            w[at:at + n] = cols["weight"]
+            day[at:at + n] = i + np.searchsorted(store.dates()[rows], cols["date"])
+            at += n
+        for arr in (X, y, w, day):
+            arr.flush()
+        del X, y, w, day
+        return n_dates
+
+    path = "data/train_v0.csv"
+    if not os.path.exists(path):
+        raise ValueError("Missing data/train_v0.csv. Run 05_extract_env_features.py (or 09_build_dataset.py) first.")
+    df = pd.read_csv(path)
+    if not set(feat_cols + ["label", "date"]).issubset(df.columns):
+        raise ValueError("Missing required columns in train_v0.csv")
+    day, uniq = pd.factorize(df["date"].astype(str), sort=True)
+    np.save(os.path.join(cv_dir, "X.npy"), df[feat_cols].to_numpy(dtype=np.float64))
+    np.save(os.path.join(cv_dir, "y.npy"), df["label"].to_numpy(dtype=np.uint8))
+    np.save(os.path.join(cv_dir, "w.npy"), df["weight"].to_numpy(dtype=np.float64) if "weight" in df.columns else np.ones(len(df)))
+    np.save(os.path.join(cv_dir, "day.npy"), day.astype(np.int32))
+    return len(uniq)
+
+def date_folds(n_dates, n_folds, block_days=1):
+    """Fold of each date: consecutive blocks of block_days dates, dealt round-robin."""
+    n_blocks = -(-n_dates // block_days)
+    if n_blocks < n_folds:
+        raise ValueError(f"{n_dates} dates make {n_blocks} blocks of {block_days} days; need at least {n_folds} for {n_folds}-fold CV.")
+    return (np.arange(n_dates) // block_days) % n_folds
+
+def fit_fold(cv_dir, fold_of_date, params, fold, block_rows=CV_BLOCK_ROWS):
+    """
+    Fits one candidate on all folds but `fold` and scores the held-out
+    dates, both with the rows' sample weights ("balanced" is applied on the
+    weighted class totals, see balanced_weights). X stays memory-mapped
+    and is read block_rows at a time, for fitting the scaler and for
+    predicting the held-out rows. The classifier's fit (lbfgs, or SGD with
+    per-epoch shuffling) needs the whole training matrix in memory. Each
+    job therefore builds its own standardized float64 copy of the training
+    rows, about (K-1)/K of X, so peak memory is roughly WORKERS such copies.
+    """
+    X = np.load(os.path.join(cv_dir, "X.npy"), mmap_mode="r")
+    y = np.load(os.path.join(cv_dir, "y.npy"), mmap_mode="r")
+    w = np.load(os.path.join(cv_dir, "w.npy"), mmap_mode="r")
+    test = fold_of_date[np.load(os.path.join(cv_dir, "day.npy"), mmap_mode="r")] == fold
+    train_rows, test_rows = np.flatnonzero(~test), np.flatnonzero(test)
+    y_train, y_test = y[train_rows], y[test_rows]
+
+    row = dict(config=config_name(params), fold=fold, n_test=len(test_rows))
+    if len(np.unique(y_train)) < 2 or len(np.unique(y_test)) < 2:
+        return dict(row, brier=np.nan, auc=np.nan)
+    model = make_model(dict(params, class_weight=None))
+    scaler, clf = model[0], model[-1]
+    w_train = w[train_rows]
+    if params.get("class_weight") == "balanced":
+        w_train = balanced_weights(y_train, w_train)
+
+    for i in range(0, len(train_rows), block_rows):
+        scaler.partial_fit(X[train_rows[i:i + block_rows]])
+    X_train = np.empty((len(train_rows), X.shape[1]), dtype=np.float64)
+    for i in range(0, len(train_rows), block_rows):
+        X_train[i:i + block_rows] = scaler.transform(X[train_rows[i:i + block_rows]])
+    clf.fit(X_train, y_train, sample_weight=w_train)
+    del X_train
+
+    p = np.empty(len(test_rows), dtype=np.float64)
+    for i in range(0, len(test_rows), block_rows):
+        p[i:i + block_rows] = model.predict_proba(X[test_rows[i:i + block_rows]])[:, 1]
+    return dict(row, brier=brier_score_loss(y_test, p, sample_weight=w[test_rows]),
+                auc=roc_auc_score(y_test, p, sample_weight=w[test_rows]))
+
+def cv_sweep(feat_cols, grid=SWEEP_GRID, *, n_folds=5, block_days=7, n_jobs=1, cv_dir=CV_DIR):
+    """
+    Date-grouped K-fold CV of every candidate in `grid`, (candidate, fold)
+    jobs run in parallel with joblib. Returns (per-fold results, ranked table:
+    mean/std Brier and AUC per candidate, best mean Brier first).
+    """
+    n_dates = write_cv_arrays(feat_cols, cv_dir)
+    fold_of_date = date_folds(n_dates, n_folds, block_days)
+    jobs = [(params, k) for params in grid for k in range(n_folds)]
+    rows = joblib.Parallel(n_jobs=n_jobs)(
+        joblib.delayed(fit_fold)(cv_dir, fold_of_date, params, k) for params, k in jobs
+    )
+
+    folds = pd.DataFrame(rows)
+    table = (folds.groupby("config", sort=False)
+                  .agg(brier=("brier", "mean"), brier_std=("brier", "std"),
+                       auc=("auc", "mean"), auc_std=("auc", "std"), folds=("brier", "count"))
+                  .sort_values(["brier", "auc"], ascending=[True, False])
+                  .reset_index())
+    table.insert(0, "rank", np.arange(1, len(table) + 1))
+    return folds, table
+
+def main_sweep(feat_cols):
+    n_folds = int(os.environ.get("CV_FOLDS", "5"))
+    block_days = int(os.environ.get("CV_BLOCK_DAYS", "7"))
+    n_jobs = int(os.environ.get("WORKERS", str(os.cpu_count() or 1)))
+    print(f"CV sweep: {len(SWEEP_GRID)} candidates x {n_folds} date-grouped folds ({block_days}-day blocks), {n_jobs} workers")
+    try:
+        folds, table = cv_sweep(feat_cols, n_folds=n_folds, block_days=block_days, n_jobs=n_jobs)
+    except ValueError as e:
+        print(str(e), file=sys.stderr)
+        sys.exit(1)
+    finally:
+        shutil.rmtree(CV_DIR, ignore_errors=True)
+
+    table.to_csv(CV_RESULTS, index=False)
+    folds.to_csv(CV_RESULTS.replace(".csv", "_folds.csv"), index=False)
+    print(table.head(10).to_string(index=False))
+    print(f"Saved ranked results -> {CV_RESULTS}")
+
+def main():
+    feat_cols = ["lat", "lon", "doy_sin", "doy_cos"]
+    # Climatology feature once the index is built (05_extract_env_features.py, BUILD_CLIMATOLOGY=1)
+    if importlib.import_module("05_extract_env_features").ClimatologyIndex().exists():
+        feat_cols.append("clim")
+    if os.environ.get("TRAIN_STREAM", "0") == "1":
+        return main_streaming(feat_cols)
+    if os.environ.get("CV_SWEEP", "0") == "1":
+        return main_sweep(feat_cols)
+
+    X, y, w = load_xy(feat_cols)
 
     # NOTE: With only one day you can’t train; you’ll want many days later.
-    # This script assumes train_v0.csv will eventually be appended across dates.
+    # 09_build_dataset.py accumulates many dates into data/master_v0/.
     if len(set(y)) < 2:
         print("Need both 0s and 1s in labels to train. Use more days.", file=sys.stderr)
         sys.exit(1)
 
-    Xtr, Xte, ytr, yte = train_test_split(X, y, test_size=0.2, random_state=42, stratify=y)
+    Xtr, Xte, ytr, yte, wtr, wte = train_test_split(X, y, w, test_size=0.2, random_state=42, stratify=y)
 
-    clf = LogisticRegression(max_iter=1000, class_weight="balanced")
-    clf.fit(Xtr, ytr)
+    # class_weight="balanced" on the weighted class totals (sample weights come from 09 NEG_FRAC)
+    clf = LogisticRegression(max_iter=1000)
+    clf.fit(Xtr, ytr, sample_weight=balanced_weights(ytr, wtr))
 
     p = clf.predict_proba(Xte)[:, 1]
-    brier = brier_score_loss(yte, p)
-    auc = roc_auc_score(yte, p)
-
-    os.makedirs("models", exist_ok=True)
-    model_path = "models/nadocast_v0_logreg.joblib"
-    joblib.dump({"model": clf, "features": feat_cols}, model_path)
+    brier = brier_score_loss(yte, p, sample_weight=wte)
+    auc = roc_auc_score(yte, p, sample_weight=wte)
 
-    print(f"Saved model -> {model_path}")
+    save_model({"model": clf, "features": feat_cols})
+    print(f"Saved model -> {MODEL_PATH}")
+    try:
+        export_compact(clf, feat_cols)
+    except ValueError as e:
+        print(str(e), file=sys.stderr)
+        sys.exit(1)
     print(f"Holdout Brier: {brier:.6f} | AUC: {auc:.4f}")
 
 if __name__ == "__main__":
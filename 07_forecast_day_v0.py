@@ -1,34 +1,250 @@
 import os
 import sys
+import json
+import importlib
+import numpy as np
 import pandas as pd
 import joblib
 
+MODEL_PATH = "models/nadocast_v0_logreg.joblib"
+COMPACT_PATH = "models/nadocast_v0_logreg.json"
+COMPACT_FORMAT = "nadocast-linear"
+COMPACT_VERSION = 1
+FORECAST_DIR = "data/forecast_v0"
+BLOCK_ROWS = 2_000_000     # rows (date x cell) predicted per model call in batch mode
+
+CELL_FEATURES = ("lat", "lon")
+DATE_FEATURES = ("doy", "doy_sin", "doy_cos")
+CLIM_FEATURES = ("clim",)   # (date, cell) lookups in the 05 climatology index
+
+class ForecastStore:
+    """
+    Batch forecast output, partitioned by date:
+
+      lat.npy, lon.npy        grid geometry (flat, row-major), stored once
+      meta.json               grid settings, radius and hazards labeled, shape, model and features used
+      days/YYYYMMDD.npy       float32 probability per cell for that date
+    """
+
+    def __init__(self, root=FORECAST_DIR):
+        self.root = root
+        self.days_dir = os.path.join(root, "days")
+
+    def exists(self) -> bool:
+        return os.path.exists(os.path.join(self.root, "meta.json"))
+
+    def init(self, lats, lons, meta) -> None:
+        """Writes geometry/meta; refuses to mix partitions from another grid."""
+        if self.exists():
+            have = self.meta()
+            if [have.get(k) for k in ("extent", "grid_res_deg")] != [meta["extent"], meta["grid_res_deg"]]:
+                raise ValueError(f"{self.root} holds forecasts on another grid. Move it away first.")
+        os.makedirs(self.days_dir, exist_ok=True)
+        np.save(os.path.join(self.root, "lat.npy"), np.repeat(lats, len(lons)).astype(np.float64))
+        np.save(os.path.join(self.root, "lon.npy"), np.tile(lons, len(lats)).astype(np.float64))
+        with open(os.path.join(self.root, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump(dict(meta, shape=[len(lats), len(lons)]), f, indent=2)
+
+    def meta(self) -> dict:
+        with open(os.path.join(self.root, "meta.json"), "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def partition_path(self, date_str: str) -> str:
+        return os.path.join(self.days_dir, f"{date_str.replace('-', '')}.npy")
+
+    def write(self, date_str: str, probs) -> None:
+        tmp = self.partition_path(date_str) + ".tmp.npy"
+        np.save(tmp, np.asarray(probs, dtype=np.float32))
+        os.replace(tmp, self.partition_path(date_str))
+
+    def dates(self):
+        if not os.path.isdir(self.days_dir):
+            return []
+        names = sorted(n[:-4] for n in os.listdir(self.days_dir) if n.endswith(".npy") and not n.endswith(".tmp.npy"))
+        return [f"{n[:4]}-{n[4:6]}-{n[6:]}" for n in names]
+
+    def probs(self, date_str: str):
+        return np.load(self.partition_path(date_str), mmap_mode="r")
+
+    def grid(self):
+        return pd.DataFrame({
+            "lat": np.load(os.path.join(self.root, "lat.npy")),
+            "lon": np.load(os.path.join(self.root, "lon.npy")),
+        })
+
+class CompactModel:
+    """
+    NumPy-only scorer for the compact linear export written by 06
+    (models/nadocast_v0_logreg.json): optional standardization, then a
+    logistic link. Mirrors the sklearn predict_proba interface, so it drops
+    into predict_dates without importing scikit-learn.
+    """
+
+    def __init__(self, spec):
+        if spec.get("format") != COMPACT_FORMAT or spec.get("version") != COMPACT_VERSION:
+            raise ValueError(f"Unsupported compact model: {spec.get('format')} v{spec.get('version')}")
+        self.spec = spec
+        self.features = spec["features"]
+        self.coef = np.asarray(spec["coef"], dtype=np.float64)
+        self.intercept = float(spec["intercept"])
+        self.mean = np.asarray(spec["mean"], dtype=np.float64) if spec.get("mean") is not None else None
+        self.scale = np.asarray(spec["scale"], dtype=np.float64) if spec.get("scale") is not None else None
+
+    @classmethod
+    def load(cls, path=COMPACT_PATH):
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    def decision_function(self, X):
+        X = np.asarray(X, dtype=np.float64)
+        if self.mean is not None:
+            X = (X - self.mean) / self.scale
+        return X @ self.coef + self.intercept
+
+    def predict_proba(self, X):
+        z = self.decision_function(X)
+        p = np.exp(-np.logaddexp(0.0, -z))
+        return np.column_stack([1.0 - p, p])
+
+def load_model(model_path=MODEL_PATH, compact_path=COMPACT_PATH):
+    """
+    (model, feature names): the compact export when it is at least as new as
+    the joblib pack (no sklearn import), else the joblib pack.
+    """
+    if os.path.exists(compact_path) and (
+        not os.path.exists(model_path) or os.path.getmtime(compact_path) >= os.path.getmtime(model_path)
+    ):
+        model = CompactModel.load(compact_path)
+        return model, model.features
+    pack = joblib.load(model_path)
+    return pack["model"], pack["features"]
+
+def parity_check(model, compact, feat_cols, lats, lons, dates):
+    """Largest |p_sklearn - p_compact| over the full grid on `dates`."""
+    base = cell_matrix(lats, lons, feat_cols)
+    worst = 0.0
+    for (_, p), (_, q) in zip(predict_dates(model, feat_cols, base, dates), predict_dates(compact, feat_cols, base, dates)):
+        worst = max(worst, float(np.max(np.abs(p - q))))
+    return worst
+
+def cell_matrix(lats, lons, feat_cols):
+    """(n_cells, n_features) matrix with the per-cell columns filled; date columns are left for predict_dates."""
+    unknown = [c for c in feat_cols if c not in CELL_FEATURES + DATE_FEATURES + CLIM_FEATURES]
+    if unknown:
+        raise ValueError(f"Batch mode cannot build features {unknown}")
+    X = np.zeros((len(lats) * len(lons), len(feat_cols)), dtype=np.float64)
+    for j, name in enumerate(feat_cols):
+        if name == "lat":
+            X[:, j] = np.repeat(lats, len(lons))
+        elif name == "lon":
+            X[:, j] = np.tile(lons, len(lats))
+    return X
+
+def predict_dates(model, feat_cols, base, dates, block_rows=BLOCK_ROWS):
+    """
+    Yields (date, probs) for every date, predicting blocks of whole dates
+    (up to block_rows rows) per model call. `base` comes from cell_matrix;
+    seasonal columns are computed analytically from the dates, "clim" is
+    read from the climatology index, leaving out the date's own labels like
+    05 does for training.
+    """
+    feature_stage = importlib.import_module("05_extract_env_features")
+    n_cells = len(base)
+    per_block = max(1, block_rows // n_cells)
+    date_cols = [(j, name) for j, name in enumerate(feat_cols) if name in DATE_FEATURES]
+    clim_cols = [j for j, name in enumerate(feat_cols) if name in CLIM_FEATURES]
+    index = feature_stage.ClimatologyIndex().load() if clim_cols else None
+    if index is not None and index.n_cells != n_cells:
+        raise ValueError(f"Climatology index has {index.n_cells} cells, the forecast grid {n_cells}")
+    for i in range(0, len(dates), per_block):
+        block = dates[i:i + per_block]
+        season = dict(zip(DATE_FEATURES, feature_stage.season_arrays(block)))
+        X = np.tile(base, (len(block), 1))
+        for j, name in date_cols:
+            X[:, j] = np.repeat(season[name], n_cells)
+        if clim_cols:
+            clim = index.frequency(block, own_labels=index.own_labels(block)).reshape(-1)
+        for j in clim_cols:
+            X[:, j] = clim
+        p = model.predict_proba(X)[:, 1].reshape(len(block), n_cells)
+        for d, row in zip(block, p):
+            yield str(d), row
+
+def main_batch(start, end):
+    """
+    Forecasts every date in [start, end] with one model load and one grid
+    build, into data/forecast_v0/ (one partition per date).
+    """
+    label_stage = importlib.import_module("04_make_grid_and_labels")
+    cfg = label_stage.read_config()
+    model, feat_cols = load_model()
+
+    lats, lons = label_stage.grid_axes(cfg["extent"], cfg["grid_res_deg"])
+    try:
+        base = cell_matrix(lats, lons, feat_cols)
+    except ValueError as e:
+        print(str(e), file=sys.stderr)
+        sys.exit(1)
+
+    dates = np.arange(np.datetime64(start, "D"), np.datetime64(end, "D") + 1)
+    store = ForecastStore()
+    try:
+        store.init(lats, lons, {
+            "extent": cfg["extent"], "grid_res_deg": cfg["grid_res_deg"],
+            "radius_miles": cfg["radius_miles"], "hazards": list(cfg["hazards"]),
+            "model": MODEL_PATH, "features": list(feat_cols),
+        })
+    except ValueError as e:
+        print(str(e), file=sys.stderr)
+        sys.exit(1)
+    try:
+        for date_str, probs in predict_dates(model, feat_cols, base, dates):
+            store.write(date_str, probs)
+    except ValueError as e:
+        print(str(e), file=sys.stderr)
+        sys.exit(1)
+    print(f"Saved {len(dates)} forecast days ({len(base)} cells) -> {store.root}/days/")
+
 def main():
     labels_csv = "data/grid_labels.csv"
-    model_path = "models/nadocast_v0_logreg.joblib"
+    model_path = MODEL_PATH
+
+    if not os.path.exists(model_path) and not os.path.exists(COMPACT_PATH):
+        print("Missing model. Run 06_train_model_v0.py first.", file=sys.stderr)
+        sys.exit(1)
+
+    # Batch mode: START_DATE=2024-04-01 END_DATE=2024-06-30 python 07_forecast_day_v0.py
+    if os.environ.get("START_DATE"):
+        return main_batch(os.environ["START_DATE"], os.environ.get("END_DATE", os.environ["START_DATE"]))
 
     if not os.path.exists(labels_csv):
         print("Missing data/grid_labels.csv. Run 04_make_grid_and_labels.py first.", file=sys.stderr)
         sys.exit(1)
-    if not os.path.exists(model_path):
-        print("Missing model. Run 06_train_model_v0.py first.", file=sys.stderr)
-        sys.exit(1)
 
     df = pd.read_csv(labels_csv)
-    pack = joblib.load(model_path)
-    model = pack["model"]
-    feat_cols = pack["features"]
+    model, feat_cols = load_model(model_path)
+
+    # Climatology straight from the index; the date's own labels are left out as in 05
+    if "clim" in feat_cols and "clim" not in df.columns:
+        feature_stage = importlib.import_module("05_extract_env_features")
+        index = feature_stage.ClimatologyIndex()
+        if index.exists():
+            try:
+                df = feature_stage.add_climatology(df, index.load())
+            except ValueError as e:
+                print(str(e), file=sys.stderr)
+                sys.exit(1)
 
     # Ensure seasonal cols exist (reuse v0 feature creator logic quickly)
-    if "doy_sin" not in df.columns or "doy_cos" not in df.columns:
+    missing = [c for c in feat_cols if c not in df.columns]
+    if missing:
         # simplest: merge from train_v0 if present
         train_path = "data/train_v0.csv"
-        if os.path.exists(train_path):
-            t = pd.read_csv(train_path)[["grid_id", "doy_sin", "doy_cos"]]
-            df = df.merge(t, on="grid_id", how="left")
-        else:
-            print("Missing doy features. Run 05_make_features_v0.py first.", file=sys.stderr)
+        t = pd.read_csv(train_path) if os.path.exists(train_path) else pd.DataFrame()
+        if not set(missing).issubset(t.columns):
+            print(f"Missing features {missing}. Run 05_extract_env_features.py first.", file=sys.stderr)
             sys.exit(1)
+        df = df.merge(t[["grid_id"] + missing], on="grid_id", how="left")
 
     X = df[feat_cols].values
     df["prob"] = model.predict_proba(X)[:, 1]
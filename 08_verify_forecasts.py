@@ -0,0 +1,225 @@
+import os
+import sys
+import json
+import importlib
+from datetime import datetime
+import numpy as np
+import pandas as pd
+
+label_stage = importlib.import_module("04_make_grid_and_labels")
+forecast_stage = importlib.import_module("07_forecast_day_v0")
+build = importlib.import_module("09_build_dataset")
+stage_metrics = importlib.import_module("12_stage_metrics")
+
+VERIFY_DIR = "data/verification"
+REL_BINS = 10       # reliability-diagram bins over [0, 1]
+ROC_BINS = 1000     # probability histogram bins behind the ROC curve / AUC
+
+class Verification:
+    """
+    Forecast verification accumulated one date at a time, in memory that
+    doesn't grow with the number of cells x dates:
+
+      Brier         running sum of squared errors (+ base rate for skill)
+      reliability   per-bin count, sum of forecasts, sum of observations
+      ROC           per-class histograms of the forecast (ROC_BINS bins);
+                    POD/POFD at every bin edge, AUC from the same counts
+      per date      one row of sums per date (n, positives, Brier, exact AUC)
+    """
+
+    def __init__(self, rel_bins=REL_BINS, roc_bins=ROC_BINS):
+        self.rel_bins = rel_bins
+        self.roc_bins = roc_bins
+        self.rel_n = np.zeros(rel_bins, dtype=np.int64)
+        self.rel_p = np.zeros(rel_bins, dtype=np.float64)
+        self.rel_o = np.zeros(rel_bins, dtype=np.float64)
+        self.pos = np.zeros(roc_bins, dtype=np.int64)
+        self.neg = np.zeros(roc_bins, dtype=np.int64)
+        self.sq_err = 0.0
+        self.n = 0
+        self.n_pos = 0
+        self.days = []
+
+    def update(self, date_str, p, o) -> None:
+        """Adds one date: forecast probabilities `p` and observed 0/1 labels `o`, same cell order."""
+        p = np.clip(np.asarray(p, dtype=np.float64), 0.0, 1.0)
+        o = np.asarray(o).astype(bool)
+        err = float(np.sum((p - o) ** 2))
+        self.sq_err += err
+        self.n += len(p)
+        self.n_pos += int(o.sum())
+
+        b = np.minimum((p * self.rel_bins).astype(np.int64), self.rel_bins - 1)
+        self.rel_n += np.bincount(b, minlength=self.rel_bins)
+        self.rel_p += np.bincount(b, weights=p, minlength=self.rel_bins)
+        self.rel_o += np.bincount(b, weights=o, minlength=self.rel_bins)
+
+        h = np.minimum((p * self.roc_bins).astype(np.int64), self.roc_bins - 1)
+        self.pos += np.bincount(h[o], minlength=self.roc_bins)
+        self.neg += np.bincount(h[~o], minlength=self.roc_bins)
+
+        self.days.append({
+            "date": date_str, "n": len(p), "n_pos": int(o.sum()),
+            "mean_p": float(p.mean()) if len(p) else float("nan"),
+            "brier": err / len(p) if len(p) else float("nan"),
+            "auc": exact_auc(p, o),
+        })
+
+    def base_rate(self) -> float:
+        return self.n_pos / self.n if self.n else float("nan")
+
+    def brier(self) -> float:
+        return self.sq_err / self.n if self.n else float("nan")
+
+    def brier_skill(self) -> float:
+        """Skill vs always forecasting the period's base rate (Brier = o(1-o))."""
+        o = self.base_rate()
+        ref = o * (1 - o)
+        return 1 - self.brier() / ref if ref > 0 else float("nan")
+
+    def reliability(self):
+        """Reliability-diagram table: one row per forecast bin."""
+        edges = np.linspace(0, 1, self.rel_bins + 1)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return pd.DataFrame({
+                "bin_lo": edges[:-1], "bin_hi": edges[1:], "n": self.rel_n,
+                "mean_p": self.rel_p / self.rel_n, "obs_freq": self.rel_o / self.rel_n,
+            })
+
+    def decomposition(self) -> dict:
+        """Murphy's Brier decomposition from the reliability bins (exact up to within-bin spread)."""
+        o = self.base_rate()
+        used = self.rel_n > 0
+        n_k = self.rel_n[used]
+        p_k = self.rel_p[used] / n_k
+        o_k = self.rel_o[used] / n_k
+        return {
+            "reliability": float(np.sum(n_k * (p_k - o_k) ** 2) / self.n),
+            "resolution": float(np.sum(n_k * (o_k - o) ** 2) / self.n),
+            "uncertainty": o * (1 - o),
+        }
+
+    def roc(self):
+        """ROC curve at every histogram edge, from the highest threshold down: (threshold, pofd, pod)."""
+        n_pos, n_neg = self.pos.sum(), self.neg.sum()
+        thresholds = np.linspace(1, 0, self.roc_bins + 1)
+        pod = np.concatenate([[0], np.cumsum(self.pos[::-1])]) / max(n_pos, 1)
+        pofd = np.concatenate([[0], np.cumsum(self.neg[::-1])]) / max(n_neg, 1)
+        return thresholds, pofd, pod
+
+    def auc(self) -> float:
+        """Area under the histogram ROC (trapezoids = ties within a bin count half)."""
+        if self.pos.sum() == 0 or self.neg.sum() == 0:
+            return float("nan")
+        _, pofd, pod = self.roc()
+        return float(np.sum(np.diff(pofd) * (pod[1:] + pod[:-1]) / 2))
+
+    def per_date(self):
+        """Per-date table with Brier skill vs the period's base rate as a constant forecast."""
+        df = pd.DataFrame(self.days, columns=["date", "n", "n_pos", "mean_p", "brier", "auc"])
+        o = self.base_rate()
+        # Brier of the constant forecast o on a day with base rate o_d: o^2 - 2*o*o_d + o_d
+        o_d = df["n_pos"] / df["n"]
+        ref = o ** 2 - 2 * o * o_d + o_d
+        df["bss"] = np.where(ref > 0, 1 - df["brier"] / ref, np.nan)
+        return df
+
+    def report(self, **extra) -> dict:
+        thresholds, pofd, pod = self.roc()
+        days = self.per_date()
+        return dict(extra, **{
+            "n_dates": len(days), "n": self.n, "n_pos": self.n_pos, "base_rate": self.base_rate(),
+            "brier": self.brier(), "brier_skill": self.brier_skill(), "auc": self.auc(),
+            "decomposition": self.decomposition(),
+            "reliability": self.reliability().to_dict(orient="list"),
+            "roc": {"threshold": thresholds.tolist(), "pofd": pofd.tolist(), "pod": pod.tolist()},
+            "per_date": json.loads(days.to_json(orient="records")),
+        })
+
+def exact_auc(p, o) -> float:
+    """AUC of one date's cells from average ranks (Mann-Whitney); NaN unless both classes occur."""
+    n_pos = int(o.sum())
+    n_neg = len(o) - n_pos
+    if n_pos == 0 or n_neg == 0:
+        return float("nan")
+    ranks = pd.Series(p).rank().to_numpy()
+    return float((ranks[o].sum() - n_pos * (n_pos + 1) / 2) / (n_pos * n_neg))
+
+def verify(forecasts, store, dates, metrics=None, hazard="torn"):
+    """Streams (forecast, observed label) pairs for `dates` into a Verification."""
+    metrics = metrics or stage_metrics.Metrics()
+    bit = label_stage.HAZARD_BITS[hazard]
+    row_of = {str(d): i for i, d in enumerate(store.dates())}
+    labels = store.labels()
+    ver = Verification()
+    for d in dates:
+        with metrics.stage("verify", d) as st:
+            p = forecasts.probs(d)
+            o = (np.asarray(labels[row_of[d]]) & bit) > 0
+            ver.update(d, p, o)
+            st.update(rows_in=len(p), rows_out=1)
+    return ver
+
+def main():
+    """
+    Verifies batch forecasts (07, data/forecast_v0/) against the observed
+    labels in the master store (09, data/master_v0/) for every date both
+    have in [START_DATE, END_DATE] (default: all), one date at a time:
+
+      START_DATE=2024-04-01 END_DATE=2024-06-30 python 08_verify_forecasts.py
+
+    Writes data/verification/report_<start>_<end>.json: Brier (+ skill and
+    decomposition), reliability bins, the ROC curve and AUC, and a per-date
+    table. VERIFY_HAZARD picks the observed hazard (default torn).
+    """
+    forecasts = forecast_stage.ForecastStore()
+    store = build.MasterStore()
+    if not forecasts.exists():
+        print("Missing data/forecast_v0. Run START_DATE=... END_DATE=... python 07_forecast_day_v0.py first.", file=sys.stderr)
+        sys.exit(1)
+    if not store.exists():
+        print("Missing data/master_v0. Run 09_build_dataset.py first.", file=sys.stderr)
+        sys.exit(1)
+
+    have = [forecasts.meta().get(k) for k in ("extent", "grid_res_deg")]
+    want = [store.meta().get(k) for k in ("extent", "grid_res_deg")]
+    if have != want:
+        print(f"Forecasts are on grid {have}, labels on {want}", file=sys.stderr)
+        sys.exit(1)
+    hazard = os.environ.get("VERIFY_HAZARD", "torn")
+    if hazard not in store.hazards():
+        print(f"{store.root} has no {hazard} labels (hazards: {store.hazards()})", file=sys.stderr)
+        sys.exit(1)
+
+    start = os.environ.get("START_DATE", "0000-01-01")
+    end = os.environ.get("END_DATE", "9999-12-31")
+    observed = {str(d) for d in store.dates()}
+    in_range = [d for d in forecasts.dates() if start <= d <= end]
+    dates = [d for d in in_range if d in observed]
+    if not dates:
+        print(f"No dates with both a forecast and labels in [{start}, {end}]", file=sys.stderr)
+        sys.exit(1)
+    if len(dates) < len(in_range):
+        print(f"Skipping {len(in_range) - len(dates)} forecast dates without labels")
+
+    metrics = stage_metrics.from_env()
+    ver = verify(forecasts, store, dates, metrics, hazard)
+
+    os.makedirs(VERIFY_DIR, exist_ok=True)
+    out_path = os.path.join(VERIFY_DIR, f"report_{dates[0]}_{dates[-1]}.json")
+    report = ver.report(first=dates[0], last=dates[-1], hazard=hazard, model=forecasts.meta().get("model"),
+                        created=datetime.utcnow().isoformat() + "Z")
+    tmp = out_path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=1)
+    os.replace(tmp, out_path)
+
+    dec = report["decomposition"]
+    print(f"Verified {len(dates)} dates ({dates[0]} -> {dates[-1]}), {ver.n} forecasts, base rate {ver.base_rate():.5f}")
+    print(f"Brier: {ver.brier():.6f} | BSS: {ver.brier_skill():.4f} | AUC: {ver.auc():.4f}")
+    print(f"Reliability: {dec['reliability']:.6f} | Resolution: {dec['resolution']:.6f} | Uncertainty: {dec['uncertainty']:.6f}")
+    print(ver.reliability().to_string(index=False, float_format=lambda v: f"{v:.4f}"))
+    print(f"Saved verification report -> {out_path}")
+
+if __name__ == "__main__":
+    main()
@@ -1,76 +1,727 @@
 import os
 import sys
-import time
-import subprocess
+import json
+import shutil
+import hashlib
+import importlib
+import multiprocessing as mp
+import numpy as np
+import pandas as pd
 from datetime import datetime, timedelta
 
-# ---------------- config editing ----------------
-def set_config_date(path: str, date_str: str) -> None:
+# Numbered stage scripts aren't valid `import` names, but importlib loads them fine.
+fetch_stage = importlib.import_module("01_fetch")
+parse_stage = importlib.import_module("02_compute_tpi")
+label_stage = importlib.import_module("04_make_grid_and_labels")
+feature_stage = importlib.import_module("05_extract_env_features")
+bulk_stage = importlib.import_module("10_ingest_bulk_reports")
+stage_metrics = importlib.import_module("12_stage_metrics")
+
+MASTER_DIR = "data/master_v0"   # compact master dataset (see MasterStore)
+DONE_DIR = "data/.done"         # one marker file per finished date (OK or SKIP)
+SCRATCH_DIR = "data/scratch"    # per-worker scratch space
+
+# Grid settings the stored labels depend on
+GRID_KEYS = ("extent", "grid_res_deg", "radius_miles")
+
+SAMPLE_SEED = 42        # default seed for MasterStore.write_sample (NEG_FRAC)
+
+STAGE_CACHE_DIR = "data/stage_cache"   # content-addressed parse/label outputs (see StageCache)
+# Bump when a stage's code changes what it outputs for the same inputs
+STAGE_VERSIONS = {"parse": 1, "labels": 2}
+
+def ensure_dirs():
+    os.makedirs(DONE_DIR, exist_ok=True)
+    os.makedirs(SCRATCH_DIR, exist_ok=True)
+    os.makedirs("logs", exist_ok=True)
+
+# ---------------- master store ----------------
+class MasterStore:
     """
-    Updates (or inserts) a line `date: YYYY-MM-DD` in config.yml.
-    Keeps the rest of the file intact.
+    Compact master dataset (replaces the appended train_master_v0.csv):
+
+      grid_id.npy, lat.npy, lon.npy   grid geometry, stored once
+      meta.json                       grid settings and hazards the labels were built with
+      days/YYYYMMDD.npy               one uint8 label vector per date (partitions)
+      labels.u8                       every merged date's labels, (n_dates, n_cells), date order
+      dates.npy                       datetime64[D] date of each labels.u8 row
+      sample/                         optional negative-downsampled rows + weights (write_sample)
+
+    Only the label is stored per (date, cell); geometry is joined and the
+    seasonal features are computed from the date at read time, so training
+    can memory-map labels.u8 without parsing any text. With several hazards
+    the stored byte is the HAZARD_BITS mask (04_make_grid_and_labels); bit 0
+    is tornado, so "label" reads the same either way (without tornado in
+    the hazards it is any stored hazard, see label_bits).
     """
-    lines = []
-    if os.path.exists(path):
-        with open(path, "r", encoding="utf-8") as f:
-            lines = f.readlines()
 
-    out_lines = []
-    found = False
-    for line in lines:
-        if line.strip().startswith("date:"):
-            out_lines.append(f'date: "{date_str}"\n')
-            found = True
+    def __init__(self, root=MASTER_DIR):
+        self.root = root
+        self.days_dir = os.path.join(root, "days")
+        self.labels_path = os.path.join(root, "labels.u8")
+        self.dates_path = os.path.join(root, "dates.npy")
+        self.sample_dir = os.path.join(root, "sample")
+
+    def exists(self) -> bool:
+        return os.path.exists(os.path.join(self.root, "meta.json"))
+
+    def meta(self) -> dict:
+        with open(os.path.join(self.root, "meta.json"), "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    @property
+    def n_cells(self) -> int:
+        return self.meta()["n_cells"]
+
+    def settings(self) -> dict:
+        """GRID_KEYS values and hazards of the stored labels (stores predating hazards are tornado-only)."""
+        meta = self.meta()
+        return dict({k: meta.get(k) for k in GRID_KEYS}, hazards=meta.get("hazards", ["torn"]))
+
+    def hazards(self):
+        return self.settings()["hazards"]
+
+    def init(self, grid, cfg) -> None:
+        """Stores the Grid's geometry once; refuses to mix labels built with other grid settings or hazards."""
+        want = store_settings(cfg)
+        if self.exists():
+            have = self.settings()
+            if have != want:
+                raise ValueError(
+                    f"{self.root} was built with {have}, config.yml now has {want}. "
+                    f"Rerun with RESET=1 (or move it and {DONE_DIR} away) to rebuild."
+                )
+            return
+
+        os.makedirs(self.days_dir, exist_ok=True)
+        n_lat, n_lon = grid.shape
+        np.save(os.path.join(self.root, "grid_id.npy"), np.arange(grid.n_cells, dtype=np.int32))
+        np.save(os.path.join(self.root, "lat.npy"), np.repeat(grid.lats, n_lon).astype(np.float64))
+        np.save(os.path.join(self.root, "lon.npy"), np.tile(grid.lons, n_lat).astype(np.float64))
+        with open(os.path.join(self.root, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump(dict(want, n_cells=grid.n_cells, shape=[n_lat, n_lon], label_dtype="uint8"), f, indent=2)
+
+    def partition_path(self, date_str: str) -> str:
+        return os.path.join(self.days_dir, f"{date_str.replace('-', '')}.npy")
+
+    def write_partition(self, date_str: str, labels, scratch_dir: str) -> None:
+        """Writes one date's labels via scratch_dir, then moves it into place."""
+        tmp = os.path.join(scratch_dir, os.path.basename(self.partition_path(date_str)))
+        np.save(tmp, np.asarray(labels, dtype=np.uint8))
+        os.replace(tmp, self.partition_path(date_str))
+
+    def dates(self):
+        if not os.path.exists(self.dates_path):
+            return np.array([], dtype="datetime64[D]")
+        return np.load(self.dates_path)
+
+    def _save_dates(self, dates) -> None:
+        tmp = self.dates_path + ".tmp.npy"
+        np.save(tmp, np.asarray(dates, dtype="datetime64[D]"))
+        os.replace(tmp, self.dates_path)
+
+    def append(self, date_str: str) -> None:
+        """
+        Appends a date's partition to labels.u8 (single writer, date order).
+        A date that is already stored (a run stopped between append and
+        mark_done) has its row rewritten in place instead.
+        """
+        dates = self.dates()
+        row = np.load(self.partition_path(date_str))
+        at = np.searchsorted(dates, np.datetime64(date_str, "D"))
+        if at < len(dates) and dates[at] == np.datetime64(date_str, "D"):
+            with open(self.labels_path, "r+b") as f:
+                f.seek(int(at) * row.size)
+                f.write(row.tobytes())
+            return
+        with open(self.labels_path, "ab") as f:
+            # Drop a half-written row left by an interrupted append
+            f.truncate(len(dates) * row.size)
+            f.write(row.tobytes())
+        self._save_dates(np.append(dates, np.datetime64(date_str, "D")))
+
+    def rebuild(self, date_strs) -> None:
+        """Rewrites labels.u8/dates.npy from the partitions of `date_strs`, in date order."""
+        tmp = self.labels_path + ".tmp"
+        kept = []
+        with open(tmp, "wb") as f:
+            for d in sorted(date_strs):
+                if os.path.exists(self.partition_path(d)):
+                    f.write(np.load(self.partition_path(d)).tobytes())
+                    kept.append(d)
+        os.replace(tmp, self.labels_path)
+        self._save_dates(np.array(kept, dtype="datetime64[D]"))
+
+    # ----- read side -----
+    def grid(self):
+        return pd.DataFrame({
+            "grid_id": np.load(os.path.join(self.root, "grid_id.npy")),
+            "lat": np.load(os.path.join(self.root, "lat.npy")),
+            "lon": np.load(os.path.join(self.root, "lon.npy")),
+        })
+
+    def labels(self):
+        """All labels as a read-only memory map, shape (n_dates, n_cells)."""
+        n_dates = len(self.dates())
+        if n_dates == 0:
+            return np.zeros((0, self.n_cells), dtype=np.uint8)
+        return np.memmap(self.labels_path, dtype=np.uint8, mode="r", shape=(n_dates, self.n_cells))
+
+    def columns(self, names, rows=slice(None), sampled=False):
+        """
+        Builds flat columns for the selected date rows (row-major: date, then cell),
+        same layout as the old master CSV. Names: grid_id, lat, lon, date, label,
+        label_<hazard> (for the stored hazards), doy, doy_sin, doy_cos, clim
+        (needs the 05_extract_env_features climatology index), weight.
+        With sampled=True only the rows kept by write_sample are built, and
+        "weight" is their sampling weight (otherwise all ones).
+        """
+        date_rows = np.arange(len(self.dates()))[rows]
+        dates = self.dates()[date_rows]
+        if sampled:
+            cells, weight, counts = self._sample_rows(date_rows)
+            at_date = np.repeat(np.arange(len(date_rows)), counts)
+            stored = lambda: np.asarray(self.labels()[np.repeat(date_rows, counts), cells])
+            expand_cell = lambda a: np.asarray(a)[cells]
+            expand_date = lambda a: np.asarray(a)[at_date]
         else:
-            out_lines.append(line)
+            stored = lambda: np.asarray(self.labels()[date_rows]).reshape(-1)
+            expand_cell = lambda a: np.tile(a, len(dates))
+            expand_date = lambda a: np.repeat(a, self.n_cells)
 
-    if not found:
-        # Put date at top if missing
-        out_lines.insert(0, f'date: "{date_str}"\n')
+        out = {}
+        per_date = {}
+        for name in names:
+            if name in ("grid_id", "lat", "lon"):
+                out[name] = expand_cell(np.load(os.path.join(self.root, f"{name}.npy"), mmap_mode="r"))
+            elif name in ("doy", "doy_sin", "doy_cos"):
+                if not per_date:
+                    per_date.update(zip(("doy", "doy_sin", "doy_cos"), feature_stage.season_arrays(dates)))
+                out[name] = expand_date(per_date[name])
+            elif name == "date":
+                out[name] = expand_date(dates)
+            elif name == "clim":
+                if sampled:
+                    index = self._climatology_index()
+                    out[name] = index.lookup(expand_date(dates), cells, own_labels=stored() & label_stage.HAZARD_BITS[index.hazard])
+                else:
+                    out[name] = self.climatology(date_rows).reshape(-1)
+            elif name == "weight":
+                out[name] = weight if sampled else np.ones(len(dates) * self.n_cells, dtype=np.float32)
+            elif name == "label":
+                out[name] = ((stored() & label_stage.label_bits(self.hazards())) > 0).astype(np.uint8)
+            elif name.startswith("label_") and name[6:] in self.hazards():
+                bit = label_stage.HAZARD_BITS[name[6:]]
+                out[name] = ((stored() & bit) > 0).astype(np.uint8)
+            else:
+                raise KeyError(f"Unknown master column: {name}")
+        return out
 
-    with open(path, "w", encoding="utf-8") as f:
-        f.writelines(out_lines)
+    def _climatology_index(self):
+        index = feature_stage.ClimatologyIndex().load()
+        have = {k: index.meta().get(k) for k in GRID_KEYS}
+        if have != {k: self.meta().get(k) for k in GRID_KEYS}:
+            raise ValueError(f"{index.root} was built for {have}; rebuild it with BUILD_CLIMATOLOGY=1")
+        return index
 
-# ---------------- runner ----------------
-def run_cmd(cmd, *, cwd=None) -> int:
-    print(f"$ {' '.join(cmd)}")
-    p = subprocess.run(cmd, cwd=cwd)
-    return p.returncode
+    def climatology(self, rows=slice(None), index=None):
+        """(n_dates, n_cells) climatology feature for the selected date rows; dates in the index leave themselves out."""
+        index = index or self._climatology_index()
+        own = np.asarray(self.labels()[rows]) & label_stage.HAZARD_BITS[index.hazard]
+        return index.frequency(self.dates()[rows], own_labels=own)
 
-def ensure_dirs():
-    os.makedirs("data/daily", exist_ok=True)
-    os.makedirs("logs", exist_ok=True)
+    def xy(self, feat_cols, rows=slice(None), dtype=np.float64):
+        """Feature matrix and labels for the selected date rows, built without text parsing."""
+        X, y, _ = self.xyw(feat_cols, rows, dtype)
+        return X, y
+
+    def xyw(self, feat_cols, rows=slice(None), dtype=np.float64, sampled=False):
+        """xy plus a sampling weight per row; sampled=True reads only the write_sample rows."""
+        cols = self.columns(list(feat_cols) + ["label", "weight"], rows, sampled)
+        X = np.empty((len(cols["label"]), len(feat_cols)), dtype=dtype)
+        for j, name in enumerate(feat_cols):
+            X[:, j] = cols[name]
+        return X, cols["label"], cols["weight"]
+
+    # ----- negative-downsampled view -----
+    def write_sample(self, neg_frac, seed=SAMPLE_SEED):
+        """
+        Keeps every positive (date, cell) row (any hazard) and a neg_frac
+        share of the negatives, with weight 1/neg_frac on the kept negatives
+        so weighted sums estimate the full table's without bias:
+
+          sample/cells.npy     int32 kept grid_ids, grouped by date row
+          sample/weight.npy    float32 sampling weight per kept row
+          sample/offsets.npy   rows of date i are [offsets[i], offsets[i+1])
+          sample/meta.json     neg_frac, seed and the dates covered
+
+        Each date draws from its own RNG seeded by (seed, date), so a date's
+        sample doesn't change when other dates are added.
+        """
+        if not 0 < neg_frac <= 1:
+            raise ValueError(f"NEG_FRAC must be in (0, 1], got {neg_frac}")
+        dates = self.dates()
+        labels = self.labels()
+        cells, weights = [], []
+        offsets = np.zeros(len(dates) + 1, dtype=np.int64)
+        for i, d in enumerate(dates):
+            row = np.asarray(labels[i])
+            rng = np.random.default_rng([seed, int(str(d).replace("-", ""))])
+            keep = (row > 0) | (rng.random(self.n_cells) < neg_frac)
+            cells.append(np.flatnonzero(keep).astype(np.int32))
+            weights.append(np.where(row[keep] > 0, 1.0, 1.0 / neg_frac).astype(np.float32))
+            offsets[i + 1] = offsets[i] + len(cells[-1])
+
+        os.makedirs(self.sample_dir, exist_ok=True)
+        for name, arr in (("cells", cells), ("weight", weights), ("offsets", [offsets])):
+            tmp = os.path.join(self.sample_dir, f"{name}.tmp.npy")
+            np.save(tmp, np.concatenate(arr) if arr else np.zeros(0))
+            os.replace(tmp, os.path.join(self.sample_dir, f"{name}.npy"))
+        meta = {"neg_frac": neg_frac, "seed": seed, "n_dates": int(len(dates)), "n_rows": int(offsets[-1]),
+                "first": str(dates[0]) if len(dates) else None, "last": str(dates[-1]) if len(dates) else None}
+        with open(os.path.join(self.sample_dir, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump(meta, f, indent=2)
+        return meta
+
+    def sample_meta(self, current=True):
+        """The sample's meta.json (None if missing, or with current=True, if it doesn't match the dates)."""
+        try:
+            with open(os.path.join(self.sample_dir, "meta.json"), "r", encoding="utf-8") as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if not current:
+            return meta
+        dates = self.dates()
+        current = len(dates) == meta["n_dates"] and (not len(dates) or (str(dates[0]), str(dates[-1])) == (meta["first"], meta["last"]))
+        return meta if current else None
+
+    def _sample_rows(self, date_rows):
+        """(cells, weight, rows per date) of the sampled rows for the given date rows."""
+        cells = np.load(os.path.join(self.sample_dir, "cells.npy"), mmap_mode="r")
+        weight = np.load(os.path.join(self.sample_dir, "weight.npy"), mmap_mode="r")
+        offsets = np.load(os.path.join(self.sample_dir, "offsets.npy"))
+        counts = offsets[date_rows + 1] - offsets[date_rows]
+        take = np.repeat(offsets[date_rows] - np.cumsum(counts) + counts, counts) + np.arange(counts.sum())
+        return np.asarray(cells[take]), np.asarray(weight[take]), counts
+
+def store_settings(cfg) -> dict:
+    """What MasterStore.init checks the stored labels against."""
+    return dict({k: cfg[k] for k in GRID_KEYS}, hazards=list(cfg.get("hazards", ["torn"])))
+
+# ---------------- stage cache ----------------
+class StageCache:
+    """
+    Content-addressed outputs of the parse and label stages:
+
+      parse/<key>.npy    report points (n, 2) [lat, lon]; key = raw CSV hash
+      labels/<key>.npy   bit-packed labels, one plane per hazard bit;
+                         key = points + hazard flags hash + GRID_KEYS values
+
+    Keys also include the stage version, so a changed input (a revised SPC
+    file, another radius_miles) simply misses while everything else is reused,
+    and switching a setting back hits again. Hits refresh the file's mtime,
+    which evict() uses as last-used time.
+    """
+
+    def __init__(self, root=STAGE_CACHE_DIR):
+        self.root = root
+
+    @staticmethod
+    def key(stage, *parts) -> str:
+        h = hashlib.sha256(f"{stage}:v{STAGE_VERSIONS[stage]}".encode())
+        for part in parts:
+            h.update(b"\0")
+            h.update(part if isinstance(part, (bytes, bytearray)) else json.dumps(part).encode())
+        return h.hexdigest()
+
+    def path(self, stage, key) -> str:
+        return os.path.join(self.root, stage, f"{key}.npy")
+
+    def has(self, stage, key) -> bool:
+        return os.path.exists(self.path(stage, key))
+
+    def get(self, stage, key):
+        path = self.path(stage, key)
+        try:
+            arr = np.load(path)
+        except (OSError, ValueError):
+            return None
+        os.utime(path)
+        return arr
+
+    def put(self, stage, key, arr) -> None:
+        path = self.path(stage, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp.npy"
+        np.save(tmp, arr)
+        os.replace(tmp, path)
+
+    def entries(self):
+        """(path, bytes, mtime) of every cached output."""
+        out = []
+        for stage in STAGE_VERSIONS:
+            d = os.path.join(self.root, stage)
+            if os.path.isdir(d):
+                for name in os.listdir(d):
+                    if name.endswith(".npy") and not name.endswith(".tmp.npy"):
+                        st = os.stat(os.path.join(d, name))
+                        out.append((os.path.join(d, name), st.st_size, st.st_mtime))
+        return out
+
+    def size_bytes(self) -> int:
+        return sum(size for _, size, _ in self.entries())
+
+    def evict(self, max_bytes: int):
+        """Removes least-recently-used outputs until the cache fits in max_bytes. Returns (files, bytes) removed."""
+        entries = sorted(self.entries(), key=lambda e: e[2])
+        total = sum(size for _, size, _ in entries)
+        n = freed = 0
+        for path, size, _ in entries:
+            if total <= max_bytes:
+                break
+            os.remove(path)
+            total -= size
+            freed += size
+            n += 1
+        return n, freed
+
+def parse_key(raw_csv) -> str:
+    return StageCache.key("parse", hashlib.sha256(raw_csv).digest())
+
+def points_key(pts, cfg, bits=None) -> str:
+    xy = np.ascontiguousarray(pts[["lat", "lon"]].to_numpy(dtype=np.float64))
+    h = hashlib.sha256(xy.tobytes())
+    if bits is not None:
+        h.update(np.asarray(bits, dtype=np.uint8).tobytes())
+    return StageCache.key("labels", h.digest(), [cfg[k] for k in GRID_KEYS])
+
+def hazard_points(pts_by_hazard):
+    """label_stage.hazard_points, without flags for the tornado-only case (keeps its cache keys simple)."""
+    pts, bits = label_stage.hazard_points(pts_by_hazard)
+    return pts, (None if list(pts_by_hazard) == ["torn"] else bits)
+
+def cached_parse(raw_csv, cache, parse_stats=None):
+    """parse_reports through the cache (row-repair counts are only known on a miss)."""
+    if cache is None:
+        return parse_stage.parse_reports(raw_csv, parse_stats)
+    key = parse_key(raw_csv)
+    xy = cache.get("parse", key)
+    if xy is not None:
+        return pd.DataFrame({"lat": xy[:, 0], "lon": xy[:, 1]})
+    pts = parse_stage.parse_reports(raw_csv, parse_stats)
+    cache.put("parse", key, pts[["lat", "lon"]].to_numpy(dtype=np.float64).reshape(-1, 2))
+    return pts
+
+def batch_parse(raw_by_date, cache, parse_stats=None) -> int:
+    """
+    Parses every raw CSV in {date: bytes or None} whose parse isn't cached
+    yet with one parse_reports_batch call, and caches each date's points so
+    the workers' cached_parse only reads them. Returns the number parsed.
+    """
+    todo = {d: raw for d, raw in raw_by_date.items() if raw is not None and not cache.has("parse", parse_key(raw))}
+    if not todo:
+        return 0
+    pts = parse_stage.parse_reports_batch(todo, parse_stats)
+    by_date = {d: g for d, g in pts.groupby("date", sort=False)}
+    for d, raw in todo.items():
+        xy = by_date[d][["lat", "lon"]].to_numpy(dtype=np.float64) if d in by_date else np.zeros((0, 2))
+        cache.put("parse", parse_key(raw), xy)
+    return len(todo)
 
-def append_csv(src_path: str, dest_path: str) -> None:
+def cached_labels(grid, cfg, pts_by_hazard, cache):
     """
-    Append CSV file to dest. If dest doesn't exist, create it (with header).
-    If dest exists, append without repeating header.
+    One grid.label pass over every hazard's points, through the cache.
+    Returns the HAZARD_BITS mask (plain 0/1 for tornado only); stored as one
+    bit-packed plane per bit.
     """
-    if not os.path.exists(src_path):
-        raise FileNotFoundError(src_path)
+    pts, bits = hazard_points(pts_by_hazard)
+    if cache is None:
+        return grid.label(pts, bits)
+    key = points_key(pts, cfg, bits)
+    packed = cache.get("labels", key)
+    if packed is not None:
+        planes = np.unpackbits(packed.reshape(-1, packed.shape[-1]), axis=1, count=grid.n_cells)
+        return np.bitwise_or.reduce(planes << np.arange(len(planes), dtype=np.uint8)[:, None], axis=0).astype(np.uint8)
+    labels = grid.label(pts, bits)
+    n_planes = max(label_stage.HAZARD_BITS[h] for h in pts_by_hazard).bit_length()
+    planes = (labels[None, :] >> np.arange(n_planes, dtype=np.uint8)[:, None]) & 1
+    cache.put("labels", key, np.packbits(planes.astype(bool), axis=1))
+    return labels
+
+def write_intermediates(out_dir, raw_csv, pts, labels, train) -> None:
+    """Writes the same per-stage files the standalone scripts produce (debug aid)."""
+    os.makedirs(out_dir, exist_ok=True)
+    for hazard, content in (raw_csv or {}).items():
+        if content is None:
+            continue
+        with open(os.path.join(out_dir, f"{hazard}.csv"), "wb") as f:
+            f.write(content)
+    for hazard, hazard_pts in pts.items():
+        hazard_pts.to_csv(os.path.join(out_dir, f"{hazard}_points.csv"), index=False)
+    labels.to_csv(os.path.join(out_dir, "grid_labels.csv"), index=False)
+    train.to_csv(os.path.join(out_dir, "train_v0.csv"), index=False)
+
+# ---------------- per-date completion tracking ----------------
+def read_done(date_str: str):
+    """Returns "OK"/"SKIP" if the date already finished, else None."""
+    path = os.path.join(DONE_DIR, date_str)
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return f.read().strip() or None
+
+def mark_done(date_str: str, status: str) -> None:
+    with open(os.path.join(DONE_DIR, date_str), "w", encoding="utf-8") as f:
+        f.write(status)
+
+class StageError(Exception):
+    """A pipeline stage raised; `stage` names which one."""
+
+    def __init__(self, stage, err):
+        super().__init__(f"{stage}: {err}")
+        self.stage = stage
+        self.err = err
 
-    # quick header handling
-    with open(src_path, "r", encoding="utf-8") as fsrc:
-        content = fsrc.read()
+def label_day(date_str, cfg, grid, *, fetcher=None, point_store=None, parse_stats=None, cache=None, metrics=None):
+    """
+    Runs fetch -> parse -> label for one date, in memory, for every hazard
+    in cfg["hazards"] (tornado only by default).
+    With a point_store (10_ingest_bulk_reports, tornado only), fetch/parse
+    are replaced by a lookup in the bulk report store.
 
-    if not os.path.exists(dest_path):
-        with open(dest_path, "w", encoding="utf-8") as fdst:
-            fdst.write(content)
+    Returns (raw_csv, pts, labels): raw CSV bytes and DataFrame[lat, lon]
+    per hazard, and labels a uint8 array in grid_id order (the HAZARD_BITS
+    mask when several hazards are labeled; all of them in one grid pass).
+    Returns None when there are no reports to go on for that date (no SPC
+    tornado CSV, or no CSV at all without torn in the hazards, or outside
+    the store's coverage): a SKIP, not a failure. A missing hail/wind CSV
+    next to a tornado one counts as zero reports of that hazard. Any stage exception is re-raised as StageError so
+    the caller can log which stage broke. Malformed-row counts from the
+    parse stage land in `parse_stats`.
+    With a StageCache, parse and label outputs are reused when their inputs
+    (raw file bytes, points + grid settings) are unchanged. Each stage's
+    timing, memory and row/byte counts go to `metrics` (12_stage_metrics).
+    """
+    metrics = metrics or stage_metrics.Metrics()
+    hazards = cfg.get("hazards", ["torn"])
+    raw_csv = None
+    if point_store is not None:
+        try:
+            with metrics.stage("points", date_str) as st:
+                torn = point_store.points(date_str)
+                st.update(rows_out=0 if torn is None else len(torn))
+        except Exception as e:
+            raise StageError("points", e) from e
+        if torn is None:
+            return None
+        pts = {"torn": torn}
     else:
-        # strip header (first line) when appending
-        lines = content.splitlines(True)
-        if len(lines) > 1:
-            with open(dest_path, "a", encoding="utf-8") as fdst:
-                fdst.writelines(lines[1:])
+        raw_csv = {}
+        pts = {}
+        for hazard in hazards:
+            suffix = "" if hazard == "torn" else f"_{hazard}"
+            try:
+                with metrics.stage("fetch" + suffix, date_str) as st:
+                    raw_csv[hazard] = fetch_stage.fetch_hazard_csv(date_str, hazard, fetcher)
+                    st.update(bytes_in=len(raw_csv[hazard] or b""))
+            except Exception as e:
+                raise StageError("fetch", e) from e
+            if raw_csv[hazard] is None:
+                if hazard == "torn":
+                    return None
+                pts[hazard] = pd.DataFrame({"lat": np.zeros(0), "lon": np.zeros(0)})
+                continue
+
+            raw = raw_csv[hazard]
+            try:
+                with metrics.stage("parse" + suffix, date_str) as st:
+                    pts[hazard] = cached_parse(raw, cache, parse_stats)
+                    st.update(bytes_in=len(raw), rows_in=max(raw.count(b"\n") - 1, 0), rows_out=len(pts[hazard]))
+            except Exception as e:
+                raise StageError("parse", e) from e
+        if all(raw is None for raw in raw_csv.values()):
+            return None
+
+    try:
+        with metrics.stage("labels", date_str) as st:
+            labels = cached_labels(grid, cfg, pts, cache)
+            st.update(rows_in=sum(len(p) for p in pts.values()), rows_out=len(labels))
+    except Exception as e:
+        raise StageError("labels", e) from e
+    return raw_csv, pts, labels
+
+def day_tables(grid, date_str, labels, metrics=None, hazards=("torn",)):
+    """Label array -> (grid_labels frame, train_v0 frame); one DataFrame row per cell."""
+    metrics = metrics or stage_metrics.Metrics()
+    try:
+        with metrics.stage("features", date_str) as st:
+            labels_df = label_stage.labels_frame(grid, date_str, labels, hazards)
+            train = feature_stage.add_season_features(labels_df, date_str)
+            st.update(rows_in=len(labels), rows_out=len(train))
+        return labels_df, train
+    except Exception as e:
+        raise StageError("features", e) from e
+
+# ---------------- workers ----------------
+_worker = {}
+
+def init_worker(cfg, keep_intermediates, scratch_root, point_store_dir=None, cache_dir=None, metrics=None):
+    """Pool initializer: each worker loads the cached grid and makes its scratch dir once."""
+    _worker["cfg"] = cfg
+    _worker["metrics"] = metrics or stage_metrics.Metrics()
+    _worker["cache"] = StageCache(cache_dir) if cache_dir else None
+    _worker["grid"] = label_stage.grid_from_config(cfg)
+    # Raw files were prefetched by the parent; workers only read the cache
+    _worker["fetcher"] = fetch_stage.SpcFetcher(offline=True)
+    _worker["point_store"] = bulk_stage.PointStore(point_store_dir) if point_store_dir else None
+    _worker["keep_intermediates"] = keep_intermediates
+    _worker["scratch"] = os.path.join(scratch_root, f"w{os.getpid()}")
+    _worker["store"] = MasterStore()
+    os.makedirs(_worker["scratch"], exist_ok=True)
+
+def run_date(date_str):
+    """
+    Worker entry point: builds one date and publishes its label partition.
+    Returns (date_str, status, detail) with status OK / SKIP / FAIL.
+
+    Nothing here touches shared files except the date's own partition,
+    which is written in the worker's scratch dir and moved into place.
+    """
+    scratch = _worker["scratch"]
+    intermediates_dir = os.path.join(scratch, date_str) if _worker["keep_intermediates"] else None
+    grid = _worker["grid"]
+    stats = parse_stage.new_parse_stats()
+    try:
+        result = label_day(
+            date_str, _worker["cfg"], grid,
+            fetcher=_worker["fetcher"], point_store=_worker["point_store"], parse_stats=stats,
+            cache=_worker["cache"], metrics=_worker["metrics"],
+        )
+        if result is not None and intermediates_dir:
+            raw_csv, pts, labels = result
+            tables = day_tables(grid, date_str, labels, _worker["metrics"], list(pts))
+            with _worker["metrics"].stage("write_intermediates", date_str):
+                write_intermediates(intermediates_dir, raw_csv, pts, *tables)
+    except StageError as e:
+        # Network trouble or a 5xx (nothing cached for the date) is retried on the next run;
+        # only a cached 404 (label_day -> None) is a SKIP
+        return date_str, "FAIL", str(e)
+
+    if result is None:
+        return date_str, "SKIP", "not in point store" if _worker["point_store"] else "fetch"
+
+    labels = result[2]
+    with _worker["metrics"].stage("write_partition", date_str) as st:
+        _worker["store"].write_partition(date_str, labels, scratch)
+        st.update(rows_out=len(labels), bytes_out=labels.nbytes)
+    detail = f"rows={len(labels)}"
+    if stats["repaired"] or stats["skipped"]:
+        detail += f" repaired={stats['repaired']} skipped={stats['skipped']}"
+    return date_str, "OK", detail
+
+def done_ok_dates():
+    return sorted(d for d in os.listdir(DONE_DIR) if read_done(d) == "OK")
+
+def dry_run_report(dates, cfg, cache, point_store_dir=None, rebuild=False):
+    """
+    What a build of `dates` would redo, without fetching, parsing or labeling:
+    one row per date with the done marker and, per stage, whether its output
+    is cached ("hit"), must be computed ("run"), is not needed ("-", "404"),
+    or can't be known before an earlier stage runs ("?"). With several
+    hazards, fetch/parse show the least-cached hazard; a hail/wind 404 is
+    just zero reports (see label_day).
+    """
+    fetcher = fetch_stage.SpcFetcher(offline=True)
+    point_store = bulk_stage.PointStore(point_store_dir) if point_store_dir else None
+    hazards = cfg.get("hazards", ["torn"])
+    rows = []
+    for d in dates:
+        row = {"date": d, "done": None if rebuild else read_done(d), "fetch": "-", "parse": "-", "labels": "?"}
+        if row["done"] is not None:
+            row.update(fetch="-", parse="-", labels="-")
+        elif point_store is not None:
+            pts = point_store.points(d)
+            row["labels"] = "-" if pts is None else ("hit" if cache.has("labels", points_key(label_stage.clean_points(pts), cfg)) else "run")
+        else:
+            # (fetch, parse, cached points) per hazard
+            states = []
+            for hazard in hazards:
+                kind = fetch_stage.HAZARD_KINDS[hazard]
+                meta = fetcher.cached_meta(d, kind)
+                if meta is None:
+                    states.append(("run", "?", None))
+                elif meta.get("status") != 200:
+                    states.append(("404", "-", None))
+                else:
+                    key = parse_key(fetcher.fetch(d, kind))
+                    if cache.has("parse", key):
+                        xy = np.load(cache.path("parse", key))
+                        states.append(("hit", "hit", pd.DataFrame({"lat": xy[:, 0], "lon": xy[:, 1]})))
+                    else:
+                        states.append(("hit", "run", None))
+            missing = [h for h, (f, _, _) in zip(hazards, states) if f == "404"]
+            empty = pd.DataFrame({"lat": np.zeros(0), "lon": np.zeros(0)})
+            states = [("-", "-", empty) if f == "404" else (f, p, xy) for f, p, xy in states]
+            fetch = [f for f, _, _ in states]
+            parse = [p for _, p, _ in states]
+            if "torn" in missing or len(missing) == len(hazards):
+                row.update(fetch="404", parse="-", labels="-")
+            else:
+                row["fetch"] = "run" if "run" in fetch else "hit"
+                row["parse"] = "run" if "run" in parse else ("?" if "?" in parse else "hit")
+                if row["parse"] == "hit":
+                    pts, bits = hazard_points({h: st[2] for h, st in zip(hazards, states)})
+                    row["labels"] = "hit" if cache.has("labels", points_key(pts, cfg, bits)) else "run"
+        rows.append(row)
+    return pd.DataFrame(rows)
 
 def main():
     """
-    Builds a multi-day training dataset by looping dates and running:
-      01_fetch.py -> 02_compute_tpi.py -> 04_make_grid_and_labels.py -> 05_make_features_v0.py
+    Builds a multi-day training dataset by running, for every date:
+      01_fetch -> 02_compute_tpi -> 04_make_grid_and_labels -> 05_extract_env_features
+
+    Stages run in-process. With WORKERS>1 dates are sharded across a process
+    pool; each worker loads the cached grid and keeps its own scratch dir
+    (data/scratch/run<pid>/w<pid>), and the parent is the only writer of the
+    master store, appending days in date order as they complete.
+
+    Raw report CSVs for pending dates are fetched first, concurrently over one
+    pooled session at FETCH_RATE requests/sec, into the data/raw/ cache
+    (FETCH_REVALIDATE=0 trusts cached files without a conditional GET).
+    With POINT_STORE=data/point_store (built by 10_ingest_bulk_reports.py)
+    nothing is fetched: reports come from the bulk store, and quiet days
+    inside its coverage are kept as all-zero days.
+
+    Grid settings (extent, grid_res_deg, radius_miles) and the hazards to
+    label (`hazards: [torn, hail, wind]`, one bitmask pass per date) come
+    from config.yml, which is read once and never rewritten. Set
+    KEEP_INTERMEDIATE=1 to also keep the raw and parsed report CSVs,
+    grid_labels.csv and train_v0.csv per date under the worker's scratch dir.
+
+    Finished dates (OK or SKIP) get a marker in data/.done/, so reruns only
+    redo missing and FAILed dates, whatever order they finished in.
+
+    Parse and label outputs go to a content-addressed StageCache
+    (data/stage_cache/, STAGE_CACHE=0 to disable), so after changing e.g.
+    radius_miles, RESET=1 starts master_v0 and data/.done over and only the
+    label stage is recomputed (with FETCH_REVALIDATE=0 nothing is fetched).
+    DRY_RUN=1 prints which stages each date would recompute and exits.
+    CACHE_MAX_MB evicts least-recently-used cache entries after the build.
+
+    NEG_FRAC=0.05 also writes a negative-downsampled view of the store
+    (MasterStore.write_sample: every positive, 5% of negatives drawn with
+    SAMPLE_SEED, weight 1/NEG_FRAC per kept negative); 06 trains on it with
+    the weights. Later runs refresh it with the same settings; NEG_FRAC=1
+    removes it.
+
+    Every stage run (per date in the workers, prefetch/append/rebuild in
+    the parent) appends wall/CPU time, peak RSS and row/byte counts to
+    logs/build_metrics.jsonl (METRICS_LOG to change, "" to disable);
+    12_stage_metrics.py summarizes a run.
 
     Output:
-      data/train_master_v0.csv  (appended across days)
-      data/daily/YYYYMMDD_train_v0.csv (per-day snapshot)
+      data/master_v0/  (MasterStore: grid once + uint8 labels per OK day, in date order)
       logs/build_dataset.log
     """
     ensure_dirs()
@@ -78,97 +729,194 @@ def main():
     # --------- set your range here ----------
     START = os.environ.get("START_DATE", "2015-01-01")
     END   = os.environ.get("END_DATE",   "2015-12-31")
-    SLEEP_SEC = float(os.environ.get("SLEEP_SEC", "0.5"))  # be polite to SPC servers
+    FETCH_RATE = float(os.environ.get("FETCH_RATE", "2"))  # requests/sec; be polite to SPC servers
+    FETCH_WORKERS = int(os.environ.get("FETCH_WORKERS", "4"))
+    FETCH_REVALIDATE = os.environ.get("FETCH_REVALIDATE", "1") == "1"
+    KEEP_INTERMEDIATE = os.environ.get("KEEP_INTERMEDIATE", "0") == "1"
+    WORKERS = int(os.environ.get("WORKERS", "1"))
+    POINT_STORE = os.environ.get("POINT_STORE", "")
+    STAGE_CACHE = os.environ.get("STAGE_CACHE", "1") == "1"
+    CACHE_MAX_MB = float(os.environ.get("CACHE_MAX_MB", "0"))
+    DRY_RUN = os.environ.get("DRY_RUN", "0") == "1"
+    RESET = os.environ.get("RESET", "0") == "1"
+    NEG_FRAC = float(os.environ["NEG_FRAC"]) if os.environ.get("NEG_FRAC") else None
+    SEED = int(os.environ.get("SAMPLE_SEED", str(SAMPLE_SEED)))
+
+    if NEG_FRAC is not None and not 0 < NEG_FRAC <= 1:
+        print(f"NEG_FRAC must be in (0, 1], got {NEG_FRAC}", file=sys.stderr)
+        sys.exit(1)
 
     start_dt = datetime.strptime(START, "%Y-%m-%d")
     end_dt = datetime.strptime(END, "%Y-%m-%d")
 
-    master_out = "data/train_master_v0.csv"
     log_path = "logs/build_dataset.log"
+    metrics = stage_metrics.from_env(stage_metrics.BUILD_METRICS_LOG)
 
-    # If you want to resume safely, keep a checkpoint file
-    checkpoint_path = "data/.checkpoint_last_date.txt"
-    if os.path.exists(checkpoint_path):
-        with open(checkpoint_path, "r", encoding="utf-8") as f:
-            last = f.read().strip()
-        if last:
-            try:
-                last_dt = datetime.strptime(last, "%Y-%m-%d")
-                if last_dt >= start_dt and last_dt < end_dt:
-                    start_dt = last_dt + timedelta(days=1)
-                    print(f"Resuming after checkpoint date {last}")
-            except Exception:
-                pass
+    cfg = label_stage.read_config()
+    cache = StageCache() if STAGE_CACHE else None
+    store = MasterStore()
+    if POINT_STORE and cfg["hazards"] != ["torn"]:
+        print(f"POINT_STORE only holds tornado reports; config.yml has hazards: {cfg['hazards']}", file=sys.stderr)
+        sys.exit(1)
 
+    all_dates = []
     dt = start_dt
+    while dt <= end_dt:
+        all_dates.append(dt.strftime("%Y-%m-%d"))
+        dt += timedelta(days=1)
+
+    if DRY_RUN:
+        report = dry_run_report(all_dates, cfg, cache or StageCache(), POINT_STORE or None, rebuild=RESET)
+        print(report.to_string(index=False))
+        pending = report[report["done"].isna()]
+        print(f"\n{len(pending)} of {len(report)} dates pending: "
+              + ", ".join(f"{stage} run={int((pending[stage] == 'run').sum())} hit={int((pending[stage] == 'hit').sum())}"
+                          for stage in ("fetch", "parse", "labels")))
+        if store.exists() and not RESET:
+            have = store.settings()
+            if have != store_settings(cfg):
+                print(f"{store.root} was built with {have}; the build needs RESET=1")
+        if cache is not None:
+            print(f"Stage cache: {cache.size_bytes() / 1e6:.1f} MB in {cache.root}")
+        return
+
+    if RESET:
+        print(f"RESET: clearing {store.root} and {DONE_DIR}")
+        shutil.rmtree(store.root, ignore_errors=True)
+        shutil.rmtree(DONE_DIR, ignore_errors=True)
+        ensure_dirs()
+    try:
+        # Builds (or reads) the grid cache before any worker needs it
+        store.init(label_stage.grid_from_config(cfg), cfg)
+    except ValueError as e:
+        print(str(e), file=sys.stderr)
+        sys.exit(1)
+
+    todo = [d for d in all_dates if read_done(d) is None]
+    if len(todo) < len(all_dates):
+        print(f"Resuming: {len(all_dates) - len(todo)} of {len(all_dates)} dates already done")
+
+    # A rerun that fills a gap before an already-merged day can't just append
+    already_ok = done_ok_dates()
+    needs_rebuild = bool(todo and already_ok and min(todo) < max(already_ok))
+    scratch_root = os.path.join(SCRATCH_DIR, f"run{os.getpid()}")
+
     n_ok = 0
     n_skip = 0
     n_fail = 0
 
     with open(log_path, "a", encoding="utf-8") as log:
-        log.write(f"\n=== build run {datetime.utcnow().isoformat()}Z | {START} -> {END} ===\n")
+        log.write(f"\n=== build run {datetime.utcnow().isoformat()}Z | {START} -> {END} | workers={WORKERS} ===\n")
 
-    while dt <= end_dt:
-        date_str = dt.strftime("%Y-%m-%d")
-        stamp = dt.strftime("%Y%m%d")
-        print("\n" + "=" * 80)
-        print(f"DATE: {date_str}")
-        print("=" * 80)
-
-        # Update config.yml date (your scripts read it)
-        set_config_date("config.yml", date_str)
-
-        # Run pipeline
-        # Note: 01_fetch.py exits nonzero if no tornado CSV exists for that day
-        # We'll treat that as a SKIP (not a failure).
-        rc1 = run_cmd([sys.executable, "01_fetch.py"])
-        if rc1 != 0:
-            print(f"SKIP (no tornado CSV / fetch failed) for {date_str}")
+    def commit(date_str, status, detail):
+        nonlocal n_ok, n_skip, n_fail
+        if status == "OK":
+            if not needs_rebuild:
+                with metrics.stage("append", date_str) as st:
+                    store.append(date_str)
+                    st.update(rows_out=store.n_cells, bytes_out=store.n_cells)
+            n_ok += 1
+            print(f"{date_str} OK ({detail})")
+            line = f"{date_str} OK {detail}"
+        elif status == "SKIP":
             n_skip += 1
-            with open(log_path, "a", encoding="utf-8") as log:
-                log.write(f"{date_str} SKIP fetch\n")
-            # checkpoint
-            with open(checkpoint_path, "w", encoding="utf-8") as f:
-                f.write(date_str)
-            dt += timedelta(days=1)
-            time.sleep(SLEEP_SEC)
-            continue
+            print(f"{date_str} SKIP (no reports: {detail})")
+            line = f"{date_str} SKIP {detail}"
+        else:
+            n_fail += 1
+            print(f"{date_str} FAIL: pipeline error ({detail})")
+            line = f"{date_str} FAIL {detail}"
+
+        with open(log_path, "a", encoding="utf-8") as log:
+            log.write(line + "\n")
+        if status != "FAIL":
+            mark_done(date_str, status)
 
-        rc2 = run_cmd([sys.executable, "02_compute_tpi.py"])
-        rc4 = run_cmd([sys.executable, "04_make_grid_and_labels.py"])
-        rc5 = run_cmd([sys.executable, "05_make_features_v0.py"])
+    # Fetch every pending date up front: one pooled session, concurrent but rate-limited.
+    # Cached raw files are revalidated with conditional GETs (or trusted as-is).
+    if todo and not POINT_STORE:
+        fetcher = fetch_stage.SpcFetcher(
+            rate_per_sec=FETCH_RATE, max_workers=FETCH_WORKERS, revalidate=FETCH_REVALIDATE
+        )
+        print(f"Fetching {len(todo)} dates x {len(cfg['hazards'])} hazards "
+              f"({FETCH_WORKERS} connections, {FETCH_RATE}/s) -> {fetcher.cache_dir}")
+        for hazard in cfg["hazards"]:
+            with metrics.stage("prefetch" if hazard == "torn" else f"prefetch_{hazard}") as st:
+                fetched = fetcher.fetch_many(todo, fetch_stage.HAZARD_KINDS[hazard])
+                st.update(rows_out=sum(v is not None for v in fetched.values()),
+                          bytes_in=sum(len(v) for v in fetched.values() if v is not None))
+            if cache is None:
+                continue
+            # Normalize the range's report files in one pass; workers then hit the parse cache
+            stats = parse_stage.new_parse_stats()
+            try:
+                with metrics.stage("batch_parse" if hazard == "torn" else f"batch_parse_{hazard}") as st:
+                    n_parsed = batch_parse(fetched, cache, stats)
+                    st.update(rows_in=stats["rows"], rows_out=n_parsed)
+            except ValueError as e:
+                # Left to the per-date parse, which reports the date that broke
+                print(f"Batch parse of {hazard} reports failed ({e}); parsing per date")
+                continue
+            if n_parsed:
+                print(f"Parsed {n_parsed} {hazard} report files in one pass "
+                      f"(repaired={stats['repaired']} skipped={stats['skipped']})")
 
-        if rc2 == 0 and rc4 == 0 and rc5 == 0 and os.path.exists("data/train_v0.csv"):
-            # Snapshot per day
-            daily_out = f"data/daily/{stamp}_train_v0.csv"
-            # Copy train_v0.csv -> daily snapshot
-            with open("data/train_v0.csv", "r", encoding="utf-8") as src, open(daily_out, "w", encoding="utf-8") as dst:
-                dst.write(src.read())
+    init_args = (cfg, KEEP_INTERMEDIATE, scratch_root, POINT_STORE or None, cache.root if cache else None, metrics)
+    if WORKERS > 1:
+        pool = mp.Pool(WORKERS, initializer=init_worker, initargs=init_args)
+        results = pool.imap_unordered(run_date, todo)
+    else:
+        pool = None
+        init_worker(*init_args)
+        results = map(run_date, todo)
 
-            # Append into master
-            append_csv("data/train_v0.csv", master_out)
+    # Single writer: buffer out-of-order completions, flush in date order
+    pending = {}
+    next_i = 0
+    try:
+        for date_str, status, detail in results:
+            pending[date_str] = (status, detail)
+            while next_i < len(todo) and todo[next_i] in pending:
+                commit(todo[next_i], *pending.pop(todo[next_i]))
+                next_i += 1
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
 
-            n_ok += 1
-            print(f"OK: appended -> {master_out}")
-            with open(log_path, "a", encoding="utf-8") as log:
-                log.write(f"{date_str} OK\n")
-        else:
-            n_fail += 1
-            print(f"FAIL: pipeline error on {date_str}")
-            with open(log_path, "a", encoding="utf-8") as log:
-                log.write(f"{date_str} FAIL rc2={rc2} rc4={rc4} rc5={rc5}\n")
+    if needs_rebuild:
+        print(f"Rebuilding {store.labels_path} in date order")
+        with metrics.stage("rebuild") as st:
+            store.rebuild(done_ok_dates())
+            st.update(rows_out=len(store.dates()), bytes_out=len(store.dates()) * store.n_cells)
 
-        # checkpoint
-        with open(checkpoint_path, "w", encoding="utf-8") as f:
-            f.write(date_str)
+    # Scratch dirs are only worth keeping when they hold intermediates
+    if not KEEP_INTERMEDIATE:
+        shutil.rmtree(scratch_root, ignore_errors=True)
 
-        dt += timedelta(days=1)
-        time.sleep(SLEEP_SEC)
+    # Negative-downsampled view: written with NEG_FRAC, kept in step with the store on later runs
+    old = store.sample_meta(current=False)
+    if NEG_FRAC == 1:
+        shutil.rmtree(store.sample_dir, ignore_errors=True)
+    elif NEG_FRAC is not None or (old and store.sample_meta() is None):
+        neg_frac, seed = (NEG_FRAC, SEED) if NEG_FRAC is not None else (old["neg_frac"], old["seed"])
+        with metrics.stage("sample") as st:
+            meta = store.write_sample(neg_frac, seed)
+            st.update(rows_in=len(store.dates()) * store.n_cells, rows_out=meta["n_rows"])
+        print(f"Sample: {meta['n_rows']} of {len(store.dates()) * store.n_cells} rows "
+              f"(all positives + {neg_frac:g} of negatives, seed {seed}) -> {store.sample_dir}")
+
+    if cache is not None and CACHE_MAX_MB > 0:
+        n_evicted, freed = cache.evict(int(CACHE_MAX_MB * 1e6))
+        if n_evicted:
+            print(f"Stage cache: evicted {n_evicted} entries ({freed / 1e6:.1f} MB)")
 
     print("\nDONE")
     print(f"OK={n_ok}  SKIP={n_skip}  FAIL={n_fail}")
-    print(f"Master dataset: {master_out}")
+    print(f"Master dataset: {store.root} ({len(store.dates())} days x {store.n_cells} cells)")
     print(f"Log: {log_path}")
+    if metrics.path:
+        print(f"Stage metrics: {metrics.path} (run {metrics.run_id}; summary: python 12_stage_metrics.py)")
 
 if __name__ == "__main__":
     main()
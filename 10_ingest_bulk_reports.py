@@ -0,0 +1,146 @@
+import os
+import sys
+import json
+import importlib
+import numpy as np
+import pandas as pd
+
+parse_stage = importlib.import_module("02_compute_tpi")
+
+STORE_DIR = "data/point_store"
+
+# SPC historical tornado database (e.g. 1950-2023_actual_tornadoes.csv) uses
+# date/time/tz/slat/slon; plain report CSVs with a date column work too.
+DATE_CANDIDATES = ["date", "Date", "DATE"]
+LAT_CANDIDATES = ["slat"] + parse_stage.LAT_CANDIDATES
+LON_CANDIDATES = ["slon"] + parse_stage.LON_CANDIDATES
+
+TZ_CST = 3   # SPC database tz code for CST (local standard time, UTC-6)
+TZ_GMT = 9
+
+def read_bulk_reports(path):
+    """
+    Parses a multi-year tornado report CSV in one vectorized pass.
+    Returns DataFrame[date (datetime64, day), lat, lon] sorted by date, with
+    attrs["years"] = (first, last) calendar year found in the source.
+
+    When time/tz columns are present, each report is shifted to the SPC
+    convective day (12Z-12Z) so dates line up with the daily report files;
+    otherwise the file's own date column is used.
+    """
+    header = pd.read_csv(path, nrows=0).columns
+    date_col = next((c for c in DATE_CANDIDATES if c in header), None)
+    lat_col = next((c for c in LAT_CANDIDATES if c in header), None)
+    lon_col = next((c for c in LON_CANDIDATES if c in header), None)
+    if date_col is None or lat_col is None or lon_col is None:
+        raise ValueError(f"Need date and lat/lon columns. Columns are: {list(header)}")
+
+    usecols = [date_col, lat_col, lon_col] + [c for c in ("time", "tz") if c in header]
+    df = pd.read_csv(path, usecols=usecols, dtype={date_col: str, "time": str})
+
+    day = pd.to_datetime(df[date_col], errors="coerce").dt.normalize()
+    if "time" in df.columns and "tz" in df.columns:
+        local = pd.to_datetime(df[date_col] + " " + df["time"], errors="coerce")
+        tz = pd.to_numeric(df["tz"], errors="coerce")
+        offset = np.where(tz == TZ_CST, 6, np.where(tz == TZ_GMT, 0, np.nan))
+        utc = local + pd.to_timedelta(offset, unit="h")
+        conv_day = (utc - pd.Timedelta(hours=12)).dt.normalize()
+        day = conv_day.fillna(day)
+
+    years = pd.to_datetime(df[date_col], errors="coerce").dt.year.dropna()
+
+    pts = pd.DataFrame({"date": day, "lat": df[lat_col], "lon": df[lon_col]})
+    pts = parse_stage.clean_report_points(pts.dropna(subset=["date"]))
+    pts = pts.sort_values("date", kind="stable").reset_index(drop=True)
+    if len(years):
+        pts.attrs["years"] = (int(years.min()), int(years.max()))
+    return pts
+
+def write_point_store(pts, store_dir=STORE_DIR):
+    """
+    Writes report points partitioned by date:
+      lat.npy, lon.npy   all points, grouped by date
+      days.npy           sorted unique dates (datetime64[D])
+      offsets.npy        points for days[i] are [offsets[i], offsets[i+1])
+      meta.json          coverage (first/last day the source vouches for)
+    Days inside the coverage with no entry had no reports.
+    """
+    os.makedirs(store_dir, exist_ok=True)
+    day = pts["date"].to_numpy().astype("datetime64[D]")
+    days, starts = np.unique(day, return_index=True)
+    offsets = np.append(starts, len(day)).astype(np.int64)
+
+    np.save(os.path.join(store_dir, "lat.npy"), pts["lat"].to_numpy(dtype=np.float64))
+    np.save(os.path.join(store_dir, "lon.npy"), pts["lon"].to_numpy(dtype=np.float64))
+    np.save(os.path.join(store_dir, "days.npy"), days)
+    np.save(os.path.join(store_dir, "offsets.npy"), offsets)
+
+    # The database covers whole years, quiet days included
+    meta = {"n_points": int(len(day)), "n_days": int(len(days))}
+    years = pts.attrs.get("years")
+    if years is None and len(days):
+        years = (int(str(days[0])[:4]), int(str(days[-1])[:4]))
+    if years is not None:
+        meta["first"] = f"{years[0]:04d}-01-01"
+        meta["last"] = f"{years[1]:04d}-12-31"
+    with open(os.path.join(store_dir, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2)
+    return meta
+
+class PointStore:
+    """Read side of the point store; arrays are memory-mapped, lookups are a binary search."""
+
+    def __init__(self, store_dir=STORE_DIR):
+        self.store_dir = store_dir
+        with open(os.path.join(store_dir, "meta.json"), "r", encoding="utf-8") as f:
+            self.meta = json.load(f)
+        self.lat = np.load(os.path.join(store_dir, "lat.npy"), mmap_mode="r")
+        self.lon = np.load(os.path.join(store_dir, "lon.npy"), mmap_mode="r")
+        self.days = np.load(os.path.join(store_dir, "days.npy"))
+        self.offsets = np.load(os.path.join(store_dir, "offsets.npy"))
+
+    def covers(self, date_str: str) -> bool:
+        return "first" in self.meta and self.meta["first"] <= date_str <= self.meta["last"]
+
+    def points(self, date_str: str):
+        """Report points for a date as DataFrame[lat, lon], or None outside the coverage."""
+        if not self.covers(date_str):
+            return None
+        day = np.datetime64(date_str, "D")
+        i = int(np.searchsorted(self.days, day))
+        if i < len(self.days) and self.days[i] == day:
+            lo, hi = self.offsets[i], self.offsets[i + 1]
+        else:
+            lo = hi = 0
+        return pd.DataFrame({"lat": np.array(self.lat[lo:hi]), "lon": np.array(self.lon[lo:hi])})
+
+def main():
+    """
+    Ingests a bulk historical tornado CSV (local file) into the point store
+    that 09_build_dataset.py reads with POINT_STORE=data/point_store:
+
+      python 10_ingest_bulk_reports.py 1950-2023_actual_tornadoes.csv
+    """
+    if len(sys.argv) < 2:
+        print("Usage: python 10_ingest_bulk_reports.py <bulk_reports.csv> [store_dir]", file=sys.stderr)
+        sys.exit(1)
+
+    in_csv = sys.argv[1]
+    store_dir = sys.argv[2] if len(sys.argv) > 2 else STORE_DIR
+    if not os.path.exists(in_csv):
+        print(f"Missing {in_csv}", file=sys.stderr)
+        sys.exit(1)
+
+    try:
+        pts = read_bulk_reports(in_csv)
+    except ValueError as e:
+        print(str(e), file=sys.stderr)
+        sys.exit(1)
+
+    meta = write_point_store(pts, store_dir)
+    print(f"Saved {meta['n_points']} points over {meta['n_days']} report days -> {store_dir}")
+    if "first" in meta:
+        print(f"Coverage: {meta['first']} -> {meta['last']}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+import io
+import os
+import sys
+import json
+import threading
+import importlib
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+import numpy as np
+import joblib
+
+forecast_stage = importlib.import_module("07_forecast_day_v0")
+label_stage = importlib.import_module("04_make_grid_and_labels")
+
+HOST = "127.0.0.1"
+PORT = 8787
+CACHE_DATES = 64     # recent date forecasts kept per loaded model
+
+class ForecastService:
+    """
+    Warm 07 forecaster: the model pack and the per-cell feature matrix stay in
+    memory, so a date costs one predict_proba over the grid. The model file's
+    mtime is checked on every request and the pack reloaded when it changes.
+
+    The loaded model lives in one (model, feat_cols, base, cache) tuple,
+    replaced whole under the lock and read once per request, so a request
+    that overlaps a reload uses (and caches into) a single model.
+    """
+
+    def __init__(self, cfg, model_path=forecast_stage.MODEL_PATH):
+        self.model_path = model_path
+        self.lats, self.lons = label_stage.grid_axes(cfg["extent"], cfg["grid_res_deg"])
+        self.cfg = cfg
+        self.lock = threading.Lock()
+        self.mtime = None
+        self.state = None
+        self.reload_if_changed()
+
+    def reload_if_changed(self) -> bool:
+        mtime = os.stat(self.model_path).st_mtime_ns
+        if mtime == self.mtime:
+            return False
+        with self.lock:
+            if mtime == self.mtime:
+                return False
+            try:
+                pack = joblib.load(self.model_path)
+                base = forecast_stage.cell_matrix(self.lats, self.lons, pack["features"])
+            except Exception as e:
+                # Half-written or unusable file: keep serving the loaded model, retry next request
+                if self.mtime is None:
+                    raise
+                print(f"Reload failed, keeping previous model: {e}", file=sys.stderr, flush=True)
+                return False
+            self.state = (pack["model"], pack["features"], base, {})
+            self.mtime = mtime
+        print(f"Loaded {self.model_path} ({len(base)} cells, features={pack['features']})", flush=True)
+        return True
+
+    def forecast(self, date_str: str):
+        """float32 probabilities for every grid cell (row-major, shape self.shape)."""
+        self.reload_if_changed()
+        model, feat_cols, base, cache = self.state
+        probs = cache.get(date_str)
+        if probs is None:
+            day = np.array([np.datetime64(date_str, "D")])
+            _, probs = next(forecast_stage.predict_dates(model, feat_cols, base, day))
+            probs = probs.astype(np.float32)
+            with self.lock:
+                if len(cache) >= CACHE_DATES:
+                    cache.pop(next(iter(cache)))
+                cache[date_str] = probs
+        return probs
+
+    @property
+    def shape(self):
+        return [len(self.lats), len(self.lons)]
+
+    def info(self) -> dict:
+        return {
+            "model": self.model_path, "model_mtime_ns": self.mtime, "features": list(self.state[1]),
+            "extent": self.cfg["extent"], "grid_res_deg": self.cfg["grid_res_deg"], "shape": self.shape,
+        }
+
+def make_handler(service):
+    class Handler(BaseHTTPRequestHandler):
+        """
+        GET /info                               model + grid description (JSON)
+        GET /forecast?date=YYYY-MM-DD           {"date", "shape", "probs": [...]} (JSON)
+        GET /forecast?date=YYYY-MM-DD&format=npy  the probability vector as a .npy body
+        """
+
+        def send(self, code, body, ctype="application/json"):
+            self.send_response(code)
+            self.send_header("Content-Type", ctype)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def send_json(self, code, obj):
+            self.send(code, json.dumps(obj).encode("utf-8"))
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            query = parse_qs(url.query)
+            if url.path == "/info":
+                service.reload_if_changed()
+                return self.send_json(200, service.info())
+            if url.path != "/forecast":
+                return self.send_json(404, {"error": f"Unknown path {url.path}"})
+
+            date_str = query.get("date", [""])[0]
+            try:
+                day = np.datetime64(date_str, "D")
+            except ValueError:
+                day = np.datetime64("NaT")
+            # "" and "NaT" parse to NaT rather than raising
+            if np.isnat(day):
+                return self.send_json(400, {"error": f"Bad date: {date_str!r} (want YYYY-MM-DD)"})
+            try:
+                probs = service.forecast(str(day))
+            except ValueError as e:
+                # e.g. the climatology index no longer matches the grid or the master store
+                return self.send_json(500, {"error": str(e)})
+
+            if query.get("format", ["json"])[0] == "npy":
+                buf = io.BytesIO()
+                np.save(buf, probs)
+                return self.send(200, buf.getvalue(), "application/octet-stream")
+            self.send_json(200, {"date": date_str, "shape": service.shape, "probs": np.round(probs, 6).tolist()})
+
+        def log_message(self, fmt, *args):
+            pass
+
+    return Handler
+
+def main():
+    """
+    Serves forecasts on a local HTTP port until interrupted:
+
+      python 11_serve_forecasts.py            (HOST/PORT env vars, default 127.0.0.1:8787)
+      curl 'http://127.0.0.1:8787/forecast?date=2024-05-20'
+    """
+    if not os.path.exists(forecast_stage.MODEL_PATH):
+        print("Missing model. Run 06_train_model_v0.py first.", file=sys.stderr)
+        sys.exit(1)
+
+    try:
+        service = ForecastService(label_stage.read_config())
+    except ValueError as e:
+        print(str(e), file=sys.stderr)
+        sys.exit(1)
+
+    host = os.environ.get("HOST", HOST)
+    port = int(os.environ.get("PORT", str(PORT)))
+    server = ThreadingHTTPServer((host, port), make_handler(service))
+    print(f"Serving forecasts on http://{host}:{port}/forecast?date=YYYY-MM-DD", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+if __name__ == "__main__":
+    main()
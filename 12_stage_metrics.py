@@ -0,0 +1,146 @@
+import os
+import sys
+import json
+import time
+from datetime import datetime
+
+try:
+    import resource
+except ImportError:  # not on Windows
+    resource = None
+
+BUILD_METRICS_LOG = "logs/build_metrics.jsonl"
+COUNTERS = ("rows_in", "rows_out", "bytes_in", "bytes_out")
+
+def new_run_id() -> str:
+    return f"{datetime.utcnow():%Y%m%dT%H%M%SZ}-{os.getpid()}"
+
+def _reset_peak_rss() -> bool:
+    """Resets the kernel's peak-RSS mark (Linux), so the next read is this stage's own peak."""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+def _peak_rss_mb():
+    try:
+        with open("/proc/self/status", "r") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    if resource is not None:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return None
+
+class StageRecord:
+    """One stage run; the stage fills the row/byte counters with update()."""
+
+    def __init__(self, metrics, stage, date):
+        self.metrics = metrics
+        self.fields = {"stage": stage, "date": date}
+        self.counters = dict.fromkeys(COUNTERS, 0)
+
+    def update(self, **counts) -> None:
+        for k, v in counts.items():
+            self.counters[k] += int(v)
+
+    def __enter__(self):
+        self.peak_is_stage = _reset_peak_rss()
+        self.wall0 = time.perf_counter()
+        self.cpu0 = time.process_time()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.metrics.emit(dict(
+            self.fields,
+            status="ok" if exc_type is None else "error",
+            wall_s=round(time.perf_counter() - self.wall0, 6),
+            cpu_s=round(time.process_time() - self.cpu0, 6),
+            peak_rss_mb=_peak_rss_mb(),
+            # False when the peak could not be reset: it is then the process-lifetime peak
+            peak_rss_per_stage=self.peak_is_stage,
+            **self.counters,
+        ))
+        return False
+
+class Metrics:
+    """
+    Appends one JSON line per stage run to `path` (a no-op when path is None).
+    Lines are written with a single append, so pool workers can share a file.
+
+      with metrics.stage("parse", date_str) as st:
+          pts = parse_reports(raw)
+          st.update(bytes_in=len(raw), rows_out=len(pts))
+    """
+
+    def __init__(self, path=None, run_id=None):
+        self.path = path
+        self.run_id = run_id or new_run_id()
+        if path:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+    def stage(self, stage, date=None) -> StageRecord:
+        return StageRecord(self, stage, date)
+
+    def emit(self, record) -> None:
+        if not self.path:
+            return
+        line = json.dumps(dict(run=self.run_id, pid=os.getpid(), ts=round(time.time(), 3), **record)) + "\n"
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(line)
+
+def from_env(default_path=None, run_id=None) -> Metrics:
+    """Metrics writing to $METRICS_LOG (or default_path); standalone scripts only log when it is set."""
+    return Metrics(os.environ.get("METRICS_LOG", default_path) or None, run_id)
+
+def read_metrics(path):
+    import pandas as pd
+    return pd.read_json(path, lines=True)
+
+def summarize(df):
+    """Per-stage percentiles of wall/CPU time and peak RSS, plus row/byte totals."""
+    import pandas as pd
+    rows = []
+    for stage, g in df.groupby("stage", sort=False):
+        row = {"stage": stage, "n": len(g), "errors": int((g["status"] != "ok").sum())}
+        for col in ("wall_s", "cpu_s"):
+            q = g[col].quantile([0.5, 0.9, 0.99])
+            row.update({f"{col}_p50": q[0.5], f"{col}_p90": q[0.9], f"{col}_p99": q[0.99],
+                        f"{col}_max": g[col].max(), f"{col}_total": g[col].sum()})
+        rss = pd.to_numeric(g["peak_rss_mb"], errors="coerce")
+        row.update({"rss_mb_p50": rss.quantile(0.5), "rss_mb_max": rss.max()})
+        row.update({k: int(g[k].sum()) for k in COUNTERS})
+        rows.append(row)
+    return pd.DataFrame(rows)
+
+def main():
+    """
+    Summarizes a metrics log (one build run; the latest by default):
+
+      python 12_stage_metrics.py [logs/build_metrics.jsonl] [run_id|all]
+    """
+    import pandas as pd
+    path = sys.argv[1] if len(sys.argv) > 1 else BUILD_METRICS_LOG
+    if not os.path.exists(path):
+        print(f"Missing {path}. Run 09_build_dataset.py (or a stage with METRICS_LOG set) first.", file=sys.stderr)
+        sys.exit(1)
+
+    df = read_metrics(path)
+    run = sys.argv[2] if len(sys.argv) > 2 else df.sort_values("ts")["run"].iloc[-1]
+    if run != "all":
+        df = df[df["run"] == run]
+        if df.empty:
+            print(f"No records for run {run} in {path}", file=sys.stderr)
+            sys.exit(1)
+
+    table = summarize(df)
+    print(f"Run: {run} ({len(df)} stage records, {df['date'].nunique()} dates)")
+    with pd.option_context("display.width", 200, "display.max_columns", None, "display.float_format", "{:.4g}".format):
+        print(table.set_index("stage").T.to_string())
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,247 @@
+import os
+import sys
+import json
+import time
+import shutil
+import platform
+import tempfile
+import importlib
+import subprocess
+from datetime import datetime
+import numpy as np
+import pandas as pd
+
+parse_stage = importlib.import_module("02_compute_tpi")
+label_stage = importlib.import_module("04_make_grid_and_labels")
+feature_stage = importlib.import_module("05_extract_env_features")
+train_stage = importlib.import_module("06_train_model_v0")
+forecast_stage = importlib.import_module("07_forecast_day_v0")
+build = importlib.import_module("09_build_dataset")
+
+BENCH_DIR = "bench"
+EXTENT = [-125.0, -66.0, 24.0, 50.0]
+RADIUS_MILES = 25.0
+FEAT_COLS = ["lat", "lon", "doy_sin", "doy_cos"]
+
+# Report sets: (number of reports, number of storm clusters)
+DAY_KINDS = {"quiet": (2, 1), "typical": (15, 3), "outbreak": (350, 12)}
+
+# ---------------- synthetic data ----------------
+def synthetic_reports(kind, seed=0):
+    """
+    Report points for a quiet / typical / outbreak day (2011-04-27 scale:
+    hundreds of reports). Reports come in clusters along short SW->NE tracks
+    over the Plains and Southeast, like real storm days. DataFrame[lat, lon].
+    """
+    n, n_clusters = DAY_KINDS[kind] if isinstance(kind, str) else kind
+    rng = np.random.default_rng(seed)
+    centers = np.column_stack([rng.uniform(30, 43, n_clusters), rng.uniform(-100, -82, n_clusters)])
+    which = rng.integers(0, n_clusters, n)
+    along = rng.uniform(0, 3.0, n)
+    lat = centers[which, 0] + 0.6 * along + rng.normal(0, 0.25, n)
+    lon = centers[which, 1] + 1.0 * along + rng.normal(0, 0.25, n)
+    return pd.DataFrame({"lat": np.round(lat, 2), "lon": np.round(lon, 2)})
+
+def synthetic_spc_csv(pts, bad_rows=0):
+    """SPC daily tornado CSV bytes for the points (bad_rows have unquoted commas in Comments)."""
+    lines = ["Time,F_Scale,Location,County,State,Lat,Lon,Comments"]
+    for i, (lat, lon) in enumerate(zip(pts["lat"], pts["lon"])):
+        lines.append(f"{1200 + i % 1100:04d},UNK,2 N Town,County,OK,{lat:.2f},{lon:.2f},Tornado reported (OUN)")
+    for _ in range(bad_rows):
+        lines.append("1300,UNK,2 S Town,County,TX,33.10,-97.20,Power poles down, roof damage, trees down (FWD)")
+    return ("\n".join(lines) + "\n").encode()
+
+def synthetic_day_kind(date, rng):
+    """Seasonal mix of day kinds: outbreaks and typical days peak in spring."""
+    doy = (date - date.astype("datetime64[Y]")).astype(int) + 1
+    spring = np.exp(-0.5 * ((doy - 130) / 40.0) ** 2)
+    u = rng.random()
+    if u < 0.01 + 0.04 * spring:
+        return "outbreak"
+    if u < 0.2 + 0.5 * spring:
+        return "typical"
+    return "quiet"
+
+def synthetic_master(root, years, res_deg, seed=0):
+    """A multi-year MasterStore under `root`, labeled from synthetic report days."""
+    grid = label_stage.Grid.build(EXTENT, res_deg, RADIUS_MILES, stencil=res_deg >= label_stage.HIRES_RES_DEG)
+    cfg = {"extent": EXTENT, "grid_res_deg": res_deg, "radius_miles": RADIUS_MILES}
+    store = build.MasterStore(root)
+    store.init(grid, cfg)
+    scratch = os.path.join(root, "scratch")
+    os.makedirs(scratch, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    dates = np.arange(np.datetime64("2001-01-01"), np.datetime64(f"{2001 + years}-01-01"))
+    for i, d in enumerate(dates):
+        pts = synthetic_reports(synthetic_day_kind(d, rng), seed=seed + i)
+        store.write_partition(str(d), grid.label(pts), scratch)
+        store.append(str(d))
+    return store, grid
+
+def synthetic_env_fields(dates, lats, lons, names=("cape", "shear"), seed=0):
+    """
+    Smooth daily fields on a source grid: {name: float32 (n_dates, n_lat, n_lon)}.
+    A seasonal, southward-peaked base pattern plus a drifting wave per day,
+    roughly CAPE/shear-like in scale; enough to exercise EnvStore.
+    """
+    rng = np.random.default_rng(seed)
+    doy = feature_stage.season_arrays(dates)[0][:, None, None]
+    la = np.asarray(lats)[None, :, None]
+    lo = np.asarray(lons)[None, None, :]
+    out = {}
+    for k, name in enumerate(names):
+        phase = rng.uniform(0, 2 * np.pi)
+        base = np.exp(-((la - 32.0) / 10.0) ** 2) * (1 + 0.8 * np.sin(2 * np.pi * (doy - 80) / 365.25))
+        wave = 0.3 * np.sin(np.radians(lo * 3 + doy * 7 + phase)) * np.cos(np.radians(la * 4))
+        out[name] = ((base + wave) * (1500.0 if k == 0 else 25.0)).astype(np.float32)
+    return out
+
+# ---------------- timing ----------------
+def timeit(fn, repeat=3):
+    """Runs fn `repeat` times; returns (best, median) seconds and the last result."""
+    times = []
+    out = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn()
+        times.append(time.perf_counter() - t0)
+    return min(times), float(np.median(times)), out
+
+class Results:
+    def __init__(self, repeat):
+        self.repeat = repeat
+        self.rows = []
+
+    def run(self, name, fn, **params):
+        best, median, out = timeit(fn, self.repeat)
+        self.rows.append(dict(name=name, params=params, best_s=round(best, 6), median_s=round(median, 6), repeat=self.repeat))
+        label = " ".join(f"{k}={v}" for k, v in params.items())
+        print(f"{name:<22} {label:<40} best {best * 1000:10.2f} ms  median {median * 1000:10.2f} ms", flush=True)
+        return out
+
+def environment():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = ""
+    return {
+        "python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count(),
+        "numpy": np.__version__, "pandas": pd.__version__, "git_commit": commit or None,
+    }
+
+# ---------------- suite ----------------
+def run_suite(resolutions, years, repeat, workdir):
+    res = Results(repeat)
+
+    for kind in DAY_KINDS:
+        raw = synthetic_spc_csv(synthetic_reports(kind), bad_rows=2)
+        res.run("parse_reports", lambda: parse_stage.parse_reports(raw), day=kind, bytes=len(raw))
+
+    for r in resolutions:
+        stencil = r >= label_stage.HIRES_RES_DEG
+        res.run("make_grid", lambda: label_stage.make_grid(EXTENT, r), res_deg=r)
+        grid = res.run("Grid.build", lambda: label_stage.Grid.build(EXTENT, r, RADIUS_MILES, stencil=stencil),
+                       res_deg=r, stencil=stencil)
+        for kind in DAY_KINDS:
+            pts = synthetic_reports(kind)
+            res.run("Grid.label", lambda: grid.label(pts), res_deg=r, day=kind, n_cells=grid.n_cells)
+        if r >= 0.25:
+            pts = synthetic_reports("typical")
+            res.run("label_grid_balltree", lambda: label_stage.label_grid(grid.frame, pts, RADIUS_MILES),
+                    res_deg=r, day="typical")
+        labels = grid.label(synthetic_reports("typical"))
+        res.run("add_season_features", lambda: feature_stage.add_season_features(
+            label_stage.labels_frame(grid, "2011-04-27", labels), "2011-04-27"), res_deg=r)
+
+    # Multi-year tables at the coarsest resolution
+    r = max(resolutions)
+    store_root = os.path.join(workdir, "master")
+    t0 = time.perf_counter()
+    store, grid = synthetic_master(store_root, years, r)
+    print(f"(synthetic master: {years}y x {store.n_cells} cells in {time.perf_counter() - t0:.1f}s)")
+    n_dates = len(store.dates())
+    res.run("MasterStore.xy", lambda: store.xy(FEAT_COLS, rows=slice(0, 365)), res_deg=r, days=365)
+    res.run("train_streaming", lambda: train_stage.train_streaming(store, FEAT_COLS, chunk_days=60, epochs=1),
+            res_deg=r, days=n_dates, chunk_days=60, epochs=1)
+    X, y = store.xy(FEAT_COLS, rows=slice(0, min(n_dates, 180)))
+    model = res.run("LogisticRegression.fit", lambda: train_stage.LogisticRegression(max_iter=1000, class_weight="balanced").fit(X, y),
+                    res_deg=r, rows=len(y))
+
+    # Gridded env fields: one year of 2 fields on a 0.25 deg source grid, sampled at every cell
+    env = feature_stage.EnvStore(os.path.join(workdir, "env"))
+    src_lat = np.arange(55.0, 19.75, -0.25)    # ERA5-style descending latitudes
+    src_lon = np.arange(-130.0, -60.0, 0.25)
+    env.init(src_lat, src_lon)
+    year = np.arange(np.datetime64("2011-01-01"), np.datetime64("2012-01-01"))
+    fields = synthetic_env_fields(year, src_lat, src_lon)
+    for name, values in fields.items():
+        res.run("EnvStore.write", lambda: env.write(name, year, values), field=name, days=len(year))
+    cell_lat, cell_lon = store.columns(["lat", "lon"], rows=slice(0, 1)).values()
+    # Weights are cached on disk after the first call; time the uncached build
+    weights_dir = os.path.join(env.root, "weights")
+    weights = res.run("EnvStore.interp_weights", lambda: (shutil.rmtree(weights_dir, ignore_errors=True),
+                                                          env.interp_weights(cell_lat, cell_lon))[1],
+                      res_deg=r, n_cells=len(cell_lat))
+    res.run("EnvStore.extract", lambda: env.extract(list(fields), year, weights),
+            res_deg=r, days=len(year), fields=len(fields))
+
+    spec = train_stage.compact_spec(model, FEAT_COLS, {"extent": EXTENT, "grid_res_deg": r, "radius_miles": RADIUS_MILES})
+    compact = forecast_stage.CompactModel(spec)
+    for rr in resolutions:
+        lats, lons = label_stage.grid_axes(EXTENT, rr)
+        base = forecast_stage.cell_matrix(lats, lons, FEAT_COLS)
+        days = year if rr >= 0.1 else year[:30]
+        for name, m in (("sklearn", model), ("compact", compact)):
+            res.run("forecast_dates", lambda: sum(1 for _ in forecast_stage.predict_dates(m, FEAT_COLS, base, days)),
+                    res_deg=rr, days=len(days), model=name)
+    return res.rows
+
+def compare(rows, baseline_path):
+    """Prints median time ratios against a previous results file (>1 means slower now)."""
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        base = {(r["name"], json.dumps(r["params"], sort_keys=True)): r for r in json.load(f)["results"]}
+    print(f"\nvs {baseline_path} (median ratio, >1 = slower)")
+    for r in rows:
+        old = base.get((r["name"], json.dumps(r["params"], sort_keys=True)))
+        if old and old["median_s"] > 0:
+            label = " ".join(f"{k}={v}" for k, v in r["params"].items())
+            print(f"{r['name']:<22} {label:<40} {r['median_s'] / old['median_s']:6.2f}x")
+
+def main():
+    """
+    Times the hot paths (parse, grid build, labeling, features, env field
+    extraction, training, forecasting) on synthetic quiet / typical /
+    outbreak days and a synthetic multi-year master store, and saves
+    bench/results_<utc>.json:
+
+      python 13_benchmark.py [baseline.json]
+      BENCH_QUICK=1 python 13_benchmark.py       (fewer resolutions, 1 year)
+
+    BENCH_RES (e.g. "0.5,0.25,0.1"), BENCH_YEARS and BENCH_REPEAT override
+    the defaults. Nothing under data/ is touched.
+    """
+    quick = os.environ.get("BENCH_QUICK", "0") == "1"
+    resolutions = [float(x) for x in os.environ.get("BENCH_RES", "0.5,0.25" if quick else "0.5,0.25,0.1,0.05").split(",")]
+    years = int(os.environ.get("BENCH_YEARS", "1" if quick else "3"))
+    repeat = int(os.environ.get("BENCH_REPEAT", "1" if quick else "3"))
+    baseline = sys.argv[1] if len(sys.argv) > 1 else None
+    if baseline and not os.path.exists(baseline):
+        print(f"Missing {baseline}", file=sys.stderr)
+        sys.exit(1)
+
+    workdir = tempfile.mkdtemp(prefix="nadocast_bench_")
+    try:
+        rows = run_suite(resolutions, years, repeat, workdir)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    os.makedirs(BENCH_DIR, exist_ok=True)
+    out_path = os.path.join(BENCH_DIR, f"results_{datetime.utcnow():%Y%m%dT%H%M%SZ}.json")
+    with open(out_path, "w", encoding="utf-8") as f:
+        json.dump({"environment": environment(), "resolutions": resolutions, "years": years, "results": rows}, f, indent=2)
+    print(f"Saved benchmark results -> {out_path}")
+    if baseline:
+        compare(rows, baseline)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,220 @@
+import os
+import sys
+import json
+import argparse
+import importlib
+from datetime import datetime
+
+config = importlib.import_module("00_config")
+
+# Subcommand -> numbered stage script. A stage module (and whatever it imports:
+# pandas, scikit-learn, matplotlib/cartopy) is only loaded by its own subcommand.
+STAGES = {
+    "fetch":    ("01_fetch", "download the config.yml date's SPC report CSVs"),
+    "parse":    ("02_compute_tpi", "parse report CSVs into data/<hazard>_points.csv"),
+    "plot":     ("03_plot_post", "map the reports, or a date range of forecasts (--start/--end)"),
+    "labels":   ("04_make_grid_and_labels", "grid + neighborhood labels for the config.yml date"),
+    "features": ("05_extract_env_features", "features for the labeled grid (climatology, env store)"),
+    "train":    ("06_train_model_v0", "fit the v0 model"),
+    "forecast": ("07_forecast_day_v0", "forecast the config.yml date, or a date range (--start/--end)"),
+    "verify":   ("08_verify_forecasts", "verify batch forecasts against the master store"),
+    "build":    ("09_build_dataset", "multi-day dataset build (--start/--end/--workers)"),
+    "ingest":   ("10_ingest_bulk_reports", "ingest a bulk historical report CSV: ingest <csv> [store_dir]"),
+    "serve":    ("11_serve_forecasts", "HTTP forecast service"),
+    "metrics":  ("12_stage_metrics", "per-stage timing summary: metrics [log] [all]"),
+    "bench":    ("13_benchmark", "benchmark suite: bench [baseline.json]"),
+}
+
+# `run`: the single-day v0 pipeline, one process instead of one per script
+PIPELINE = ("fetch", "parse", "labels", "features", "train", "forecast")
+
+# Range options, passed on as the env vars the stage scripts read
+RANGE_ENV = {"start": "START_DATE", "end": "END_DATE", "workers": "WORKERS"}
+
+# Artifact paths `status` reports on; the same as the stage modules' constants,
+# spelled out so status never has to import those modules
+MASTER_DIR = "data/master_v0"
+CLIM_DIR = "data/climatology"
+ENV_DIR = "data/env_store"
+POINT_STORE_DIR = "data/point_store"
+FORECAST_DIR = "data/forecast_v0"
+VERIFY_DIR = "data/verification"
+MODEL_PATH = "models/nadocast_v0_logreg.joblib"
+COMPACT_PATH = "models/nadocast_v0_logreg.json"
+
+def run_stage(name, args=()):
+    """Imports a stage script and runs its main() with `args` as its command line."""
+    module_name = STAGES[name][0]
+    module = importlib.import_module(module_name)
+    sys.argv = [module_name + ".py"] + list(args)
+    return module.main()
+
+# ---------------- status (json/os only) ----------------
+def _json(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def _count(dir_path, suffix=".npy"):
+    try:
+        return sum(1 for n in os.listdir(dir_path) if n.endswith(suffix))
+    except OSError:
+        return 0
+
+def _size(path) -> str:
+    n = os.path.getsize(path)
+    for unit in ("B", "KB", "MB"):
+        if n < 1024:
+            return f"{n:.0f} {unit}"
+        n /= 1024
+    return f"{n:.1f} GB"
+
+def _mtime(path) -> str:
+    return datetime.fromtimestamp(os.path.getmtime(path)).strftime("%Y-%m-%d %H:%M")
+
+def status_lines(cfg):
+    """(artifact, summary) rows for what's on disk; reads only meta files and directory listings."""
+    rows = [("config", f"{config.config_path()}: date {cfg['date']}, {cfg['grid_res_deg']} deg grid, "
+                       f"{cfg['radius_miles']:g} mi, hazards {', '.join(cfg['hazards'])}")]
+
+    for hazard in cfg["hazards"]:
+        path = f"data/{hazard}_points.csv"
+        rows.append((f"{hazard} points", f"{path} ({_size(path)}, {_mtime(path)})" if os.path.exists(path) else "missing"))
+    rows.append(("labels", f"{cfg['out_csv']} ({_size(cfg['out_csv'])})" if os.path.exists(cfg["out_csv"]) else "missing"))
+
+    meta = _json(os.path.join(MASTER_DIR, "meta.json"))
+    if meta:
+        labels_path = os.path.join(MASTER_DIR, "labels.u8")
+        n_rows = os.path.getsize(labels_path) // meta["n_cells"] if os.path.exists(labels_path) else 0
+        text = (f"{MASTER_DIR}: {_count(os.path.join(MASTER_DIR, 'days'))} dates built, {n_rows} in labels.u8, "
+                f"{meta['n_cells']} cells, hazards {', '.join(meta.get('hazards', ['torn']))}")
+        sample = _json(os.path.join(MASTER_DIR, "sample", "meta.json"))
+        if sample:
+            text += f"; sample neg_frac {sample['neg_frac']} ({sample['n_rows']} rows, {sample['n_dates']} dates)"
+        rows.append(("master store", text))
+    else:
+        rows.append(("master store", "missing"))
+
+    meta = _json(os.path.join(CLIM_DIR, "meta.json"))
+    rows.append(("climatology", f"{CLIM_DIR}: {meta['hazard']}, {meta['n_dates']} dates "
+                                f"({meta['first']} -> {meta['last']})" if meta else "missing"))
+
+    meta = _json(os.path.join(ENV_DIR, "meta.json"))
+    rows.append(("env store", f"{ENV_DIR}: fields {', '.join(meta['fields']) or '(none)'}" if meta else "missing"))
+
+    meta = _json(os.path.join(POINT_STORE_DIR, "meta.json"))
+    if meta:
+        coverage = f"{meta['first']} -> {meta['last']}" if "first" in meta else "no coverage"
+        rows.append(("point store", f"{POINT_STORE_DIR}: {meta['n_points']} points, {coverage}"))
+    else:
+        rows.append(("point store", "missing"))
+
+    model = _json(COMPACT_PATH)
+    if model:
+        rows.append(("model", f"{COMPACT_PATH}: {len(model['features'])} features, created {model.get('created', '?')}"))
+    else:
+        rows.append(("model", f"{MODEL_PATH} ({_mtime(MODEL_PATH)}), no compact copy" if os.path.exists(MODEL_PATH) else "missing"))
+
+    meta = _json(os.path.join(FORECAST_DIR, "meta.json"))
+    rows.append(("forecasts", f"{FORECAST_DIR}: {_count(os.path.join(FORECAST_DIR, 'days'))} dates, "
+                              f"features {', '.join(meta.get('features', []))}" if meta else "missing"))
+
+    reports = sorted(n for n in os.listdir(VERIFY_DIR) if n.endswith(".json")) if os.path.isdir(VERIFY_DIR) else []
+    if reports:
+        latest = max(reports, key=lambda n: os.path.getmtime(os.path.join(VERIFY_DIR, n)))
+        rep = _json(os.path.join(VERIFY_DIR, latest)) or {}
+        rows.append(("verification", f"{os.path.join(VERIFY_DIR, latest)}: {rep.get('n_dates')} dates, "
+                                     f"BSS {rep.get('brier_skill', float('nan')):.4f}, AUC {rep.get('auc', float('nan')):.4f}"))
+    else:
+        rows.append(("verification", "missing"))
+    return rows
+
+def cmd_status(args):
+    for name, text in status_lines(config.load()):
+        print(f"{name:<14} {text}")
+
+def cmd_model(args):
+    """Prints the compact model checkpoint (07's CompactModel JSON) without loading scikit-learn."""
+    model = _json(args.path)
+    if model is None:
+        print(f"Missing {args.path}. Run 06_train_model_v0.py first.", file=sys.stderr)
+        sys.exit(1)
+    print(f"{args.path}: {model.get('format')} v{model.get('version')}, created {model.get('created', '?')}, "
+          f"scikit-learn {model.get('sklearn_version', '?')}")
+    print(f"grid: {json.dumps(model.get('grid'))}")
+    if model.get("mean") is None:
+        # No StandardScaler in front of the classifier (the default 06 fit)
+        print(f"{'feature':<12} {'coef':>10}")
+        for name, c in zip(model["features"], model["coef"]):
+            print(f"{name:<12} {c:>10.4f}")
+    else:
+        print(f"{'feature':<12} {'coef':>10} {'mean':>12} {'scale':>12}")
+        for name, c, m, s in zip(model["features"], model["coef"], model["mean"], model["scale"]):
+            print(f"{name:<12} {c:>10.4f} {m:>12.4f} {s:>12.4f}")
+    print(f"{'intercept':<12} {model['intercept']:>10.4f}")
+
+def cmd_config(args):
+    print(json.dumps(config.load(), indent=2))
+
+def cmd_run(args):
+    """Runs the single-day pipeline stages in order, in this process."""
+    for name in PIPELINE + (("plot",) if args.plot else ()):
+        print(f"== {name} ({STAGES[name][0]})", flush=True)
+        run_stage(name)
+
+def cmd_stage(args):
+    for key, var in RANGE_ENV.items():
+        if getattr(args, key, None) is not None:
+            os.environ[var] = str(getattr(args, key))
+    return run_stage(args.command, args.args)
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="nadocast",
+        description="Nadocast pipeline. Stage options beyond --start/--end/--workers "
+                    "are the same env vars the numbered scripts read.",
+    )
+    parser.add_argument("--config", help=f"settings file (default {config.CONFIG_PATH}, or $NADOCAST_CONFIG)")
+    sub = parser.add_subparsers(dest="command", metavar="command", required=True)
+
+    sub.add_parser("status", help="what's built so far (fast: no pandas/numpy)").set_defaults(func=cmd_status)
+    p = sub.add_parser("model", help="inspect the compact model checkpoint")
+    p.add_argument("path", nargs="?", default=COMPACT_PATH)
+    p.set_defaults(func=cmd_model)
+    sub.add_parser("config", help="print the parsed config.yml settings").set_defaults(func=cmd_config)
+    p = sub.add_parser("run", help="single-day pipeline: " + " -> ".join(PIPELINE))
+    p.add_argument("--plot", action="store_true", help="finish with the report map")
+    p.set_defaults(func=cmd_run)
+
+    for name, (module_name, text) in STAGES.items():
+        p = sub.add_parser(name, help=f"{text} ({module_name}.py)")
+        p.add_argument("--start", help="START_DATE (YYYY-MM-DD)")
+        p.add_argument("--end", help="END_DATE (YYYY-MM-DD)")
+        p.add_argument("--workers", type=int, help="WORKERS")
+        p.add_argument("args", nargs=argparse.REMAINDER, help="passed on to the script")
+        p.set_defaults(func=cmd_stage)
+    return parser
+
+def main(argv=None):
+    """
+    One entry point for every stage, sharing a single parsed config:
+
+      python nadocast.py status
+      python nadocast.py run
+      python nadocast.py build --start 2015-01-01 --end 2015-12-31 --workers 4
+      python nadocast.py forecast --start 2024-04-01 --end 2024-06-30
+      python nadocast.py ingest 1950-2023_actual_tornadoes.csv
+
+    Only the chosen stage's module is imported, so status/model/config start
+    without pandas, scikit-learn or matplotlib.
+    """
+    args = build_parser().parse_args(argv)
+    if args.config:
+        # Env, not just an argument, so pool workers and subprocesses see the same file
+        os.environ["NADOCAST_CONFIG"] = args.config
+    return args.func(args)
+
+if __name__ == "__main__":
+    main()
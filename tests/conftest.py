@@ -0,0 +1,20 @@
+import os
+import sys
+import importlib
+
+import pytest
+
+# The numbered stage scripts live at the repo root and are loaded by name
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+def stage(name):
+    """A numbered stage script as a module, e.g. stage("04_make_grid_and_labels")."""
+    return importlib.import_module(name)
+
+@pytest.fixture
+def in_tmp(tmp_path, monkeypatch):
+    """Runs the test from an empty directory (stages read and write data/ relative to it)."""
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
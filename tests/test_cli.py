@@ -0,0 +1,43 @@
+import json
+import argparse
+
+import numpy as np
+import pytest
+from sklearn.linear_model import LogisticRegression, SGDClassifier
+from sklearn.pipeline import make_pipeline
+from sklearn.preprocessing import StandardScaler
+
+from conftest import stage
+
+cli = stage("nadocast")
+train_stage = stage("06_train_model_v0")
+
+FEATURES = ["lat", "lon", "doy_sin", "doy_cos"]
+
+def fitted(kind):
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(400, len(FEATURES)))
+    y = (X[:, 0] + rng.normal(size=400) > 1).astype(int)
+    if kind == "logreg":
+        return LogisticRegression(max_iter=1000).fit(X, y)
+    return make_pipeline(StandardScaler(), SGDClassifier(loss="log_loss", random_state=0)).fit(X, y)
+
+@pytest.mark.parametrize("kind", ["logreg", "scaler+sgd"])
+def test_cmd_model_prints_either_export(tmp_path, capsys, kind):
+    spec = train_stage.compact_spec(fitted(kind), FEATURES, stage("00_config").DEFAULTS)
+    path = tmp_path / "model.json"
+    path.write_text(json.dumps(spec))
+
+    cli.cmd_model(argparse.Namespace(path=str(path)))
+
+    out = capsys.readouterr().out.splitlines()
+    header = next(i for i, line in enumerate(out) if line.startswith("feature"))
+    assert ("mean" in out[header]) == (kind != "logreg")
+    rows = out[header + 1:header + 1 + len(FEATURES)]
+    assert [r.split()[0] for r in rows] == FEATURES
+    assert [float(r.split()[1]) for r in rows] == pytest.approx(spec["coef"], abs=1e-4)
+    assert out[-1].split()[0] == "intercept"
+
+def test_cmd_model_missing_file(tmp_path):
+    with pytest.raises(SystemExit):
+        cli.cmd_model(argparse.Namespace(path=str(tmp_path / "none.json")))
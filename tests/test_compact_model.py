@@ -0,0 +1,79 @@
+import os
+import json
+
+import numpy as np
+import pytest
+from sklearn.linear_model import LogisticRegression, SGDClassifier
+from sklearn.pipeline import make_pipeline
+from sklearn.preprocessing import StandardScaler
+from sklearn.tree import DecisionTreeClassifier
+
+from conftest import stage
+
+train_stage = stage("06_train_model_v0")
+forecast_stage = stage("07_forecast_day_v0")
+
+FEATURES = ["lat", "lon", "doy", "doy_sin", "doy_cos"]
+
+@pytest.fixture
+def small_grid(in_tmp, monkeypatch):
+    path = in_tmp / "config.yml"
+    path.write_text("grid_res_deg: 0.5\nextent: [-104, -94, 32, 40]\n")
+    monkeypatch.setenv("NADOCAST_CONFIG", str(path))
+    return in_tmp
+
+def training_rows(n=2000, seed=0):
+    """Random (lat, lon, doy, sin, cos) rows over the small grid, tornadoes likelier in spring/south."""
+    rng = np.random.default_rng(seed)
+    doy = rng.integers(1, 366, n)
+    X = np.column_stack([rng.uniform(32, 40, n), rng.uniform(-104, -94, n), doy,
+                         np.sin(2 * np.pi * doy / 365.25), np.cos(2 * np.pi * doy / 365.25)])
+    z = -0.4 * (X[:, 0] - 36) + 1.5 * X[:, 3] - 1.0
+    y = (rng.random(n) < 1 / (1 + np.exp(-z))).astype(int)
+    return X, y
+
+MODELS = {
+    "logreg": lambda: LogisticRegression(max_iter=1000),
+    "scaler+sgd": lambda: make_pipeline(StandardScaler(), SGDClassifier(loss="log_loss", alpha=1e-4, random_state=0)),
+}
+
+@pytest.mark.parametrize("kind", list(MODELS))
+def test_compact_matches_sklearn(small_grid, kind):
+    X, y = training_rows()
+    model = MODELS[kind]().fit(X, y)
+    path = str(small_grid / "model.json")
+
+    worst = train_stage.export_compact(model, FEATURES, path)
+
+    assert worst is not None and worst <= train_stage.PARITY_TOL
+    compact = forecast_stage.CompactModel.load(path)
+    assert compact.features == FEATURES
+    assert (compact.mean is None) == (kind == "logreg")
+    X_new, _ = training_rows(500, seed=1)
+    np.testing.assert_allclose(compact.predict_proba(X_new), model.predict_proba(X_new), rtol=0, atol=1e-12)
+
+def test_parity_check_catches_a_wrong_export(small_grid):
+    X, y = training_rows()
+    model = LogisticRegression(max_iter=1000).fit(X, y)
+    spec = train_stage.compact_spec(model, FEATURES, stage("00_config").load())
+    spec["coef"][0] += 1e-3
+    lats, lons = stage("04_make_grid_and_labels").grid_axes([-104, -94, 32, 40], 0.5)
+
+    worst = forecast_stage.parity_check(model, forecast_stage.CompactModel(spec), FEATURES, lats, lons,
+                                        np.array(["2001-04-15"], dtype="datetime64[D]"))
+
+    assert worst > train_stage.PARITY_TOL
+
+def test_non_linear_model_skips_export_and_removes_stale_json(small_grid):
+    X, y = training_rows()
+    path = small_grid / "model.json"
+    path.write_text(json.dumps({"format": forecast_stage.COMPACT_FORMAT, "version": forecast_stage.COMPACT_VERSION}))
+    model = make_pipeline(StandardScaler(), DecisionTreeClassifier(max_depth=3, random_state=0)).fit(X, y)
+
+    assert train_stage.compact_spec(model, FEATURES, stage("00_config").load()) is None
+    assert train_stage.export_compact(model, FEATURES, str(path)) is None
+    assert not os.path.exists(path)
+
+def test_unknown_format_is_rejected():
+    with pytest.raises(ValueError):
+        forecast_stage.CompactModel({"format": "something-else", "version": 1})
@@ -0,0 +1,24 @@
+import pytest
+
+from conftest import stage
+
+config = stage("00_config")
+
+def parse(tmp_path, text):
+    path = tmp_path / "config.yml"
+    path.write_text(text)
+    return config.parse_config(str(path))
+
+def test_hazards_in_canonical_order(tmp_path):
+    assert parse(tmp_path, "hazards: [wind, torn]\n")["hazards"] == ["torn", "wind"]
+    assert parse(tmp_path, "hazards: [hail]\n")["hazards"] == ["hail"]
+    assert parse(tmp_path, "date: 2011-04-27\n")["hazards"] == ["torn"]
+
+@pytest.mark.parametrize("rhs", ["[tornado]", "[torn, hial]", "[]", ""])
+def test_unknown_or_empty_hazards_are_rejected(tmp_path, rhs):
+    with pytest.raises(ValueError, match="hazards"):
+        parse(tmp_path, f"hazards: {rhs}\n")
+
+def test_non_numeric_resolution_is_rejected(tmp_path):
+    with pytest.raises(ValueError, match="grid_res_deg"):
+        parse(tmp_path, "grid_res_deg: fine\n")
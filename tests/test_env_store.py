@@ -0,0 +1,102 @@
+import os
+
+import numpy as np
+import pytest
+
+from conftest import stage
+
+feature_stage = stage("05_extract_env_features")
+
+# Descending lat (ERA5 order) and uneven lon spacing, so bracket() has to sort
+SRC_LAT = np.array([40.0, 38.5, 37.0, 36.0, 34.0])
+SRC_LON = np.array([-101.0, -99.0, -98.5, -97.0, -94.0, -93.0])
+
+def bilinear(grid, y, x):
+    """Reference value of one source grid (n_lat, n_lon) at (y, x), clamped to the edges."""
+    def locate(axis, v):
+        order = np.argsort(axis)
+        a = axis[order]
+        v = min(max(v, a[0]), a[-1])
+        for i in range(len(a) - 1):
+            if a[i] <= v <= a[i + 1]:
+                return order[i], order[i + 1], (v - a[i]) / (a[i + 1] - a[i])
+    i0, i1, ty = locate(SRC_LAT, y)
+    j0, j1, tx = locate(SRC_LON, x)
+    top = (1 - tx) * grid[i0, j0] + tx * grid[i0, j1]
+    bottom = (1 - tx) * grid[i1, j0] + tx * grid[i1, j1]
+    return (1 - ty) * top + ty * bottom
+
+def target_points(seed):
+    rng = np.random.default_rng(seed)
+    interior = np.column_stack([rng.uniform(34, 40, 40), rng.uniform(-101, -93, 40)])
+    nodes = np.array([(la, lo) for la in SRC_LAT for lo in SRC_LON])
+    # on a cell edge: one coordinate on a grid line, the other between lines
+    edges = np.array([(37.0, -98.0), (36.5, -98.5), (38.5, -95.5), (35.0, -94.0), (40.0, -100.0), (34.0, -93.5)])
+    outside = np.array([(41.0, -97.5), (33.0, -99.0), (36.2, -102.0), (39.0, -92.0), (42.0, -90.0)])
+    pts = np.vstack([interior, nodes, edges, outside])
+    return pts[:, 0], pts[:, 1]
+
+@pytest.fixture
+def store(tmp_path):
+    env = feature_stage.EnvStore(str(tmp_path / "env"))
+    env.init(SRC_LAT, SRC_LON)
+    return env
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_extract_matches_direct_bilinear(store, seed):
+    rng = np.random.default_rng(seed)
+    # Two years (one leap), so the per-year chunks and doy rows are both exercised
+    loaded = np.array(["2011-04-27", "2011-12-31", "2012-02-29", "2012-03-01"], dtype="datetime64[D]")
+    values = {name: rng.normal(1000, 400, (len(loaded), len(SRC_LAT), len(SRC_LON))) for name in ("cape", "shear")}
+    for name, v in values.items():
+        store.write(name, loaded, v)
+    lat, lon = target_points(seed)
+
+    got = store.extract(["cape", "shear"], loaded, store.interp_weights(lat, lon), block_days=3)
+
+    assert got.shape == (len(loaded), len(lat), 2)
+    for d in range(len(loaded)):
+        for k, name in enumerate(("cape", "shear")):
+            grid = values[name][d].astype(np.float32)
+            want = [bilinear(grid, y, x) for y, x in zip(lat, lon)]
+            np.testing.assert_allclose(got[d, :, k], want, rtol=1e-5, atol=1e-3)
+
+def test_nodes_return_source_values(store):
+    grid = np.arange(len(SRC_LAT) * len(SRC_LON), dtype=np.float64).reshape(len(SRC_LAT), len(SRC_LON))
+    store.write("cape", ["2011-04-27"], grid[None])
+    lat = np.repeat(SRC_LAT, len(SRC_LON))
+    lon = np.tile(SRC_LON, len(SRC_LAT))
+
+    got = store.extract(["cape"], ["2011-04-27"], store.interp_weights(lat, lon))
+
+    np.testing.assert_array_equal(got[0, :, 0], grid.reshape(-1))
+
+def test_linear_field_is_reproduced_inside_the_grid(store):
+    lat, lon = target_points(3)
+    inside = (lat >= 34) & (lat <= 40) & (lon >= -101) & (lon <= -93)
+    la, lo = np.meshgrid(SRC_LAT, SRC_LON, indexing="ij")
+    store.write("cape", ["2011-04-27"], (3 * la - 2 * lo + 10)[None])
+
+    got = store.extract(["cape"], ["2011-04-27"], store.interp_weights(lat[inside], lon[inside]))
+
+    np.testing.assert_allclose(got[0, :, 0], 3 * lat[inside] - 2 * lon[inside] + 10, rtol=1e-5)
+
+def test_days_not_loaded_are_nan(store):
+    grid = np.ones((1, len(SRC_LAT), len(SRC_LON)))
+    store.write("cape", ["2011-04-27"], grid)
+    lat, lon = target_points(4)
+    dates = ["2011-04-26", "2011-04-27", "2011-04-28", "2013-04-27"]   # 2013: no chunk at all
+
+    got = store.extract(["cape", "shear"], dates, store.interp_weights(lat, lon))
+
+    np.testing.assert_allclose(got[1, :, 0], 1.0)
+    assert np.isnan(got[[0, 2, 3], :, 0]).all()
+    assert np.isnan(got[:, :, 1]).all()     # field never written
+
+def test_weights_are_cached(store):
+    lat, lon = target_points(5)
+    first = store.interp_weights(lat, lon)
+    assert len(os.listdir(os.path.join(store.root, "weights"))) == 1
+    second = store.interp_weights(lat, lon)
+    np.testing.assert_array_equal(first[0], second[0])
+    np.testing.assert_array_equal(first[1], second[1])
@@ -0,0 +1,156 @@
+import os
+import time
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import pytest
+import requests
+
+from conftest import stage
+
+fetch_stage = stage("01_fetch")
+
+TORN_CSV = b"Time,F_Scale,Location,County,State,Lat,Lon,Comments\n1200,EF1,A,B,OK,35.2,-97.4,x\n"
+DATE = "2011-04-27"
+NAME = "110427_rpts_torn.csv"
+
+class StandIn:
+    """Local SPC stand-in: {file name: (status, body, etag)}; unknown names 404. Logs each request."""
+
+    def __init__(self):
+        self.files = {}
+        self.requests = []
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                name = self.path.rsplit("/", 1)[-1]
+                stand_in.requests.append((name, dict(self.headers)))
+                status, body, etag = stand_in.files.get(name, (404, b"", None))
+                if status == 200 and etag and self.headers.get("If-None-Match") == etag:
+                    status, body = 304, b""
+                self.send_response(status)
+                if etag:
+                    self.send_header("ETag", etag)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, fmt, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def names(self):
+        return [name for name, _ in self.requests]
+
+@pytest.fixture
+def spc():
+    stand_in = StandIn()
+    yield stand_in
+    stand_in.server.shutdown()
+    stand_in.server.server_close()
+
+def fetcher(spc, cache_dir, **kwargs):
+    return fetch_stage.SpcFetcher(str(cache_dir), spc.url, rate_per_sec=0, **kwargs)
+
+def test_200_is_cached_with_validators(spc, tmp_path):
+    spc.files[NAME] = (200, TORN_CSV, '"v1"')
+    assert fetcher(spc, tmp_path).fetch(DATE) == TORN_CSV
+
+    assert open(tmp_path / NAME, "rb").read() == TORN_CSV
+    meta = fetcher(spc, tmp_path).cached_meta(DATE)
+    assert meta == {"status": 200, "etag": '"v1"', "last_modified": None}
+    # Offline reads come straight from the cache
+    assert fetcher(spc, tmp_path, offline=True).fetch(DATE) == TORN_CSV
+    assert spc.names() == [NAME]
+
+def test_304_reuses_the_cached_file(spc, tmp_path):
+    spc.files[NAME] = (200, TORN_CSV, '"v1"')
+    fetcher(spc, tmp_path).fetch(DATE)
+
+    assert fetcher(spc, tmp_path).fetch(DATE) == TORN_CSV
+    assert len(spc.requests) == 2
+    assert spc.requests[1][1].get("If-None-Match") == '"v1"'
+
+def test_changed_file_replaces_the_cache(spc, tmp_path):
+    spc.files[NAME] = (200, TORN_CSV, '"v1"')
+    fetcher(spc, tmp_path).fetch(DATE)
+    newer = TORN_CSV + b"1300,EF0,C,D,KS,38.1,-98.0,y\n"
+    spc.files[NAME] = (200, newer, '"v2"')
+
+    assert fetcher(spc, tmp_path).fetch(DATE) == newer
+    assert open(tmp_path / NAME, "rb").read() == newer
+
+def test_without_revalidate_the_cache_is_trusted(spc, tmp_path):
+    spc.files[NAME] = (200, TORN_CSV, '"v1"')
+    fetcher(spc, tmp_path).fetch(DATE)
+    fetcher(spc, tmp_path).fetch("2011-04-28")   # 404
+
+    assert fetcher(spc, tmp_path, revalidate=False).fetch(DATE) == TORN_CSV
+    assert fetcher(spc, tmp_path, revalidate=False).fetch("2011-04-28") is None
+    assert len(spc.requests) == 2
+
+def test_404_is_cached_as_no_file(spc, tmp_path):
+    assert fetcher(spc, tmp_path).fetch(DATE) is None
+
+    assert not os.path.exists(tmp_path / NAME)
+    assert fetcher(spc, tmp_path).cached_meta(DATE) == {"status": 404}
+    assert fetcher(spc, tmp_path, offline=True).fetch(DATE) is None
+
+@pytest.mark.parametrize("status,body", [(500, b"oops"), (503, b""), (200, b"")])
+def test_5xx_and_empty_bodies_raise_and_are_not_cached(spc, tmp_path, status, body):
+    spc.files[NAME] = (status, body, None)
+    with pytest.raises(requests.HTTPError):
+        fetcher(spc, tmp_path).fetch(DATE)
+
+    assert not os.path.exists(str(tmp_path / NAME) + ".meta.json")
+    with pytest.raises(FileNotFoundError):
+        fetcher(spc, tmp_path, offline=True).fetch(DATE)
+
+def test_5xx_keeps_an_earlier_copy(spc, tmp_path):
+    spc.files[NAME] = (200, TORN_CSV, '"v1"')
+    fetcher(spc, tmp_path).fetch(DATE)
+    spc.files[NAME] = (503, b"", None)
+
+    with pytest.raises(requests.HTTPError):
+        fetcher(spc, tmp_path).fetch(DATE)
+    assert fetcher(spc, tmp_path, offline=True).fetch(DATE) == TORN_CSV
+
+def test_fetch_many_maps_errors_to_none(spc, tmp_path):
+    spc.files[NAME] = (200, TORN_CSV, None)
+    spc.files["110428_rpts_torn.csv"] = (502, b"", None)
+
+    got = fetcher(spc, tmp_path, max_workers=3).fetch_many([DATE, "2011-04-28", "2011-04-29"])
+    assert got == {DATE: TORN_CSV, "2011-04-28": None, "2011-04-29": None}
+    # Only the 404 is remembered
+    assert fetcher(spc, tmp_path).cached_meta("2011-04-29") == {"status": 404}
+    assert fetcher(spc, tmp_path).cached_meta("2011-04-28") is None
+
+def test_rate_limit_spaces_requests(spc, tmp_path):
+    dates = [f"2011-04-{d:02d}" for d in range(1, 7)]
+    f = fetch_stage.SpcFetcher(str(tmp_path), spc.url, rate_per_sec=20, max_workers=4)
+    t0 = time.monotonic()
+    f.fetch_many(dates)
+    # 6 request starts at least 1/20 s apart
+    assert time.monotonic() - t0 >= 5 / 20
+    assert len(spc.requests) == len(dates)
+
+def test_build_marks_only_404s_as_skip(spc, in_tmp):
+    """09 workers read the prefetched cache: a 404 is a SKIP, a 5xx (nothing cached) a FAIL with no marker."""
+    build = stage("09_build_dataset")
+    spc.files[NAME] = (200, TORN_CSV, None)
+    spc.files["110428_rpts_torn.csv"] = (503, b"", None)
+    fetch_stage.SpcFetcher(fetch_stage.RAW_CACHE_DIR, spc.url, rate_per_sec=0).fetch_many(
+        [DATE, "2011-04-28", "2011-04-29"])
+
+    cfg = dict(stage("00_config").DEFAULTS, extent=[-99.0, -96.0, 34.0, 36.0], hazards=["torn"])
+    build.ensure_dirs()
+    build.MasterStore().init(stage("04_make_grid_and_labels").grid_from_config(cfg), cfg)
+    build.init_worker(cfg, False, build.SCRATCH_DIR)
+
+    assert build.run_date(DATE)[1] == "OK"
+    assert build.run_date("2011-04-28")[1] == "FAIL"
+    assert build.run_date("2011-04-29")[1] == "SKIP"
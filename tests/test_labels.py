@@ -0,0 +1,53 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import stage
+
+label_stage = stage("04_make_grid_and_labels")
+
+EXTENT = [-100.0, -95.0, 33.0, 37.0]
+
+def random_points(rng, n):
+    """Reports inside the extent and up to ~1 degree outside it (their disks still reach in)."""
+    lat = rng.uniform(EXTENT[2] - 1.0, EXTENT[3] + 1.0, n)
+    lon = rng.uniform(EXTENT[0] - 1.0, EXTENT[1] + 1.0, n)
+    return pd.DataFrame({"lat": lat, "lon": lon})
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+@pytest.mark.parametrize("res_deg,radius_miles", [(0.25, 25.0), (0.1, 25.0), (0.25, 40.0)])
+def test_labelers_match_brute_force(seed, res_deg, radius_miles):
+    rng = np.random.default_rng(seed)
+    pts = random_points(rng, 25)
+    # Reports exactly on cell centers and on the extent's corners
+    pts = pd.concat([pts, pd.DataFrame({"lat": [EXTENT[2], EXTENT[3], 35.0], "lon": [EXTENT[0], EXTENT[1], -97.5]})],
+                    ignore_index=True)
+
+    stencil_grid = label_stage.Grid.build(EXTENT, res_deg, radius_miles, stencil=True)
+    raster_grid = label_stage.Grid.build(EXTENT, res_deg, radius_miles, stencil=False)
+    want = label_stage.label_grid_brute(stencil_grid.frame, pts, radius_miles)
+
+    assert want.sum() > 0
+    np.testing.assert_array_equal(label_stage.label_grid(stencil_grid.frame, pts, radius_miles), want)
+    np.testing.assert_array_equal(stencil_grid.label(pts), want)
+    np.testing.assert_array_equal(raster_grid.label(pts), want)
+    tiles = np.concatenate([t.ravel() for _, t in raster_grid.iter_label_tiles(pts, tile_rows=3)])
+    np.testing.assert_array_equal(tiles, want)
+
+def test_hazard_bits_are_ored_per_cell():
+    rng = np.random.default_rng(7)
+    by_hazard = {h: random_points(rng, 8) for h in ("torn", "hail", "wind")}
+    grid = label_stage.Grid.build(EXTENT, 0.25, 25.0)
+    pts, bits = label_stage.hazard_points(by_hazard)
+
+    mask = grid.label(pts, bits)
+    for hazard, hazard_pts in by_hazard.items():
+        want = label_stage.label_grid_brute(grid.frame, hazard_pts, 25.0)
+        np.testing.assert_array_equal((mask & label_stage.HAZARD_BITS[hazard]) > 0, want > 0)
+    np.testing.assert_array_equal(label_stage.Grid.build(EXTENT, 0.25, 25.0, stencil=False).label(pts, bits), mask)
+
+def test_no_reports_labels_nothing():
+    grid = label_stage.Grid.build(EXTENT, 0.25, 25.0)
+    empty = pd.DataFrame({"lat": np.zeros(0), "lon": np.zeros(0)})
+    assert grid.label(empty).sum() == 0
+    assert label_stage.label_grid(grid.frame, empty, 25.0).sum() == 0
@@ -0,0 +1,123 @@
+import numpy as np
+import pytest
+
+from conftest import stage
+
+build = stage("09_build_dataset")
+
+DATES = ["2011-04-25", "2011-04-26", "2011-04-27"]
+
+@pytest.fixture
+def store(in_tmp):
+    cfg = dict(stage("00_config").DEFAULTS, extent=[-99.0, -96.0, 34.0, 36.0], hazards=["torn"])
+    build.ensure_dirs()
+    master = build.MasterStore()
+    master.init(stage("04_make_grid_and_labels").grid_from_config(cfg), cfg)
+    rng = np.random.default_rng(0)
+    for d in DATES:
+        master.write_partition(d, rng.integers(0, 2, master.n_cells), build.SCRATCH_DIR)
+    return master
+
+def partitions(store, dates):
+    return np.stack([np.load(store.partition_path(d)) for d in dates])
+
+def test_append_in_date_order(store):
+    for d in DATES:
+        store.append(d)
+    assert [str(d) for d in store.dates()] == DATES
+    np.testing.assert_array_equal(store.labels(), partitions(store, DATES))
+
+def test_rerun_after_crash_before_mark_done_does_not_duplicate(store):
+    # Run 1 appends 04-25 and 04-26, then dies before marking 04-26 done
+    store.append(DATES[0])
+    store.append(DATES[1])
+    # Run 2 recomputes 04-26 (possibly different labels) and appends it again
+    store.write_partition(DATES[1], np.ones(store.n_cells, dtype=np.uint8), build.SCRATCH_DIR)
+    store.append(DATES[1])
+    store.append(DATES[2])
+
+    assert [str(d) for d in store.dates()] == DATES
+    np.testing.assert_array_equal(store.labels(), partitions(store, DATES))
+    assert store.labels()[1].all()
+
+def test_half_written_row_is_dropped(store):
+    store.append(DATES[0])
+    with open(store.labels_path, "ab") as f:
+        f.write(b"\x01" * (store.n_cells // 2))
+
+    store.append(DATES[1])
+
+    assert [str(d) for d in store.dates()] == DATES[:2]
+    np.testing.assert_array_equal(store.labels(), partitions(store, DATES[:2]))
+
+# ---------------- negative-downsampled sample ----------------
+def appended_sparse(store, dates=DATES, seed=1):
+    """Appends dates with ~10% positive cells (any hazard bit) and returns their label rows."""
+    rng = np.random.default_rng(seed)
+    for d in dates:
+        row = np.where(rng.random(store.n_cells) < 0.1, rng.choice([1, 2, 4, 3], store.n_cells), 0)
+        store.write_partition(d, row, build.SCRATCH_DIR)
+        store.append(d)
+    return np.asarray(store.labels())
+
+def sample_arrays(store):
+    return {name: np.load(f"{store.sample_dir}/{name}.npy") for name in ("cells", "weight", "offsets")}
+
+def test_sample_keeps_every_positive_with_weights(store):
+    labels = appended_sparse(store)
+    meta = store.write_sample(0.25, seed=7)
+
+    cells, weight, counts = store._sample_rows(np.arange(len(DATES)))
+    assert meta["n_rows"] == counts.sum() == len(cells)
+    at = np.concatenate([[0], np.cumsum(counts)])
+    for i, row in enumerate(labels):
+        kept, w = cells[at[i]:at[i + 1]], weight[at[i]:at[i + 1]]
+        assert set(np.flatnonzero(row > 0)) <= set(kept)
+        np.testing.assert_array_equal(w, np.where(row[kept] > 0, 1.0, 4.0))
+        assert (np.diff(kept) > 0).all()
+
+def test_same_seed_same_rows(store):
+    appended_sparse(store)
+    store.write_sample(0.25, seed=7)
+    first = sample_arrays(store)
+    store.write_sample(0.25, seed=7)
+    for name, arr in sample_arrays(store).items():
+        np.testing.assert_array_equal(arr, first[name])
+    store.write_sample(0.25, seed=8)
+    assert not np.array_equal(sample_arrays(store)["cells"], first["cells"])
+
+def test_a_dates_sample_does_not_depend_on_other_dates(store):
+    appended_sparse(store, DATES[:2])
+    store.write_sample(0.25, seed=7)
+    before = store._sample_rows(np.arange(2))
+    appended_sparse(store, DATES[2:], seed=2)
+    store.write_sample(0.25, seed=7)
+    after = store._sample_rows(np.arange(2))
+    for a, b in zip(before, after):
+        np.testing.assert_array_equal(a, b)
+
+def test_sample_rows_of_a_subset(store):
+    appended_sparse(store)
+    store.write_sample(0.5)
+    cells, weight, counts = store._sample_rows(np.arange(len(DATES)))
+    sub_cells, sub_weight, sub_counts = store._sample_rows(np.array([2, 0]))
+    at = np.concatenate([[0], np.cumsum(counts)])
+    np.testing.assert_array_equal(sub_counts, counts[[2, 0]])
+    np.testing.assert_array_equal(sub_cells, np.concatenate([cells[at[2]:at[3]], cells[at[0]:at[1]]]))
+    np.testing.assert_array_equal(sub_weight, np.concatenate([weight[at[2]:at[3]], weight[at[0]:at[1]]]))
+
+def test_sampled_columns_match_the_full_table(store):
+    labels = appended_sparse(store)
+    store.write_sample(0.25)
+    full = store.columns(["grid_id", "label", "doy"])
+    sampled = store.columns(["grid_id", "label", "doy", "weight"], sampled=True)
+    cells, _, counts = store._sample_rows(np.arange(len(DATES)))
+    flat = np.repeat(np.arange(len(DATES)), counts) * store.n_cells + cells
+    for name in ("grid_id", "label", "doy"):
+        np.testing.assert_array_equal(sampled[name], full[name][flat])
+    assert sampled["label"].sum() == ((labels & 1) > 0).sum()
+
+@pytest.mark.parametrize("neg_frac", [0, -0.1, 1.5])
+def test_sample_fraction_out_of_range(store, neg_frac):
+    with pytest.raises(ValueError):
+        store.write_sample(neg_frac)
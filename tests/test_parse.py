@@ -0,0 +1,75 @@
+import pytest
+
+from conftest import stage
+
+parse_stage = stage("02_compute_tpi")
+
+HEADER = "Time,F_Scale,Location,County,State,Lat,Lon,Comments"
+GOOD = ["1200,EF1,3 N Moore,Cleveland,OK,35.39,-97.49,Brief touchdown (OUN)",
+        "1315,UNK,Tulsa,Tulsa,OK,36.15,-95.99,Roof damage (TSA)"]
+# Unquoted commas in Comments: one extra field, LAT/LON still in place -> repaired
+LONG_COMMENT = "1420,EF2,5 SW Joplin,Jasper,MO,37.03,-94.58,Trees down, power lines down, (SGF)"
+# Extra comma in Location shifts LAT/LON: still not numeric after folding -> quarantined
+SHIFTED = "1530,EF0,Near, Wichita,Sedgwick,KS,37.69,-97.34,Spotter report (ICT)"
+
+def csv_bytes(*rows):
+    return ("\n".join([HEADER, *rows]) + "\n").encode()
+
+def parse(*rows):
+    stats = parse_stage.new_parse_stats()
+    pts = parse_stage.parse_reports(csv_bytes(*rows), stats)
+    return pts, stats
+
+def latlon(pts):
+    return sorted(zip(pts["lat"].round(2), pts["lon"].round(2)))
+
+def test_clean_file_needs_no_repair():
+    pts, stats = parse(*GOOD)
+    assert latlon(pts) == [(35.39, -97.49), (36.15, -95.99)]
+    assert stats == {"rows": 2, "repaired": 0, "skipped": 0, "quarantined": []}
+
+def test_long_comment_is_folded_back():
+    pts, stats = parse(GOOD[0], LONG_COMMENT, GOOD[1])
+    assert latlon(pts) == [(35.39, -97.49), (36.15, -95.99), (37.03, -94.58)]
+    assert (stats["rows"], stats["repaired"], stats["skipped"]) == (3, 1, 0)
+
+def test_long_first_row_is_not_an_index_column():
+    pts, stats = parse(LONG_COMMENT, *GOOD)
+    assert latlon(pts) == [(35.39, -97.49), (36.15, -95.99), (37.03, -94.58)]
+    assert (stats["rows"], stats["repaired"], stats["skipped"]) == (3, 1, 0)
+
+def test_shifted_row_is_quarantined():
+    pts, stats = parse(GOOD[0], SHIFTED, LONG_COMMENT, GOOD[1])
+    assert latlon(pts) == [(35.39, -97.49), (36.15, -95.99), (37.03, -94.58)]
+    assert (stats["rows"], stats["repaired"], stats["skipped"]) == (4, 1, 1)
+    assert stats["quarantined"] == [SHIFTED]
+
+def test_points_outside_north_america_are_dropped_not_counted():
+    pts, stats = parse(GOOD[0], "1200,EF0,Nowhere,X,ZZ,0.0,0.0,Bad coordinates")
+    assert latlon(pts) == [(35.39, -97.49)]
+    assert (stats["rows"], stats["repaired"], stats["skipped"]) == (2, 0, 0)
+
+def test_stats_accumulate_across_calls():
+    stats = parse_stage.new_parse_stats()
+    parse_stage.parse_reports(csv_bytes(GOOD[0], LONG_COMMENT), stats)
+    parse_stage.parse_reports(csv_bytes(SHIFTED, GOOD[1]), stats)
+    assert (stats["rows"], stats["repaired"], stats["skipped"]) == (4, 1, 1)
+
+def test_batch_parse_matches_per_file():
+    sources = {"2011-04-26": csv_bytes(LONG_COMMENT, GOOD[0]),
+               "2011-04-27": csv_bytes(GOOD[1], SHIFTED),
+               "2011-04-28": csv_bytes()}
+    per_file = parse_stage.new_parse_stats()
+    want = {d: latlon(parse_stage.parse_reports(src, per_file)) for d, src in sources.items()}
+
+    batch = parse_stage.new_parse_stats()
+    pts = parse_stage.parse_reports_batch(sources, batch)
+
+    got = {d: latlon(pts[pts["date"] == d]) for d in sources}
+    assert got == want
+    assert {k: batch[k] for k in ("rows", "repaired", "skipped")} == {k: per_file[k] for k in ("rows", "repaired", "skipped")}
+    assert [line.split(",", 1)[1] for line in batch["quarantined"]] == [SHIFTED]
+
+def test_missing_latlon_columns():
+    with pytest.raises(ValueError, match="LAT/LON"):
+        parse_stage.parse_reports(b"Time,Where\n1200,here\n")
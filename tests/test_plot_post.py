@@ -0,0 +1,14 @@
+import pytest
+
+from conftest import stage
+
+plot_stage = stage("03_plot_post")
+
+@pytest.mark.parametrize("radius,hazards,want", [
+    (25.0, ["torn"], "P(tornado within 25 mi)"),
+    (40.0, ["torn", "hail", "wind"], "P(tornado within 40 mi)"),
+    (12.5, ["hail"], "P(severe hail within 12.5 mi)"),
+    (25.0, ["hail", "wind"], "P(severe hail or severe wind within 25 mi)"),
+])
+def test_prob_label_follows_radius_and_target_hazards(radius, hazards, want):
+    assert plot_stage.prob_label(radius, hazards) == want
@@ -0,0 +1,117 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import stage
+
+build = stage("09_build_dataset")
+label_stage = stage("04_make_grid_and_labels")
+
+CFG = dict(stage("00_config").DEFAULTS, extent=[-100.0, -95.0, 33.0, 37.0], hazards=["torn", "hail", "wind"])
+TORN_CSV = b"Time,F_Scale,Location,County,State,Lat,Lon,Comments\n1200,EF1,A,B,OK,35.2,-97.4,x\n1300,EF0,C,D,OK,34.1,-98.9,y\n"
+
+def points(seed, n=6):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({"lat": rng.uniform(33, 37, n), "lon": rng.uniform(-100, -95, n)})
+
+@pytest.fixture
+def cache(tmp_path):
+    return build.StageCache(str(tmp_path / "stage_cache"))
+
+@pytest.fixture
+def grid(in_tmp):
+    return label_stage.grid_from_config(CFG)
+
+# ---------------- keys ----------------
+def test_key_depends_on_stage_parts_and_version(monkeypatch):
+    key = build.StageCache.key("labels", b"abc", [0.25, 25.0])
+    assert key == build.StageCache.key("labels", b"abc", [0.25, 25.0])
+    assert key != build.StageCache.key("parse", b"abc", [0.25, 25.0])
+    assert key != build.StageCache.key("labels", b"abd", [0.25, 25.0])
+    assert key != build.StageCache.key("labels", b"abc", [0.25, 40.0])
+    # part boundaries count: ("ab", "c") is not ("a", "bc")
+    assert build.StageCache.key("labels", b"ab", b"c") != build.StageCache.key("labels", b"a", b"bc")
+    monkeypatch.setitem(build.STAGE_VERSIONS, "labels", build.STAGE_VERSIONS["labels"] + 1)
+    assert key != build.StageCache.key("labels", b"abc", [0.25, 25.0])
+
+def test_points_key_covers_points_grid_settings_and_hazards():
+    pts = points(0)
+    key = build.points_key(pts, CFG)
+    assert key == build.points_key(pts.copy(), CFG)
+    assert key != build.points_key(points(1), CFG)
+    for setting, value in (("radius_miles", 40.0), ("grid_res_deg", 0.1), ("extent", [-101.0, -95.0, 33.0, 37.0])):
+        assert key != build.points_key(pts, dict(CFG, **{setting: value}))
+    assert key != build.points_key(pts, CFG, np.ones(len(pts), dtype=np.uint8))
+    assert build.points_key(pts, CFG, np.ones(len(pts))) != build.points_key(pts, CFG, np.full(len(pts), 2))
+
+def test_parse_key_is_the_raw_content():
+    assert build.parse_key(TORN_CSV) == build.parse_key(bytes(TORN_CSV))
+    assert build.parse_key(TORN_CSV) != build.parse_key(TORN_CSV + b"\n")
+
+# ---------------- round trips ----------------
+def test_cached_parse_round_trip(cache):
+    first = build.cached_parse(TORN_CSV, cache)
+    assert cache.has("parse", build.parse_key(TORN_CSV))
+    again = build.cached_parse(TORN_CSV, cache)
+    np.testing.assert_array_equal(again[["lat", "lon"]].to_numpy(), first[["lat", "lon"]].to_numpy())
+
+@pytest.mark.parametrize("hazards", [["torn"], ["torn", "hail", "wind"], ["hail", "wind"]])
+def test_cached_labels_unpack_to_the_computed_labels(grid, cache, monkeypatch, hazards):
+    pts_by_hazard = {h: points(i) for i, h in enumerate(hazards)}
+    want = build.cached_labels(grid, CFG, pts_by_hazard, None)
+    assert want.any()
+
+    assert build.cached_labels(grid, CFG, pts_by_hazard, cache).tolist() == want.tolist()
+    # The second call must come from the packed planes, not a new labeling pass
+    monkeypatch.setattr(type(grid), "label", lambda *a, **k: pytest.fail("labels recomputed on a cache hit"))
+    got = build.cached_labels(grid, CFG, pts_by_hazard, cache)
+    assert got.dtype == np.uint8
+    np.testing.assert_array_equal(got, want)
+
+def test_no_reports_round_trip(grid, cache):
+    empty = {"torn": pd.DataFrame({"lat": np.zeros(0), "lon": np.zeros(0)})}
+    build.cached_labels(grid, CFG, empty, cache)
+    got = build.cached_labels(grid, CFG, empty, cache)
+    assert got.shape == (grid.n_cells,) and not got.any()
+
+# ---------------- LRU eviction ----------------
+def put_aged(cache, n):
+    """n parse entries of 1 KiB payload, entry i last used i*100 s after the first."""
+    keys = [build.StageCache.key("parse", str(i)) for i in range(n)]
+    for i, key in enumerate(keys):
+        cache.put("parse", key, np.zeros(128))
+        os.utime(cache.path("parse", key), (1_000_000 + 100 * i,) * 2)
+    return keys
+
+def test_evict_removes_least_recently_used_first(cache):
+    keys = put_aged(cache, 4)
+    size = os.path.getsize(cache.path("parse", keys[0]))
+    assert cache.size_bytes() == 4 * size
+
+    cache.get("parse", keys[0])        # a hit makes the oldest entry the newest
+    n, freed = cache.evict(2 * size)
+
+    assert (n, freed) == (2, 2 * size)
+    assert [cache.has("parse", k) for k in keys] == [True, False, False, True]
+    assert cache.size_bytes() == 2 * size
+
+def test_evict_under_the_cap_and_to_zero(cache):
+    keys = put_aged(cache, 3)
+    assert cache.evict(10 ** 9) == (0, 0)
+    cache.evict(0)
+    assert not any(cache.has("parse", k) for k in keys)
+    assert cache.entries() == []
+
+def test_temp_files_are_not_entries(cache):
+    put_aged(cache, 1)
+    open(cache.path("parse", "partial") + ".123.tmp.npy", "wb").close()
+    assert len(cache.entries()) == 1
+
+def test_unreadable_entry_is_a_miss(cache):
+    key = build.StageCache.key("parse", "broken")
+    os.makedirs(os.path.dirname(cache.path("parse", key)), exist_ok=True)
+    with open(cache.path("parse", key), "wb") as f:
+        f.write(b"not an npy file")
+    assert cache.get("parse", key) is None
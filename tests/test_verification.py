@@ -0,0 +1,112 @@
+import numpy as np
+import pytest
+from sklearn.metrics import brier_score_loss, roc_auc_score
+
+from conftest import stage
+
+verify_stage = stage("08_verify_forecasts")
+
+N_CELLS = 400
+N_DATES = 12
+
+def forecasts(seed, quantize=None):
+    """
+    Per-date (date, p, o): skewed probabilities with observations drawn from
+    a sharpened p, so the forecasts discriminate but are not calibrated.
+    quantize=k snaps p to the centers of k equal bins.
+    """
+    rng = np.random.default_rng(seed)
+    out = []
+    for i in range(N_DATES):
+        p = rng.beta(0.6, 4.0, N_CELLS)
+        if quantize:
+            p = (np.minimum((p * quantize).astype(int), quantize - 1) + 0.5) / quantize
+        o = (rng.random(N_CELLS) < np.clip(1.4 * p ** 1.2, 0, 1)).astype(np.uint8)
+        out.append((f"2011-04-{i + 1:02d}", p, o))
+    return out
+
+def streamed(days, **kwargs):
+    ver = verify_stage.Verification(**kwargs)
+    for d, p, o in days:
+        ver.update(d, p, o)
+    return ver
+
+def pooled(days):
+    return np.concatenate([p for _, p, _ in days]), np.concatenate([o for _, _, o in days])
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_brier_and_skill_match_sklearn(seed):
+    days = forecasts(seed)
+    ver = streamed(days)
+    p, o = pooled(days)
+
+    assert ver.n == len(p) and ver.n_pos == o.sum()
+    assert ver.brier() == pytest.approx(brier_score_loss(o, p), rel=1e-12)
+    climatology = np.full(len(o), o.mean())
+    assert ver.brier_skill() == pytest.approx(1 - brier_score_loss(o, p) / brier_score_loss(o, climatology), rel=1e-10)
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_histogram_auc_matches_sklearn(seed):
+    days = forecasts(seed)
+    p, o = pooled(days)
+    # within a bin ties count half, so the histogram AUC is off by at most ~1/ROC_BINS
+    assert streamed(days).auc() == pytest.approx(roc_auc_score(o, p), abs=1 / verify_stage.ROC_BINS)
+    # exact when every forecast value has its own bin
+    days = forecasts(seed, quantize=50)
+    p, o = pooled(days)
+    assert streamed(days, roc_bins=50).auc() == pytest.approx(roc_auc_score(o, p), abs=1e-12)
+
+def test_roc_curve_runs_from_0_0_to_1_1():
+    _, pofd, pod = streamed(forecasts(3)).roc()
+    assert (pofd[0], pod[0]) == (0, 0) and (pofd[-1], pod[-1]) == pytest.approx((1, 1))
+    assert (np.diff(pofd) >= 0).all() and (np.diff(pod) >= 0).all()
+
+def test_reliability_bins():
+    days = forecasts(4)
+    p, o = pooled(days)
+    table = streamed(days).reliability()
+    b = np.minimum((p * verify_stage.REL_BINS).astype(int), verify_stage.REL_BINS - 1)
+    for k, row in table.iterrows():
+        assert row["n"] == (b == k).sum()
+        if row["n"]:
+            assert row["mean_p"] == pytest.approx(p[b == k].mean())
+            assert row["obs_freq"] == pytest.approx(o[b == k].mean())
+
+def test_decomposition_sums_to_brier_when_bins_are_exact():
+    # REL - RES + UNC is exact when each reliability bin holds a single forecast value
+    days = forecasts(5, quantize=verify_stage.REL_BINS)
+    p, o = pooled(days)
+    ver = streamed(days)
+    dec = ver.decomposition()
+    assert dec["uncertainty"] == pytest.approx(o.mean() * (1 - o.mean()))
+    assert dec["reliability"] - dec["resolution"] + dec["uncertainty"] == pytest.approx(brier_score_loss(o, p), rel=1e-10)
+
+def test_decomposition_is_close_for_continuous_forecasts():
+    days = forecasts(6)
+    p, o = pooled(days)
+    dec = streamed(days).decomposition()
+    assert dec["reliability"] - dec["resolution"] + dec["uncertainty"] == pytest.approx(brier_score_loss(o, p), abs=5e-3)
+
+def test_per_date_rows_match_sklearn():
+    days = forecasts(7)
+    _, o_all = pooled(days)
+    table = streamed(days).per_date()
+    assert list(table["date"]) == [d for d, _, _ in days]
+    for (_, p, o), (_, row) in zip(days, table.iterrows()):
+        assert row["n"] == len(p) and row["n_pos"] == o.sum()
+        assert row["brier"] == pytest.approx(brier_score_loss(o, p), rel=1e-12)
+        assert row["auc"] == pytest.approx(roc_auc_score(o, p), rel=1e-12)
+        # skill vs forecasting the whole period's base rate on that day
+        ref = brier_score_loss(o, np.full(len(o), o_all.mean()))
+        assert row["bss"] == pytest.approx(1 - brier_score_loss(o, p) / ref, rel=1e-10)
+
+def test_days_without_both_classes():
+    days = forecasts(8)
+    days[0] = (days[0][0], days[0][1], np.zeros(N_CELLS, dtype=np.uint8))
+    table = streamed(days).per_date()
+    assert np.isnan(table["auc"].iloc[0])
+    assert not np.isnan(table["auc"].iloc[1:]).any()
+
+    quiet = streamed([("2011-04-01", np.full(10, 0.1), np.zeros(10))])
+    assert np.isnan(quiet.auc()) and np.isnan(quiet.brier_skill())
+    assert quiet.brier() == pytest.approx(0.01)